@@ -0,0 +1,149 @@
+import os
+import json
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator, AsyncIterator, Set, TYPE_CHECKING
+import jsonlines
+from .single_flight import flight_key
+
+# Shared by the batch CLI and the HTTP server; the agent itself is only a type here,
+# so importing this module stays cheap
+if TYPE_CHECKING:
+    from .graph_hybrid import HybridAgent
+
+def failed_result(question_id: str, explanation: str) -> Dict[str, Any]:
+    """Build the output record for a question that did not complete"""
+    return {
+        "id": question_id,
+        "final_answer": None,
+        "sql": "",
+        "confidence": 0.0,
+        "explanation": explanation,
+        "citations": [],
+        # Marks the record for a rerun when the output file is resumed
+        "error": explanation
+    }
+
+async def stream_batch(agent: 'HybridAgent', questions: Iterable[Dict[str, Any]], workers: int = 1,
+                       use_async: bool = False, timeout: Optional[float] = None,
+                       window: Optional[int] = None, dedupe: bool = True,
+                       stats: Optional[Dict[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Answer questions concurrently as they are read, yielding results in input order
+
+    At most `window` questions are held at once (running, queued, or done but waiting
+    for an earlier one), so memory stays flat however long the input is. The window is refilled once half of it
+    has drained, and each refill's documents are prefetched in one pass.
+    With `dedupe`, a question identical to one still in the window reuses its answer
+    without taking a worker slot; `stats["deduplicated"]` counts them.
+    """
+    workers = max(1, workers)
+    window = window or workers * 4
+    slots = asyncio.Semaphore(workers)
+    loop = asyncio.get_running_loop()
+    # Headroom so runs abandoned after a timeout do not starve queued questions
+    executor = None if use_async else ThreadPoolExecutor(max_workers=workers * 2)
+
+    async def answer(q: Dict[str, Any]) -> Dict[str, Any]:
+        async with slots:
+            if use_async:
+                pending = agent.arun(q['question'], q['format_hint'], q['id'])
+            else:
+                pending = loop.run_in_executor(
+                    executor, partial(agent.run, q['question'], q['format_hint'], q['id'])
+                )
+            try:
+                return await asyncio.wait_for(pending, timeout)
+            except asyncio.TimeoutError:
+                return failed_result(q['id'], f"Timed out after {timeout}s")
+            except Exception as e:
+                return failed_result(q['id'], f"Failed: {e}")
+
+    async def follow(leader: asyncio.Future, question_id: str) -> Dict[str, Any]:
+        result = await asyncio.shield(leader)
+        return dict(result, id=question_id, citations=list(result["citations"]))
+
+    def schedule(q: Dict[str, Any]):
+        key = flight_key(q['question'], q['format_hint']) if dedupe else None
+        leader = leaders.get(key) if dedupe else None
+        if leader is not None:
+            if stats is not None:
+                stats["deduplicated"] = stats.get("deduplicated", 0) + 1
+            return key, asyncio.ensure_future(follow(leader, q['id']))
+        task = asyncio.ensure_future(answer(q))
+        if dedupe:
+            leaders[key] = task
+        return key, task
+
+    iterator = iter(questions)
+    in_order = deque()
+    # First task for each distinct question still in the window
+    leaders = {}
+    exhausted = False
+    try:
+        while True:
+            if not exhausted and len(in_order) <= window // 2:
+                wanted = window - len(in_order)
+                chunk = list(islice(iterator, wanted))
+                exhausted = len(chunk) < wanted
+                if chunk:
+                    # Tasks start at the next await, so their documents are fetched first; one
+                    # vectorized retrieval pass per refill, skipping duplicates that will not run
+                    scheduled = [schedule(q) for q in chunk]
+                    agent.prefetch_docs([q['question'] for q, (key, task) in zip(chunk, scheduled)
+                                         if not dedupe or leaders.get(key) is task])
+                    in_order.extend(scheduled)
+            if not in_order:
+                break
+            key, task = in_order.popleft()
+            if dedupe and leaders.get(key) is task:
+                del leaders[key]
+            yield await task
+    finally:
+        for _, task in in_order:
+            task.cancel()
+        if executor:
+            executor.shutdown(wait=False)
+
+async def run_batch(agent: 'HybridAgent', questions: Iterable[Dict[str, Any]], workers: int = 1,
+                    use_async: bool = False, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Answer a batch of questions concurrently, returning results in input order"""
+    return [result async for result in stream_batch(agent, questions, workers, use_async, timeout)]
+
+def is_failed(record: Dict[str, Any]) -> bool:
+    """Whether an output record came from failed_result"""
+    return bool(record.get("error"))
+
+def load_checkpoint(path: str) -> Set[str]:
+    """IDs answered in an output file; failed IDs are left out so they rerun, a partial trailing line is truncated"""
+    answered = set()
+    if not os.path.exists(path):
+        return answered
+    valid_bytes = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+                # A rerun appends a new record after the failed one, so the last record per ID wins
+                if is_failed(record):
+                    answered.discard(record['id'])
+                else:
+                    answered.add(record['id'])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                break
+            valid_bytes += len(line)
+    if valid_bytes < os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return answered
+
+def read_questions(path: str, skip_ids: Set[str]) -> Iterator[Dict[str, Any]]:
+    """Lazily read questions, skipping IDs that already have a result"""
+    with jsonlines.open(path) as reader:
+        for obj in reader:
+            if obj['id'] not in skip_ids:
+                yield obj
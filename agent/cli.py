@@ -0,0 +1,85 @@
+import click
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+# Agent modules are imported inside build_agent() so --help does not load numpy and scipy
+if TYPE_CHECKING:
+    from .graph_hybrid import HybridAgent
+    from .tracing import Tracer
+
+# Options shared by the batch CLI and the HTTP server, applied top to bottom
+AGENT_OPTIONS = [
+    click.option('--max-llm-calls', default=None, type=int,
+                 help='Maximum number of in-flight LLM calls (defaults to --workers)'),
+    click.option('--llm-cache', 'llm_cache_path', default='.cache/llm_cache.sqlite', show_default=True,
+                 help='On-disk cache of LLM outputs'),
+    click.option('--llm-cache-ttl', default=None, type=float, help='Expire cached LLM outputs after N seconds'),
+    click.option('--llm-cache-bypass', is_flag=True, help='Ignore cached LLM outputs but store fresh ones'),
+    click.option('--no-llm-cache', is_flag=True, help='Disable the LLM output cache entirely'),
+    click.option('--fast-router-threshold', default=0.75, show_default=True, type=float,
+                 help='Minimum local classifier confidence to skip the LLM router'),
+    click.option('--no-fast-router', is_flag=True, help='Always route questions with the LLM'),
+    click.option('--retrieval-mode', default='tfidf', show_default=True, type=click.Choice(['tfidf', 'hybrid']),
+                 help='Document ranking: TF-IDF only, or BM25 + TF-IDF fusion'),
+    click.option('--query-timeout', default=30.0, show_default=True, type=float,
+                 help='Seconds a generated SQL query may run before it is interrupted'),
+    click.option('--aggregates', is_flag=True,
+                 help='Materialize daily sales summary tables next to the database and let SQL use them'),
+    click.option('--sql-demos', 'sql_demos_path', default='data/sql_demos.jsonl', show_default=True,
+                 help='Question/SQL pairs to pick few-shot demos for the SQL generator from'),
+    click.option('--sql-demo-k', default=3, show_default=True, type=int,
+                 help='Demos per question, chosen by similarity to it (0 disables demo selection)'),
+    click.option('--sql-demo-index', 'sql_demo_index_dir', default='.cache/demo_index', show_default=True,
+                 help='Directory the SQL demo index is persisted in'),
+    click.option('--lm-endpoint', 'lm_endpoints', multiple=True,
+                 help='OpenAI-compatible model server URL, e.g. http://localhost:11434 (repeat to load-balance)'),
+    click.option('--model', default=None, help='Model requested from --lm-endpoint servers (default: the local phi3.5)'),
+    click.option('--module-model', 'module_models', multiple=True,
+                 help="Model for one DSPy module, e.g. Router=qwen2.5:0.5b (repeatable)"),
+    click.option('--lm-timeout', default=120.0, show_default=True, type=float,
+                 help='Seconds an LM request may take before the next endpoint is tried'),
+]
+
+def agent_options(command):
+    """Add the agent configuration options to a click command; they arrive as keyword arguments"""
+    for option in reversed(AGENT_OPTIONS):
+        command = option(command)
+    return command
+
+def build_agent(options: Dict[str, Any], workers: int, tracer: Optional['Tracer'] = None,
+                **agent_kwargs) -> 'HybridAgent':
+    """Build the LMs, LLM cache and agent described by the agent_options values"""
+    from .graph_hybrid import HybridAgent
+    from .llm_cache import LLMCache
+
+    lm, module_lms = None, None
+    if options['lm_endpoints']:
+        from .dspy_signatures import DEFAULT_MODEL
+        from .lm_dispatcher import build_lms
+        try:
+            lm, module_lms = build_lms(list(options['lm_endpoints']), options['model'] or DEFAULT_MODEL,
+                                       list(options['module_models']), options['lm_timeout'])
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--module-model')
+    elif options['model'] or options['module_models']:
+        raise click.UsageError('--model and --module-model need at least one --lm-endpoint')
+
+    llm_cache = None
+    if not options['no_llm_cache']:
+        llm_cache = LLMCache(options['llm_cache_path'], ttl_seconds=options['llm_cache_ttl'],
+                             bypass=options['llm_cache_bypass'])
+    return HybridAgent(
+        max_llm_calls=options['max_llm_calls'] or workers,
+        llm_cache=llm_cache,
+        fast_router_threshold=None if options['no_fast_router'] else options['fast_router_threshold'],
+        retrieval_mode=options['retrieval_mode'],
+        db_pool_size=max(4, workers),
+        query_timeout=options['query_timeout'],
+        use_aggregates=options['aggregates'],
+        sql_demos_path=options['sql_demos_path'],
+        sql_demo_k=options['sql_demo_k'],
+        sql_demo_index_dir=options['sql_demo_index_dir'],
+        lm=lm,
+        module_lms=module_lms,
+        tracer=tracer,
+        **agent_kwargs
+    )
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+from scipy.sparse import csr_matrix
+from .rag.retrieval import top_n, save_index_files
+
+DEMO_INDEX_VERSION = 1
+
+class DemoStore:
+    """Question -> SQL training pairs indexed with TF-IDF; picks the nearest ones as few-shot demos"""
+
+    def __init__(self, path: str = "data/sql_demos.jsonl", index_dir: Optional[str] = ".cache/demo_index",
+                 k: int = 3, min_score: float = 0.2):
+        self.path = path
+        # Directory holding the persisted index; None keeps everything in memory
+        self.index_dir = index_dir
+        self.k = k
+        # Demos less similar than this to the question are left out rather than padding the prompt
+        self.min_score = min_score
+        self.demos = []
+        self.matrix = None
+        self.vectorizer = None
+        self.selections = 0
+        self.selected = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _digest(self) -> str:
+        with open(self.path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _index_path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _new_vectorizer(self, vocabulary: Optional[Dict[str, int]] = None):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, vocabulary=vocabulary)
+
+    def _load_index(self, digest: str) -> bool:
+        """Load the persisted index; False if absent, built from a different demo file or inconsistent"""
+        if not self.index_dir or not os.path.exists(self._index_path('manifest.json')):
+            return False
+        try:
+            with open(self._index_path('manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != DEMO_INDEX_VERSION or manifest.get('sha1') != digest:
+                return False
+            with open(self._index_path('demos.json'), 'r', encoding='utf-8') as f:
+                demos = json.load(f)
+            with open(self._index_path('vocabulary.json'), 'r', encoding='utf-8') as f:
+                terms = json.load(f)
+            arrays = {name: np.load(self._index_path(f'{name}.npy')) for name in ('data', 'indices', 'indptr', 'idf')}
+            # Files from different saves (e.g. an interrupted one) must not be combined
+            shape = (len(demos), len(terms))
+            if (manifest.get('demos'), manifest.get('terms')) != shape or len(arrays['idf']) != shape[1] \
+                    or len(arrays['indptr']) != shape[0] + 1 or int(arrays['indptr'][-1]) != manifest.get('nnz') \
+                    or len(arrays['data']) != len(arrays['indices']):
+                return False
+            matrix = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape)
+        except (OSError, ValueError, KeyError, IndexError):
+            return False
+        self.vectorizer = self._new_vectorizer({term: i for i, term in enumerate(terms)})
+        self.vectorizer.idf_ = arrays['idf']
+        self.matrix = matrix
+        self.demos = demos
+        return True
+
+    def _save_index(self, digest: str):
+        if not self.index_dir:
+            return
+        terms = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+        arrays = {
+            'data': self.matrix.data, 'indices': self.matrix.indices,
+            'indptr': self.matrix.indptr, 'idf': self.vectorizer.idf_
+        }
+        manifest = {
+            'version': DEMO_INDEX_VERSION, 'sha1': digest,
+            # Shapes of the saved arrays, checked on load
+            'demos': len(self.demos), 'terms': len(terms), 'nnz': int(self.matrix.nnz)
+        }
+        save_index_files(self.index_dir, {'demos.json': self.demos, 'vocabulary.json': terms}, arrays, manifest)
+
+    def load(self):
+        """Load the demo index, rebuilding it when the demo file changed"""
+        if not os.path.exists(self.path):
+            self.demos, self.matrix = [], None
+            self._loaded = True
+            return
+        digest = self._digest()
+        if not self._load_index(digest):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.demos = [json.loads(line) for line in f if line.strip()]
+            self.vectorizer = self._new_vectorizer()
+            self.matrix = self.vectorizer.fit_transform([demo['question'] for demo in self.demos]).tocsr()
+            self._save_index(digest)
+        self._loaded = True
+
+    def warmup(self):
+        """Load the index now instead of on the first question"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def select(self, question: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to k demos whose questions are most similar to this one, best first"""
+        self.warmup()
+        k = self.k if k is None else k
+        if not self.demos or k <= 0:
+            return []
+        scores = (self.matrix @ self.vectorizer.transform([question]).T).toarray().ravel()
+        demos = [self.demos[i] for i in top_n(scores, k) if scores[i] >= self.min_score]
+        with self._lock:
+            self.selections += 1
+            self.selected += len(demos)
+        return demos
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many demos were picked per question on average"""
+        return {
+            "demos": len(self.demos),
+            "selections": self.selections,
+            "avg_selected": self.selected / self.selections if self.selections else 0.0
+        }
@@ -1,33 +1,61 @@
+import re
+import threading
+from types import SimpleNamespace
 import dspy
-from typing import List, Optional
-
-# Configure DSPy with local model
-try:
-    # Try Ollama first
-    lm = dspy.OllamaLocal(model='phi3.5:3.8b-mini-instruct-q4_K_M')
-except:
-    # Fallback to other local options
+from typing import List, Dict, Any, Optional
+from .llm_cache import LLMCache
+
+DEFAULT_MODEL = 'phi3.5:3.8b-mini-instruct-q4_K_M'
+
+# The default LM is loaded on first use rather than at import, so importing stays cheap
+_lm_lock = threading.Lock()
+
+class FallbackLM(dspy.BaseLM):
+    """Offline stand-in used when no local model loads; returns fixed dummy outputs"""
+    OUTPUTS = {'classification': 'hybrid', 'sql_query': 'SELECT 1', 'final_answer': '42',
+               'explanation': 'Fallback response'}
+
+    def __init__(self):
+        super().__init__(model='fallback', cache=False)
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        text = (messages or [{'content': prompt or ''}])[-1]['content'] or ''
+        # Answer in ChatAdapter format with the output fields the prompt asks for
+        requested = text.rsplit('Respond with the corresponding output fields', 1)[-1]
+        fields = [f for f in re.findall(r'\[\[ ## (\w+) ## \]\]', requested) if f != 'completed']
+        content = "\n\n".join([f"[[ ## {f} ## ]]\n{self.OUTPUTS.get(f, '')}" for f in fields] + ["[[ ## completed ## ]]"])
+        message = SimpleNamespace(content=content, tool_calls=None)
+        choice = SimpleNamespace(message=message, finish_reason='stop', logprobs=None)
+        return SimpleNamespace(choices=[choice], usage={}, model=self.model)
+
+def _load_lm(model: str = DEFAULT_MODEL):
+    """Build the local model's LM (Ollama first, then fallbacks)"""
     try:
-        # Try using the new DSPy configuration
-        from dspy.ollama import Ollama
-        lm = Ollama(model='phi3.5:3.8b-mini-instruct-q4_K_M')
+        # Try Ollama first
+        lm = dspy.OllamaLocal(model=model)
     except:
-        # Final fallback
-        class FallbackLM:
-            def __call__(self, **kwargs):
-                # Simple fallback that returns dummy responses
-                if 'question' in kwargs:
-                    if 'classification' in str(kwargs):
-                        return type('obj', (object,), {'classification': 'hybrid'})
-                    elif 'sql_query' in str(kwargs):
-                        return type('obj', (object,), {'sql_query': 'SELECT 1'})
-                    elif 'final_answer' in str(kwargs):
-                        return type('obj', (object,), {'final_answer': '42', 'explanation': 'Fallback response'})
-                return type('obj', (object,), {})
-        
-        lm = FallbackLM()
-    
-dspy.settings.configure(lm=lm)
+        # Fallback to other local options
+        try:
+            # Try using the new DSPy configuration
+            from dspy.ollama import Ollama
+            lm = Ollama(model=model)
+        except:
+            # Final fallback
+            lm = FallbackLM()
+    return lm
+
+_default_lm = None
+
+def ensure_lm():
+    """The LM in effect for this thread, building the default LM on first use if none is configured"""
+    global _default_lm
+    if dspy.settings.lm is not None:
+        return dspy.settings.lm
+    if _default_lm is None:
+        with _lm_lock:
+            if _default_lm is None:
+                _default_lm = _load_lm()
+    return _default_lm
 
 class RouteClassification(dspy.Signature):
     """Classify whether a question requires RAG, SQL, or hybrid approach."""
@@ -38,47 +66,104 @@ class SQLGeneration(dspy.Signature):
     """Generate SQL query based on question and schema."""
     question = dspy.InputField(desc="The user's question")
     schema_info = dspy.InputField(desc="Database schema information")
-    relevant_docs = dspy.InputField(desc="Relevant document chunks")
+    relevant_docs = dspy.InputField(desc="Relevant document chunks, best first, as '[chunk id] text' lines")
+    feedback = dspy.InputField(desc="Problems with the previous SQL attempt to fix; empty on the first attempt")
     sql_query = dspy.OutputField(desc="SQLite-compatible SQL query")
 
 class AnswerSynthesis(dspy.Signature):
     """Synthesize final answer from SQL results and documents."""
     question = dspy.InputField(desc="The user's question")
-    sql_results = dspy.InputField(desc="Results from SQL execution")
-    relevant_docs = dspy.InputField(desc="Relevant document chunks")
+    sql_results = dspy.InputField(desc="SQL result table (pipe-separated, header first); large results are summarized")
+    relevant_docs = dspy.InputField(desc="Relevant document chunks, best first, as '[chunk id] text' lines")
     format_hint = dspy.InputField(desc="Expected output format")
+    feedback = dspy.InputField(desc="Problems with the previous answer to fix; empty on the first attempt")
     final_answer = dspy.OutputField(desc="Final answer matching format hint")
     explanation = dspy.OutputField(desc="Brief explanation of the answer")
 
+def _model_name() -> str:
+    """Name of the currently configured LM, used in cache keys"""
+    current = dspy.settings.lm
+    return str(getattr(current, 'model', None) or getattr(current, 'model_name', None) or type(current).__name__)
+
+def _signature_id(signature) -> str:
+    """Stable description of a signature, used in cache keys"""
+    return f"{signature.__name__}:{signature.instructions}:{list(signature.input_fields)}->{list(signature.output_fields)}"
+
+def _call_settings(predictor, demos: Optional[List[dspy.Example]]) -> Dict[str, Any]:
+    """Demos and temperature a call runs with, used in cache keys"""
+    predictors = predictor.predictors()
+    if demos is not None:
+        shown = [demo.toDict() for demo in demos]
+    else:
+        # Compiled (e.g. BootstrapFewShot) demos
+        shown = [[demo.toDict() if hasattr(demo, 'toDict') else dict(demo) for demo in p.demos] for p in predictors]
+    temperature = getattr(dspy.settings.lm, 'kwargs', {}).get('temperature')
+    for p in predictors:
+        temperature = p.config.get('temperature', temperature)
+    return {"demos": shown, "temperature": temperature}
+
+def cached_predict(cache: Optional[LLMCache], signature, predictor, demos: Optional[List[dspy.Example]] = None,
+                   **inputs):
+    """Call a predictor, serving and storing its outputs through the LLM cache"""
+    # Passed explicitly: dspy.settings.configure only reaches threads started after it, and only
+    # the first thread to call it may, while graph nodes run on LangGraph's worker threads
+    with dspy.context(lm=ensure_lm()):
+        # Per-call demos replace the predictor's own (e.g. BootstrapFewShot) demos for this call only
+        call_inputs = dict(inputs, demos=demos) if demos is not None else inputs
+        if cache is None:
+            return predictor(**call_inputs)
+        
+        key = cache.make_key(_signature_id(signature), inputs, _model_name(), _call_settings(predictor, demos))
+        outputs = cache.get(key)
+        if outputs is not None:
+            return dspy.Prediction(**outputs)
+        
+        prediction = predictor(**call_inputs)
+        cache.put(key, dict(prediction.items()))
+        return prediction
+
 class Router(dspy.Module):
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMCache] = None):
         super().__init__()
         self.classifier = dspy.ChainOfThought(RouteClassification)
+        self.cache = cache
     
     def forward(self, question):
-        return self.classifier(question=question)
+        return cached_predict(self.cache, RouteClassification, self.classifier, question=question)
 
 class SQLGenerator(dspy.Module):
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMCache] = None):
         super().__init__()
         self.generator = dspy.ChainOfThought(SQLGeneration)
+        self.cache = cache
     
-    def forward(self, question, schema_info, relevant_docs):
-        return self.generator(
+    def forward(self, question, schema_info, relevant_docs, feedback="", demos=None):
+        """demos: question/sql_query pairs to show as few-shot examples instead of the compiled ones"""
+        return cached_predict(
+            self.cache,
+            SQLGeneration,
+            self.generator,
+            demos=[dspy.Example(question=d["question"], sql_query=d["sql_query"]) for d in demos] if demos else None,
             question=question,
             schema_info=schema_info,
-            relevant_docs=relevant_docs
+            relevant_docs=relevant_docs,
+            feedback=feedback
         )
 
 class AnswerSynthesizer(dspy.Module):
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMCache] = None):
         super().__init__()
         self.synthesizer = dspy.ChainOfThought(AnswerSynthesis)
+        self.cache = cache
     
-    def forward(self, question, sql_results, relevant_docs, format_hint):
-        return self.synthesizer(
+    def forward(self, question, sql_results, relevant_docs, format_hint, feedback=""):
+        return cached_predict(
+            self.cache,
+            AnswerSynthesis,
+            self.synthesizer,
             question=question,
             sql_results=sql_results,
             relevant_docs=relevant_docs,
-            format_hint=format_hint
+            format_hint=format_hint,
+            feedback=feedback
         )
@@ -0,0 +1,198 @@
+import re
+import json
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+
+LABELS = ('rag', 'sql', 'hybrid')
+
+# Hand-written signals for each route; each group becomes one binary feature
+KEYWORD_GROUPS = {
+    'doc_reference': r"\b(according to|per the|as defined|definition|defined in|policy|docs?|documentation|calendar|handbook|guideline)",
+    'policy_terms': r"\b(return window|returns?|refund|policy|warranty|opened|unopened|perishables?)\b",
+    'kpi_terms': r"\b(aov|average order value|gross margin|margin|kpi|conversion)\b",
+    'campaign_window': r"(summer|winter|spring|autumn|fall|holiday|campaign|promo\w*)\b.*\b(19|20)\d\d",
+    'aggregate_terms': r"\b(total|sum|count|how many|average|avg|top \d*|highest|lowest|most|least|rank\w*|by revenue|per (customer|product|category))\b",
+    'sql_entities': r"\b(revenue|quantity|orders?|customers?|products?|categor(y|ies)|suppliers?|employees?|shippers?|unitprice|discount)\b",
+    'explicit_sql': r"\b(order details|select|sum\(|count\(|join)\b|\w+\*\w+",
+    'year_or_date': r"\b(19|20)\d\d\b|\b\d{4}-\d{2}-\d{2}\b",
+    'all_time': r"\b(all-time|all time|ever|overall)\b",
+}
+
+# Seed training set, written independently of the evaluation questions so it does not leak them;
+# can be extended with labelled question files via fit_jsonl
+SEED_EXAMPLES = [
+    ("How long is the return period for sealed drinks under the product policy?", 'rag'),
+    ("What is the return policy for opened dairy products?", 'rag'),
+    ("How many days do customers have to return perishables according to the policy?", 'rag'),
+    ("What does the KPI documentation say about how AOV is defined?", 'rag'),
+    ("Which product categories are the focus of the Summer Beverages 1997 campaign?", 'rag'),
+    ("What are the dates of the Winter Classics 1997 campaign in the marketing calendar?", 'rag'),
+    ("According to the docs, how is gross margin defined?", 'rag'),
+    ("Can unopened non-perishables be returned and within how many days?", 'rag'),
+    ("What is the refund policy for Seafood?", 'rag'),
+    ("Summarize the catalog guidelines for Condiments.", 'rag'),
+    ("Which categories does the marketing calendar recommend promoting in winter?", 'rag'),
+    ("What does the policy say about returning opened Beverages?", 'rag'),
+    ("Which five products brought in the most revenue across all orders?", 'sql'),
+    ("How many orders were placed in total?", 'sql'),
+    ("Which customer placed the most orders?", 'sql'),
+    ("List the 5 most expensive products by UnitPrice.", 'sql'),
+    ("What is the total quantity sold for each category?", 'sql'),
+    ("How many customers are located in Germany?", 'sql'),
+    ("Which supplier provides the most products?", 'sql'),
+    ("What is the average discount across all order details?", 'sql'),
+    ("Which employee handled the highest number of orders?", 'sql'),
+    ("Count the number of products in each category.", 'sql'),
+    ("What was the total revenue in 1997?", 'sql'),
+    ("Which shipper delivered the most orders overall?", 'sql'),
+    ("Top 10 customers by total revenue all-time.", 'sql'),
+    ("In the Summer Beverages 1997 window from the marketing calendar, which supplier shipped the most units?", 'hybrid'),
+    ("Applying the KPI docs' average order value formula, what was AOV for orders shipped to Germany in 1997?", 'hybrid'),
+    ("How much did Condiments sell for during the Winter Classics 1997 campaign dates?", 'hybrid'),
+    ("Using the gross margin definition in the KPI docs, which category had the best margin in 1998?", 'hybrid'),
+    ("What was the gross margin for Dairy Products during Winter Classics 1997?", 'hybrid'),
+    ("Using the marketing calendar, how many orders were placed during Summer Beverages 1997?", 'hybrid'),
+    ("Per the KPI docs, what was the AOV for Beverages in 1997?", 'hybrid'),
+    ("Which product had the highest revenue during the Winter Classics 1997 campaign?", 'hybrid'),
+    ("According to the KPI definition, what was the total gross margin in 1997?", 'hybrid'),
+    ("During the Summer Beverages 1997 window, which customer spent the most?", 'hybrid'),
+    ("Using the calendar dates for Winter Classics 1997, what was total quantity sold of Confections?", 'hybrid'),
+]
+
+class FastRouter:
+    """Deterministic TF-IDF + keyword pre-router that answers before the LLM when confident"""
+
+    def __init__(self, threshold: float = 0.75, examples: Optional[List[Tuple[str, str]]] = None):
+        self.threshold = threshold
+        self.examples = list(examples or SEED_EXAMPLES)
+        self.vectorizer = None
+        self.model = None
+        self._patterns = [re.compile(p, re.IGNORECASE) for p in KEYWORD_GROUPS.values()]
+        self._lock = threading.Lock()
+        self.fast_path_hits = 0
+        self.fallbacks = 0
+        # Fitted on first use so constructing a router does not import scikit-learn
+        self._fitted = False
+
+    def _keyword_features(self, questions: List[str]) -> csr_matrix:
+        """Binary matrix of keyword-group matches, one row per question"""
+        matches = np.array(
+            [[1.0 if pattern.search(q) else 0.0 for pattern in self._patterns] for q in questions]
+        )
+        return csr_matrix(matches)
+
+    def _features(self, questions: List[str], fit: bool = False) -> csr_matrix:
+        """Stack TF-IDF and keyword features"""
+        tfidf = self.vectorizer.fit_transform(questions) if fit else self.vectorizer.transform(questions)
+        return hstack([tfidf, self._keyword_features(questions)], format='csr')
+
+    def fit(self, examples: List[Tuple[str, str]]):
+        """Train the classifier on (question, label) pairs"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)
+        # Strong regularization keeps probabilities honest on a seed set this small; with weaker
+        # regularization off-topic questions (no keyword hits) scored as confident 'rag'
+        self.model = LogisticRegression(max_iter=1000, C=1.0)
+        questions = [q for q, _ in examples]
+        labels = [label for _, label in examples]
+        self.model.fit(self._features(questions, fit=True), labels)
+        self._compile()
+        self._fitted = True
+
+    def warmup(self):
+        """Fit the classifier now instead of on the first question"""
+        if not self._fitted:
+            with self._lock:
+                if not self._fitted:
+                    self.fit(self.examples)
+
+    def _compile(self):
+        """Unpack the fitted model into plain arrays for the single-question scoring path"""
+        self._analyzer = self.vectorizer.build_analyzer()
+        self._vocabulary = self.vectorizer.vocabulary_
+        self._idf = self.vectorizer.idf_
+        self._classes = [str(c) for c in self.model.classes_]
+        coef = self.model.coef_
+        intercept = self.model.intercept_
+        if coef.shape[0] == 1:
+            # Binary models store one row; softmax over [0, s] matches predict_proba
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        n_text = len(self._idf)
+        self._text_coef = np.ascontiguousarray(coef[:, :n_text])
+        self._keyword_coef = np.ascontiguousarray(coef[:, n_text:])
+        self._intercept = intercept
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def fit_jsonl(self, path: str):
+        """Add labelled questions from a JSONL file whose ids start with rag_/sql_/hybrid_"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                label = obj.get('route') or obj['id'].split('_', 1)[0]
+                if label in LABELS:
+                    self.examples.append((obj['question'], label))
+        self.fit(self.examples)
+
+    def predict(self, questions: List[str]) -> List[Tuple[str, float]]:
+        """Return (label, probability) for each question in one vectorized pass"""
+        self.warmup()
+        features = self._features(questions)
+        coef = np.hstack([self._text_coef, self._keyword_coef])
+        probabilities = self._softmax(np.asarray(features @ coef.T) + self._intercept)
+        best = probabilities.argmax(axis=1)
+        return [(self._classes[i], float(p[i])) for i, p in zip(best, probabilities)]
+
+    def score(self, question: str) -> Tuple[str, float]:
+        """Return (label, probability) for one question without building sparse matrices"""
+        self.warmup()
+        counts = {}
+        for token in self._analyzer(question):
+            j = self._vocabulary.get(token)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        logits = self._intercept.copy()
+        if counts:
+            idx = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            # Same weighting as the fitted vectorizer: sublinear tf, idf, l2 norm
+            weights = (1.0 + np.log(tf)) * self._idf[idx]
+            weights /= np.linalg.norm(weights)
+            logits += self._text_coef[:, idx] @ weights
+        keywords = np.fromiter(
+            (1.0 if pattern.search(question) else 0.0 for pattern in self._patterns),
+            dtype=np.float64,
+            count=len(self._patterns)
+        )
+        logits += self._keyword_coef @ keywords
+        probabilities = self._softmax(logits)
+        best = int(probabilities.argmax())
+        return self._classes[best], float(probabilities[best])
+
+    def route(self, question: str) -> Optional[str]:
+        """Return a route when confident enough, otherwise None so the caller falls back to the LLM"""
+        label, probability = self.score(question)
+        with self._lock:
+            if probability >= self.threshold:
+                self.fast_path_hits += 1
+                return label
+            self.fallbacks += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how often the fast path was taken"""
+        total = self.fast_path_hits + self.fallbacks
+        return {
+            "fast_path": self.fast_path_hits,
+            "fallback": self.fallbacks,
+            "fast_path_rate": self.fast_path_hits / total if total else 0.0
+        }
@@ -1,10 +1,18 @@
 from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph import StateGraph, END
-from langgraph.graph.message import add_messages
+import threading
 import json
-from .dspy_signatures import Router, SQLGenerator, AnswerSynthesizer
+import ast
+from collections import OrderedDict
+from .llm_cache import LLMCache
+from .fast_router import FastRouter
+from .tracing import Tracer, estimate_tokens
+from .prompting import PromptAssembler
+from .demo_store import DemoStore
+from .single_flight import SingleFlight, flight_key
 from .rag.retrieval import SimpleRetriever
 from .tools.sqlite_tool import SQLiteTool
+from .tools.aggregates import default_sidecar_path
+from .tools.sql_validator import SQLValidator
 
 class AgentState(TypedDict):
     messages: List[Dict[str, Any]]
@@ -13,44 +21,137 @@ class AgentState(TypedDict):
     question_id: str
     classification: Optional[str]
     relevant_docs: List[Dict[str, Any]]
+    schema_info: Optional[str]
     sql_query: Optional[str]
+    sql_validation: Optional[Dict[str, Any]]
+    sql_feedback: Optional[str]
     sql_results: Optional[Dict[str, Any]]
     final_answer: Optional[Any]
     explanation: Optional[str]
+    valid: bool
+    answer_feedback: Optional[str]
     citations: List[str]
     confidence: float
     repair_count: int
+    repair_target: Optional[str]
+
+# Most prefetched retrieval hits kept; questions that never reach retrieval (deduplicated,
+# cancelled before starting) would otherwise leave theirs behind
+PREFETCH_LIMIT = 1024
+
+# DSPy modules built on first access; importing dspy costs about a second
+_LAZY_MODULES = {
+    "router": "Router",
+    "sql_generator": "SQLGenerator",
+    "answer_synthesizer": "AnswerSynthesizer",
+}
 
 class HybridAgent:
-    def __init__(self):
-        self.retriever = SimpleRetriever()
-        self.db_tool = SQLiteTool()
-        self.router = Router()
-        self.sql_generator = SQLGenerator()
-        self.answer_synthesizer = AnswerSynthesizer()
+    # Class names of the DSPy modules the agent runs; the keys accepted by module_lms
+    MODULE_NAMES = tuple(_LAZY_MODULES.values())
+
+    def __init__(self, max_llm_calls: Optional[int] = None, llm_cache: Optional[LLMCache] = None,
+                 fast_router_threshold: Optional[float] = 0.75, retrieval_mode: str = "tfidf",
+                 db_pool_size: int = 4, query_timeout: Optional[float] = 30.0,
+                 tracer: Optional[Tracer] = None, db_path: str = "data/northwind.sqlite",
+                 docs_dir: str = "docs", index_dir: Optional[str] = ".cache/retrieval_index",
+                 single_flight: bool = True, use_aggregates: bool = False,
+                 prompt_budgets: Optional[Dict[str, Dict[str, int]]] = None,
+                 sql_demos_path: Optional[str] = "data/sql_demos.jsonl", sql_demo_k: int = 3,
+                 sql_demo_index_dir: Optional[str] = ".cache/demo_index",
+                 lm: Optional[Any] = None, module_lms: Optional[Dict[str, Any]] = None):
+        self.retriever = SimpleRetriever(docs_dir=docs_dir, index_dir=index_dir, mode=retrieval_mode)
+        self.retrieval_top_k = 3
+        # Retrieval hits fetched ahead of time for a batch, keyed by question text
+        self._prefetched_hits = OrderedDict()
+        self._prefetch_lock = threading.Lock()
+        # Daily summary tables materialized next to the database and exposed to SQL generation
+        aggregates_path = default_sidecar_path(db_path) if use_aggregates else None
+        self.db_tool = SQLiteTool(db_path=db_path, pool_size=db_pool_size, query_timeout=query_timeout,
+                                  aggregates_path=aggregates_path)
+        self.sql_validator = SQLValidator(self.db_tool)
+        self.llm_cache = llm_cache
+        self.tracer = tracer or Tracer(enabled=False)
+        # Renders docs and SQL results into the LLM prompts within per-signature token budgets
+        self.prompts = PromptAssembler(prompt_budgets)
+        # Nearest question -> SQL pairs shown to the SQL generator as few-shot demos; None disables
+        self.demo_store = (DemoStore(sql_demos_path, index_dir=sql_demo_index_dir, k=sql_demo_k)
+                           if sql_demos_path and sql_demo_k > 0 else None)
+        # Local classifier tried before the LLM router; None disables it
+        self.fast_router = FastRouter(threshold=fast_router_threshold) if fast_router_threshold is not None else None
+        # Identical questions asked while one is running attach to it instead of rerunning the graph
+        self.flights = SingleFlight() if single_flight else None
+        # DSPy LM for every module, overridden per module class name (e.g. {"Router": small_lm});
+        # None falls back to the globally configured LM
+        self.lm = lm
+        self.module_lms = dict(module_lms or {})
         
-        # Build the graph
-        self.graph = self._build_graph()
+        # Bound the number of in-flight LLM calls when questions run concurrently
+        self._llm_slots = threading.BoundedSemaphore(max_llm_calls) if max_llm_calls else None
+        
+        # The graph and DSPy modules are built on first use (or by warmup)
+        self._graph = None
+        self._init_lock = threading.Lock()
+    
+    def __getattr__(self, name: str):
+        # Only reached for attributes not yet set: build a DSPy module on first access
+        if name not in _LAZY_MODULES:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        with self._init_lock:
+            if name not in self.__dict__:
+                from . import dspy_signatures
+                module_class = getattr(dspy_signatures, _LAZY_MODULES[name])
+                self.__dict__[name] = module_class(cache=self.llm_cache)
+        return self.__dict__[name]
+    
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._init_lock:
+                if self._graph is None:
+                    self._graph = self._build_graph()
+        return self._graph
+    
+    def warmup(self):
+        """Load every lazily initialized component now instead of on the first question"""
+        from .dspy_signatures import ensure_lm
+        self.graph
+        for name in _LAZY_MODULES:
+            getattr(self, name)
+        if self.lm is None and not set(self.MODULE_NAMES) <= set(self.module_lms):
+            ensure_lm()
+        if self.fast_router:
+            self.fast_router.warmup()
+        self.retriever.warmup()
+        if self.demo_store:
+            self.demo_store.warmup()
+        self.db_tool.get_schema_info()
     
     def _build_graph(self):
+        from langgraph.graph import StateGraph, START, END
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("router", self.route_question)
-        workflow.add_node("retriever", self.retrieve_docs)
-        workflow.add_node("generate_sql", self.generate_sql)
-        workflow.add_node("execute_sql", self.execute_sql)
-        workflow.add_node("synthesize_answer", self.synthesize_answer)
-        workflow.add_node("validate_output", self.validate_output)
-        workflow.add_node("repair", self.repair)
+        workflow.add_node("router", self.tracer.wrap_node("router", self.route_question))
+        workflow.add_node("retriever", self.tracer.wrap_node("retriever", self.retrieve_docs))
+        workflow.add_node("prepare_schema", self.tracer.wrap_node("prepare_schema", self.prepare_schema))
+        workflow.add_node("join_context", self.tracer.wrap_node("join_context", self.join_context))
+        workflow.add_node("generate_sql", self.tracer.wrap_node("generate_sql", self.generate_sql))
+        workflow.add_node("validate_sql", self.tracer.wrap_node("validate_sql", self.validate_sql))
+        workflow.add_node("execute_sql", self.tracer.wrap_node("execute_sql", self.execute_sql))
+        workflow.add_node("synthesize_answer", self.tracer.wrap_node("synthesize_answer", self.synthesize_answer))
+        workflow.add_node("validate_output", self.tracer.wrap_node("validate_output", self.validate_output))
+        workflow.add_node("repair", self.tracer.wrap_node("repair", self.repair))
         
-        # Set entry point
-        workflow.set_entry_point("router")
+        # Routing, retrieval and schema preparation are independent: run them in parallel
+        for branch in ("router", "retriever", "prepare_schema"):
+            workflow.add_edge(START, branch)
+        # Each branch writes its own state keys, so plain last-value channels merge them safely
+        workflow.add_edge(["router", "retriever", "prepare_schema"], "join_context")
         
         # Define edges
-        workflow.add_edge("router", "retriever")
         workflow.add_conditional_edges(
-            "retriever",
+            "join_context",
             self.decide_after_retrieval,
             {
                 "sql_only": "generate_sql",
@@ -58,7 +159,16 @@ class HybridAgent:
                 "hybrid": "generate_sql"
             }
         )
-        workflow.add_edge("generate_sql", "execute_sql")
+        workflow.add_edge("generate_sql", "validate_sql")
+        workflow.add_conditional_edges(
+            "validate_sql",
+            self.check_sql_validation,
+            {
+                "valid": "execute_sql",
+                "retry": "repair",
+                "fail": "execute_sql"
+            }
+        )
         workflow.add_conditional_edges(
             "execute_sql",
             self.check_sql_execution,
@@ -77,20 +187,64 @@ class HybridAgent:
                 "invalid": "repair"
             }
         )
-        workflow.add_edge("repair", "router")
+        # Resume at the node that failed; routing and retrieval are kept from the first pass
+        workflow.add_conditional_edges(
+            "repair",
+            self.decide_after_repair,
+            {
+                "generate_sql": "generate_sql",
+                "synthesize_answer": "synthesize_answer"
+            }
+        )
         
         return workflow.compile()
     
     def route_question(self, state: AgentState) -> AgentState:
         """Route question to appropriate processing"""
-        classification = self.router(question=state["question"])
+        if self.fast_router:
+            label = self.fast_router.route(state["question"])
+            if label:
+                return {"classification": label}
+        classification = self._call_llm(self.router, question=state["question"])
         return {"classification": classification.classification}
     
     def retrieve_docs(self, state: AgentState) -> AgentState:
         """Retrieve relevant documents"""
-        relevant_docs = self.retriever.retrieve(state["question"])
+        hits = self._take_prefetched(state["question"])
+        if hits is not None:
+            return {"relevant_docs": self.retriever.hits_to_docs(hits)}
+        relevant_docs = self.retriever.retrieve(state["question"], top_k=self.retrieval_top_k)
         return {"relevant_docs": relevant_docs}
     
+    def prefetch_docs(self, questions: List[str]):
+        """Retrieve documents for a whole batch of questions in one vectorized pass"""
+        with self._prefetch_lock:
+            pending = [q for q in dict.fromkeys(questions) if q not in self._prefetched_hits]
+        if pending:
+            hits = self.retriever.retrieve_many(pending, top_k=self.retrieval_top_k)
+            with self._prefetch_lock:
+                self._prefetched_hits.update(zip(pending, hits))
+                while len(self._prefetched_hits) > PREFETCH_LIMIT:
+                    self._prefetched_hits.popitem(last=False)
+    
+    def _take_prefetched(self, question: str):
+        """Remove and return a question's prefetched hits; each entry is used at most once"""
+        with self._prefetch_lock:
+            return self._prefetched_hits.pop(question, None)
+    
+    def prepare_schema(self, state: AgentState) -> AgentState:
+        """Load (cached) schema pruned to the question"""
+        # Runs before the route is known; a failure must not sink a rag-only question,
+        # and generate_sql loads the schema again (raising the real error) if SQL is needed
+        try:
+            return {"schema_info": self.db_tool.get_schema(question=state["question"])}
+        except Exception:
+            return {"schema_info": None}
+    
+    def join_context(self, state: AgentState) -> AgentState:
+        """Fan-in point for the routing, retrieval and schema branches"""
+        return {}
+    
     def decide_after_retrieval(self, state: AgentState) -> str:
         """Decide next step after retrieval"""
         if state["classification"] == "sql":
@@ -102,19 +256,50 @@ class HybridAgent:
     
     def generate_sql(self, state: AgentState) -> AgentState:
         """Generate SQL query"""
-        schema_info = self.db_tool.get_schema()
-        sql_result = self.sql_generator(
+        schema_info = state.get("schema_info") or self.db_tool.get_schema(question=state["question"])
+        inputs, saved = self.prompts.assemble("SQLGenerator", relevant_docs=state["relevant_docs"])
+        demos = self.demo_store.select(state["question"]) if self.demo_store else None
+        sql_result = self._call_llm(
+            self.sql_generator,
+            span_attrs={"prompt_tokens_saved": saved, "demos": len(demos or [])},
+            demos=demos,
             question=state["question"],
             schema_info=schema_info,
-            relevant_docs=state["relevant_docs"]
+            feedback=state.get("sql_feedback") or "",
+            **inputs
         )
         return {"sql_query": sql_result.sql_query}
     
+    def validate_sql(self, state: AgentState) -> AgentState:
+        """Check the generated SQL against the schema and its query plan before running it"""
+        report = self.sql_validator.validate(state["sql_query"])
+        return {
+            "sql_validation": report,
+            "sql_feedback": self.sql_validator.format_feedback(report) or None,
+            "repair_target": None if report["valid"] else "generate_sql"
+        }
+    
+    def check_sql_validation(self, state: AgentState) -> str:
+        """Check if the generated SQL passed validation"""
+        if state["sql_validation"]["valid"]:
+            return "valid"
+        elif state.get("repair_count", 0) < 2:
+            return "retry"
+        else:
+            return "fail"
+    
     def execute_sql(self, state: AgentState) -> AgentState:
         """Execute SQL query"""
         if state["sql_query"]:
             results = self.db_tool.execute_query(state["sql_query"])
-            return {"sql_results": results}
+            update = {"sql_results": results}
+            if not results["success"]:
+                update["repair_target"] = "generate_sql"
+                update["sql_feedback"] = (
+                    "The previous SQL query failed when executed:\n"
+                    f"- [execution_error] {results['error']}"
+                )
+            return update
         return {"sql_results": None}
     
     def check_sql_execution(self, state: AgentState) -> str:
@@ -128,11 +313,18 @@ class HybridAgent:
     
     def synthesize_answer(self, state: AgentState) -> AgentState:
         """Synthesize final answer"""
-        answer_result = self.answer_synthesizer(
-            question=state["question"],
+        inputs, saved = self.prompts.assemble(
+            "AnswerSynthesizer",
             sql_results=state.get("sql_results"),
-            relevant_docs=state["relevant_docs"],
-            format_hint=state["format_hint"]
+            relevant_docs=state["relevant_docs"]
+        )
+        answer_result = self._call_llm(
+            self.answer_synthesizer,
+            span_attrs={"prompt_tokens_saved": saved},
+            question=state["question"],
+            format_hint=state["format_hint"],
+            feedback=state.get("answer_feedback") or "",
+            **inputs
         )
         
         # Extract citations
@@ -147,7 +339,7 @@ class HybridAgent:
             citations.add(doc['id'])
         
         return {
-            "final_answer": answer_result.final_answer,
+            "final_answer": self._coerce_answer(answer_result.final_answer, state["format_hint"]),
             "explanation": answer_result.explanation,
             "citations": list(citations)
         }
@@ -158,7 +350,16 @@ class HybridAgent:
             state["final_answer"], 
             state["format_hint"]
         )
-        return {"valid": is_valid}
+        if is_valid:
+            return {"valid": True, "answer_feedback": None}
+        return {
+            "valid": False,
+            "answer_feedback": (
+                f"The previous answer {state['final_answer']!r} does not match "
+                f"the required format {state['format_hint']}. Return only a value of that format."
+            ),
+            "repair_target": "synthesize_answer"
+        }
     
     def check_output_validation(self, state: AgentState) -> str:
         """Check output validation result"""
@@ -172,6 +373,55 @@ class HybridAgent:
         repair_count = state.get("repair_count", 0) + 1
         return {"repair_count": repair_count}
     
+    def decide_after_repair(self, state: AgentState) -> str:
+        """Resume at the failing node: SQL problems regenerate SQL, format problems re-synthesize"""
+        return state.get("repair_target") or "generate_sql"
+    
+    def _call_llm(self, module, span_attrs: Optional[Dict[str, Any]] = None, **kwargs):
+        """Call a DSPy module, honouring the in-flight LLM call limit"""
+        if not self.tracer.enabled:
+            return self._invoke_llm(module, **kwargs)
+        with self.tracer.span(type(module).__name__, kind="llm", **(span_attrs or {})) as span:
+            prediction = self._invoke_llm(module, **kwargs)
+            span.set(**self._llm_usage(module, kwargs, prediction))
+        return prediction
+    
+    def _invoke_llm(self, module, **kwargs):
+        lm = self.module_lms.get(type(module).__name__, self.lm)
+        if lm is not None:
+            import dspy
+            with dspy.context(lm=lm):
+                return self._invoke_module(module, **kwargs)
+        return self._invoke_module(module, **kwargs)
+    
+    def _invoke_module(self, module, **kwargs):
+        if self._llm_slots is None:
+            return module(**kwargs)
+        with self._llm_slots:
+            return module(**kwargs)
+    
+    def _llm_usage(self, module, inputs: Dict[str, Any], prediction) -> Dict[str, Any]:
+        """Token counts and cache outcome of one module call"""
+        cache = getattr(module, "cache", None)
+        if cache is not None and cache.last_lookup_hit():
+            return {"cache_hit": True, "prompt_tokens": 0, "completion_tokens": 0}
+        usage = {}
+        try:
+            usage = prediction.get_lm_usage() or {}
+        except Exception:
+            pass
+        prompt_tokens = sum(u.get("prompt_tokens", 0) or 0 for u in usage.values())
+        completion_tokens = sum(u.get("completion_tokens", 0) or 0 for u in usage.values())
+        if prompt_tokens or completion_tokens:
+            return {"cache_hit": False, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        outputs = dict(prediction.items()) if hasattr(prediction, "items") else vars(prediction)
+        return {
+            "cache_hit": False,
+            "prompt_tokens": estimate_tokens(inputs),
+            "completion_tokens": estimate_tokens(outputs),
+            "tokens_estimated": True
+        }
+    
     def _extract_tables_from_sql(self, sql_query: str) -> List[str]:
         """Extract table names from SQL query"""
         tables = []
@@ -186,6 +436,24 @@ class HybridAgent:
         
         return tables
     
+    def _coerce_answer(self, answer: Any, format_hint: str) -> Any:
+        """Parse the LM's text answer into the hinted type; left as-is when it does not parse"""
+        if not isinstance(answer, str) or format_hint not in ("int", "float") and not format_hint.startswith(("{", "list[")):
+            return answer
+        text = answer.strip()
+        try:
+            if format_hint == "int":
+                value = float(text.replace(",", ""))
+                return int(value) if value.is_integer() else answer
+            if format_hint == "float":
+                return float(text.replace(",", ""))
+            try:
+                return json.loads(text)
+            except ValueError:
+                return ast.literal_eval(text)
+        except (ValueError, SyntaxError, TypeError):
+            return answer
+
     def _validate_answer_format(self, answer: Any, format_hint: str) -> bool:
         """Validate answer format matches the hint"""
         try:
@@ -201,26 +469,32 @@ class HybridAgent:
         except:
             return False
     
-    def run(self, question: str, format_hint: str, question_id: str) -> Dict[str, Any]:
-        """Run the agent for a single question"""
-        initial_state = {
+    def _initial_state(self, question: str, format_hint: str, question_id: str) -> AgentState:
+        """Build the initial graph state for a question"""
+        return {
             "messages": [],
             "question": question,
             "format_hint": format_hint,
             "question_id": question_id,
             "classification": None,
             "relevant_docs": [],
+            "schema_info": None,
             "sql_query": None,
+            "sql_validation": None,
+            "sql_feedback": None,
             "sql_results": None,
             "final_answer": None,
             "explanation": None,
+            "valid": False,
+            "answer_feedback": None,
             "citations": [],
             "confidence": 0.0,
-            "repair_count": 0
+            "repair_count": 0,
+            "repair_target": None
         }
-        
-        final_state = self.graph.invoke(initial_state)
-        
+    
+    def _build_result(self, final_state: AgentState, question_id: str) -> Dict[str, Any]:
+        """Convert a final graph state into an output record"""
         # Calculate confidence
         confidence = self._calculate_confidence(final_state)
         
@@ -233,6 +507,46 @@ class HybridAgent:
             "citations": final_state["citations"]
         }
     
+    def _run(self, question: str, format_hint: str, question_id: str) -> Dict[str, Any]:
+        initial_state = self._initial_state(question, format_hint, question_id)
+        final_state = self.graph.invoke(initial_state)
+        return self._build_result(final_state, question_id)
+    
+    async def _arun(self, question: str, format_hint: str, question_id: str) -> Dict[str, Any]:
+        initial_state = self._initial_state(question, format_hint, question_id)
+        final_state = await self.graph.ainvoke(initial_state)
+        return self._build_result(final_state, question_id)
+    
+    @staticmethod
+    def _for_caller(result: Dict[str, Any], question_id: str) -> Dict[str, Any]:
+        """Copy of a shared result under another caller's question id"""
+        return dict(result, id=question_id, citations=list(result["citations"]))
+    
+    def run(self, question: str, format_hint: str, question_id: str) -> Dict[str, Any]:
+        """Run the agent for a single question"""
+        try:
+            if self.flights is None:
+                return self._run(question, format_hint, question_id)
+            result, shared = self.flights.do(
+                flight_key(question, format_hint), lambda: self._run(question, format_hint, question_id)
+            )
+            return self._for_caller(result, question_id) if shared else result
+        finally:
+            # Followers, failures and timed-out runs never consume their prefetched hits
+            self._take_prefetched(question)
+    
+    async def arun(self, question: str, format_hint: str, question_id: str) -> Dict[str, Any]:
+        """Run the agent for a single question through the graph's async invoke path"""
+        try:
+            if self.flights is None:
+                return await self._arun(question, format_hint, question_id)
+            result, shared = await self.flights.ado(
+                flight_key(question, format_hint), lambda: self._arun(question, format_hint, question_id)
+            )
+            return self._for_caller(result, question_id) if shared else result
+        finally:
+            self._take_prefetched(question)
+    
     def _calculate_confidence(self, state: AgentState) -> float:
         """Calculate confidence score"""
         confidence = 1.0
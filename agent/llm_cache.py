@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+
+# Puts between full eviction passes (TTL purge and an exact recount) when the cache is not over capacity
+EVICT_INTERVAL = 1000
+
+class LLMCache:
+    """On-disk, content-addressed cache of LLM module outputs backed by SQLite"""
+
+    def __init__(self, path: str = ".cache/llm_cache.sqlite", max_entries: int = 50000,
+                 ttl_seconds: Optional[float] = None, bypass: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # When bypassing, lookups always miss but fresh outputs are still stored
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Per-thread outcome of the latest lookup, for tracing
+        self._local = threading.local()
+        self._conn = None
+        # Entry count kept up to date on put, so eviction does not count the table every time
+        self._entries = 0
+        self._puts_since_evict = 0
+        self._connect()
+
+    def _connect(self):
+        """Open the cache database and create its table"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed_at)"
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(signature: str, inputs: Dict[str, Any], model: str,
+                 settings: Optional[Dict[str, Any]] = None) -> str:
+        """Hash a signature, its inputs, the model name and call settings (demos, temperature) into a cache key"""
+        payload = json.dumps(
+            {"signature": signature, "inputs": inputs, "model": model, "settings": settings or {}},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached outputs for a key, or None on a miss"""
+        self._local.hit = False
+        if self.bypass:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        self._local.hit = True
+        return json.loads(row[0])
+
+    def last_lookup_hit(self) -> bool:
+        """Whether this thread's most recent lookup was a hit"""
+        return getattr(self._local, 'hit', False)
+
+    def put(self, key: str, outputs: Dict[str, Any]):
+        """Store outputs under a key, evicting least recently used entries"""
+        now = time.time()
+        value = json.dumps(outputs, default=str)
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            if not exists:
+                self._entries += 1
+            self._puts_since_evict += 1
+            if self._entries > self.max_entries or self._puts_since_evict >= EVICT_INTERVAL:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop expired entries and trim the cache to max_entries"""
+        self._puts_since_evict = 0
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+        # Recount: other processes may share the cache file
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            count = self.max_entries
+        self._entries = count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._entries = 0
+
+    def close(self):
+        """Close the cache database"""
+        if self._conn:
+            self._conn.close()
+
+    def __deepcopy__(self, memo):
+        # DSPy optimizers deep-copy modules; copies share the same cache
+        return self
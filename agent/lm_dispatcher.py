@@ -0,0 +1,195 @@
+import json
+import time
+import asyncio
+import http.client
+import threading
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Union, Tuple
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+import dspy
+
+# HTTP statuses worth retrying on another server: missing model, overload and server errors
+_FAILOVER_STATUSES = {404, 408, 429, 500, 502, 503, 504}
+
+# Generation settings forwarded to the chat completions API
+_REQUEST_KEYS = ("temperature", "max_tokens", "top_p", "stop", "seed")
+
+class LMUnavailable(RuntimeError):
+    """Raised when no endpoint could answer a call"""
+
+class Endpoint:
+    """One OpenAI-compatible chat completions server (Ollama, llama.cpp, vLLM, ...)"""
+
+    def __init__(self, url: str, models: Optional[List[str]] = None, api_key: Optional[str] = None):
+        self.url = url.rstrip("/")
+        # Models this server hosts; None means it is asked for any model
+        self.models = set(models) if models else None
+        self.api_key = api_key
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        # Monotonic time before which the endpoint is skipped after a failure
+        self.unhealthy_until = 0.0
+        # Same, per model, after the server said it does not have that model (HTTP 404)
+        self.model_unhealthy_until: Dict[str, float] = {}
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def healthy(self, now: float, model: Optional[str] = None) -> bool:
+        return now >= self.unhealthy_until and now >= self.model_unhealthy_until.get(model, 0.0)
+
+    def ready_at(self, model: str) -> float:
+        return max(self.unhealthy_until, self.model_unhealthy_until.get(model, 0.0))
+
+class EndpointPool:
+    """Shared load and health bookkeeping for a set of endpoints"""
+
+    def __init__(self, endpoints: List[Union[str, Endpoint]], cooldown: float = 30.0):
+        self.endpoints = [e if isinstance(e, Endpoint) else Endpoint(e) for e in endpoints]
+        if not self.endpoints:
+            raise ValueError("At least one LM endpoint is required")
+        # Seconds a failed endpoint is skipped before it is tried again
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def acquire(self, model: str, tried: set) -> Optional[Endpoint]:
+        """Pick and reserve the least-loaded healthy endpoint serving the model"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.serves(model) and id(e) not in tried]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.healthy(now, model)]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: (e.in_flight, e.calls))
+            else:
+                # Everything is cooling down: try the one whose cooldown ends first
+                endpoint = min(candidates, key=lambda e: e.ready_at(model))
+            if tried:
+                self.failovers += 1
+            endpoint.in_flight += 1
+            endpoint.calls += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, ok: bool, model: Optional[str] = None, model_missing: bool = False):
+        """Return a reserved endpoint; a failure puts the server, or with model_missing only that model, in cooldown"""
+        with self._lock:
+            endpoint.in_flight -= 1
+            if ok:
+                endpoint.unhealthy_until = 0.0
+                endpoint.model_unhealthy_until.pop(model, None)
+            else:
+                endpoint.failures += 1
+                until = time.monotonic() + self.cooldown
+                if model_missing:
+                    endpoint.model_unhealthy_until[model] = until
+                else:
+                    endpoint.unhealthy_until = until
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-endpoint load, call and failure counters"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "failovers": self.failovers,
+                "endpoints": [
+                    {"url": e.url, "in_flight": e.in_flight, "calls": e.calls,
+                     "failures": e.failures, "healthy": e.healthy(now)}
+                    for e in self.endpoints
+                ]
+            }
+
+class LMDispatcher(dspy.BaseLM):
+    """DSPy LM spreading calls over several model servers: least-loaded healthy endpoint first,
+    failing over to the next on timeouts, connection errors and overload"""
+
+    def __init__(self, endpoints: Union[EndpointPool, List[Union[str, Endpoint]]], model: str,
+                 timeout: float = 120.0, cooldown: float = 30.0, temperature: float = 0.0, max_tokens: int = 1000):
+        super().__init__(model=model, temperature=temperature, max_tokens=max_tokens, cache=False)
+        self.pool = endpoints if isinstance(endpoints, EndpointPool) else EndpointPool(endpoints, cooldown)
+        # Seconds one request may take before the next endpoint is tried
+        self.timeout = timeout
+
+    def with_model(self, model: str) -> "LMDispatcher":
+        """Dispatcher for another model over the same endpoints, sharing their load and health"""
+        return LMDispatcher(self.pool, model, self.timeout, temperature=self.kwargs.get("temperature"),
+                            max_tokens=self.kwargs.get("max_tokens"))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+    def _post(self, endpoint: Endpoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {"Content-Type": "application/json"}
+        if endpoint.api_key:
+            headers["Authorization"] = f"Bearer {endpoint.api_key}"
+        request = Request(f"{endpoint.url}/v1/chat/completions", data=json.dumps(payload).encode("utf-8"),
+                          headers=headers)
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def forward(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        options = {**self.kwargs, **kwargs}
+        payload = {"model": self.model, "messages": messages}
+        payload.update({key: options[key] for key in _REQUEST_KEYS if options.get(key) is not None})
+
+        tried = set()
+        last_error = None
+        while True:
+            endpoint = self.pool.acquire(self.model, tried)
+            if endpoint is None:
+                raise LMUnavailable(f"No endpoint could serve {self.model}: {last_error}")
+            tried.add(id(endpoint))
+            # Released whatever happens below, so no error leaves the endpoint looking busy
+            ok = False
+            model_missing = False
+            try:
+                response = self._to_response(self._post(endpoint, payload))
+                ok = True
+                return response
+            except HTTPError as e:
+                if e.code not in _FAILOVER_STATUSES:
+                    # The server is fine; the request itself was rejected
+                    ok = True
+                    raise
+                model_missing = e.code == 404
+                last_error = f"{endpoint.url} returned HTTP {e.code}"
+            except (http.client.HTTPException, OSError, ValueError) as e:
+                # Timeouts, refused or dropped connections, truncated or malformed bodies
+                last_error = f"{endpoint.url}: {e}"
+            finally:
+                self.pool.release(endpoint, ok, self.model, model_missing)
+
+    async def aforward(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, **kwargs):
+        return await asyncio.to_thread(self.forward, prompt, messages, **kwargs)
+
+    def _to_response(self, body: Dict[str, Any]):
+        """OpenAI-shaped response object as DSPy expects from forward()"""
+        choices = []
+        for choice in body.get("choices", []):
+            message = choice.get("message") or {}
+            choices.append(SimpleNamespace(
+                message=SimpleNamespace(content=message.get("content") or "", tool_calls=None),
+                finish_reason=choice.get("finish_reason"),
+                logprobs=None
+            ))
+        return SimpleNamespace(choices=choices, usage=dict(body.get("usage") or {}), model=body.get("model", self.model))
+
+def build_lms(endpoints: List[str], model: str, module_models: Optional[List[str]] = None,
+              timeout: float = 120.0) -> Tuple[LMDispatcher, Dict[str, LMDispatcher]]:
+    """Default dispatcher plus per-module ones from 'Module=model' specs, all sharing one endpoint pool"""
+    from .graph_hybrid import HybridAgent
+    known = sorted(HybridAgent.MODULE_NAMES)
+    lm = LMDispatcher(endpoints, model, timeout=timeout)
+    module_lms = {}
+    for spec in module_models or []:
+        name, sep, module_model = spec.partition("=")
+        if not sep or not name.strip() or not module_model.strip():
+            raise ValueError(f"Expected Module=model, got {spec!r}")
+        if name.strip() not in known:
+            raise ValueError(f"Unknown module {name.strip()!r} in {spec!r}; expected one of {', '.join(known)}")
+        module_lms[name.strip()] = lm.with_model(module_model.strip())
+    return lm, module_lms
@@ -0,0 +1,141 @@
+import re
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from .tracing import estimate_tokens
+
+# Token budget per rendered input field of each signature; question, schema and feedback are passed as-is
+DEFAULT_BUDGETS = {
+    "SQLGenerator": {"relevant_docs": 400},
+    "AnswerSynthesizer": {"relevant_docs": 600, "sql_results": 800}
+}
+
+# Chunks sharing this fraction of the smaller chunk's words are treated as the same passage
+DUPLICATE_OVERLAP = 0.8
+
+_WORD_RE = re.compile(r'\w+')
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to roughly `tokens` tokens on a word boundary"""
+    limit = max(1, tokens) * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0] + ' ...'
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 4))
+    return "NULL" if value is None else str(value)
+
+class PromptAssembler:
+    """Renders retrieved chunks and SQL results compactly within per-signature token budgets"""
+
+    def __init__(self, budgets: Optional[Dict[str, Dict[str, int]]] = None):
+        self.budgets = {name: dict(fields) for name, fields in DEFAULT_BUDGETS.items()}
+        for name, fields in (budgets or {}).items():
+            self.budgets.setdefault(name, {}).update(fields)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.raw_tokens = 0
+        self.prompt_tokens = 0
+
+    def assemble(self, signature: str, **fields) -> Tuple[Dict[str, str], int]:
+        """Render relevant_docs / sql_results for a signature; returns the inputs and tokens saved"""
+        budgets = self.budgets.get(signature, {})
+        rendered = {}
+        raw_tokens = prompt_tokens = 0
+        for name, value in fields.items():
+            budget = budgets.get(name)
+            if name == "relevant_docs":
+                rendered[name] = self.render_docs(value, budget)
+            elif name == "sql_results":
+                rendered[name] = self.render_results(value, budget)
+            else:
+                raise ValueError(f"No renderer for prompt field {name!r}")
+            raw_tokens += estimate_tokens(value)
+            prompt_tokens += estimate_tokens(rendered[name])
+        saved = max(0, raw_tokens - prompt_tokens)
+        with self._lock:
+            self.calls += 1
+            self.raw_tokens += raw_tokens
+            self.prompt_tokens += prompt_tokens
+        return rendered, saved
+
+    @staticmethod
+    def _rank(doc: Dict[str, Any]) -> float:
+        # Hybrid retrieval orders by the fused score; 'score' alone is the cosine similarity
+        return doc.get('fused_score', doc.get('score', 0.0))
+
+    def render_docs(self, docs: List[Dict[str, Any]], budget: Optional[int] = None) -> str:
+        """Best-first '[id] text' passages, deduplicated, lowest-scoring dropped to fit the budget"""
+        if not docs:
+            return "No relevant documents"
+        kept, kept_words, seen_ids = [], [], set()
+        for doc in sorted(docs, key=self._rank, reverse=True):
+            words = set(_WORD_RE.findall(doc['content'].lower()))
+            if doc['id'] in seen_ids or any(
+                    len(words & other) >= DUPLICATE_OVERLAP * max(1, min(len(words), len(other)))
+                    for other in kept_words):
+                continue
+            seen_ids.add(doc['id'])
+            kept.append(doc)
+            kept_words.append(words)
+
+        passages = [f"[{doc['id']}] {' '.join(doc['content'].split())}" for doc in kept]
+        if budget is not None:
+            while len(passages) > 1 and estimate_tokens("\n".join(passages)) > budget:
+                passages.pop()
+            passages[0] = _truncate(passages[0], budget)
+        return "\n".join(passages)
+
+    def render_results(self, results: Optional[Dict[str, Any]], budget: Optional[int] = None) -> str:
+        """Pipe-separated result table; large results keep their first rows plus per-column totals"""
+        if not results:
+            return "No SQL results"
+        if not results["success"]:
+            return f"Query failed: {results['error']}"
+        rows = results["rows"]
+        header = " | ".join(results["columns"])
+        lines = [" | ".join(_format_value(value) for value in row) for row in rows]
+        table = "\n".join([header] + lines) if lines else f"{header}\n(no rows)"
+        if budget is None or estimate_tokens(table) <= budget:
+            return table
+
+        # Column totals cover the fetched rows, which are all rows unless the database tool capped them
+        if results.get("truncated"):
+            count = results["row_count"]
+            if not results.get("row_count_exact", True):
+                count = f"at least {count}"
+            summary = [f"{count} rows; totals below cover only the first {len(rows)} (capped by the database tool)"]
+        else:
+            summary = [f"{len(rows)} rows; totals below cover all of them"]
+        for i, column in enumerate(results["columns"]):
+            values = [row[i] for row in rows if isinstance(row[i], (int, float)) and not isinstance(row[i], bool)]
+            if values and len(values) == len([row for row in rows if row[i] is not None]):
+                total = sum(values)
+                summary.append(
+                    f"{column}: min={_format_value(min(values))} max={_format_value(max(values))} "
+                    f"sum={_format_value(total)} avg={_format_value(total / len(values))}"
+                )
+        summary = "\n".join(summary)
+
+        # First rows keep the query's ORDER BY, so they are the ones worth showing
+        shown = [header]
+        remaining = budget - estimate_tokens(summary) - 8
+        for line in lines:
+            cost = estimate_tokens(line + "\n")
+            if cost > remaining:
+                break
+            shown.append(line)
+            remaining -= cost
+        omitted = len(lines) - (len(shown) - 1)
+        return "\n".join(shown + [f"... {omitted} more rows", summary])
+
+    def stats(self) -> Dict[str, Any]:
+        """Return rendered vs. raw token estimates across all assembled prompts"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "raw_tokens": self.raw_tokens,
+                "prompt_tokens": self.prompt_tokens,
+                "saved_tokens": max(0, self.raw_tokens - self.prompt_tokens)
+            }
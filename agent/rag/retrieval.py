@@ -1,59 +1,408 @@
 import os
 import re
-from typing import List, Dict, Any
+import json
+import hashlib
+import tempfile
+import threading
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Callable
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix, vstack
+
+INDEX_VERSION = 1
+
+# Upper bound on dense score cells (chunks x queries) materialized per block
+SCORE_BLOCK_CELLS = 4_000_000
+
+class RetrievalHit(NamedTuple):
+    """Lightweight reference to a retrieved chunk"""
+    index: int
+    score: float
+    bm25_score: Optional[float] = None
+    fused_score: Optional[float] = None
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n highest scores along the last axis, best first"""
+    n = min(n, scores.shape[-1])
+    if n <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    candidates = np.argpartition(-scores, n - 1, axis=-1)[..., :n]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=-1)
+
+def write_file_atomic(path: str, write: Callable):
+    """Write a file through a temporary path so readers never see partial files"""
+    # A unique temp name per writer: processes saving the same index must not share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def write_json_atomic(path: str, value: Any):
+    write_file_atomic(path, lambda f: f.write(json.dumps(value).encode('utf-8')))
+
+def save_index_files(index_dir: str, documents: Dict[str, Any], arrays: Dict[str, np.ndarray],
+                     manifest: Dict[str, Any]):
+    """Persist an index as JSON documents and .npy arrays, each replaced atomically, manifest last"""
+    os.makedirs(index_dir, exist_ok=True)
+    manifest_path = os.path.join(index_dir, 'manifest.json')
+    # Drop the old manifest first so an interrupted save leaves no index that looks complete
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for name, value in documents.items():
+        write_json_atomic(os.path.join(index_dir, name), value)
+    for name, array in arrays.items():
+        write_file_atomic(os.path.join(index_dir, f'{name}.npy'), lambda f: np.save(f, np.asarray(array)))
+    # The manifest is what marks the index as complete
+    write_json_atomic(manifest_path, manifest)
 
 class SimpleRetriever:
-    def __init__(self, docs_dir: str = "docs"):
+    def __init__(self, docs_dir: str = "docs", index_dir: Optional[str] = ".cache/retrieval_index",
+                 mode: str = "tfidf", fusion: str = "rrf", fusion_weight: float = 0.5,
+                 rrf_k: int = 60, bm25_k1: float = 1.5, bm25_b: float = 0.75, bm25_epsilon: float = 0.25):
         self.docs_dir = docs_dir
+        # Directory holding the persisted index; None keeps everything in memory
+        self.index_dir = index_dir
+        # 'tfidf' ranks by cosine similarity; 'hybrid' fuses it with BM25
+        if mode not in ('tfidf', 'hybrid'):
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        if fusion not in ('rrf', 'weighted'):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        self.mode = mode
+        self.fusion = fusion
+        self.fusion_weight = fusion_weight
+        self.rrf_k = rrf_k
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        self.bm25_epsilon = bm25_epsilon
+        self.bm25_matrix = None
         self.chunks = []
-        self.vectorizer = TfidfVectorizer(stop_words='english')
+        # Only the analyzer is used, so tokenization matches a fitted TfidfVectorizer;
+        # built on first load so constructing a retriever does not import scikit-learn
+        self.vectorizer = None
         self.tfidf_matrix = None
-        
+        self.vocabulary = {}
+        self.idf = None
+        self.counts_matrix = None
+        self.manifest = {}
+        self._analyzer = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def _chunk_file(self, filename: str, content: str) -> List[Dict[str, Any]]:
+        """Simple paragraph-based chunking"""
+        chunks = []
+        paragraphs = re.split(r'\n\s*\n', content)
+        for i, para in enumerate(paragraphs):
+            if para.strip():
+                chunks.append({
+                    'id': f"{filename.replace('.md', '')}::chunk{i}",
+                    'content': para.strip(),
+                    'source': filename,
+                    'chunk_index': i
+                })
+        return chunks
+
+    def _count_terms(self, texts: List[str]) -> csr_matrix:
+        """Term-count matrix for texts, growing the vocabulary as needed"""
+        data, indices, indptr = [], [], [0]
+        for text in texts:
+            counts = {}
+            for token in self._analyzer(text):
+                j = self.vocabulary.get(token)
+                if j is None:
+                    j = self.vocabulary[token] = len(self.vocabulary)
+                counts[j] = counts.get(j, 0) + 1
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(texts), len(self.vocabulary))
+        )
+
+    def _compute_tfidf(self):
+        """Derive idf and the l2-normalized TF-IDF matrix from raw term counts"""
+        counts = self.counts_matrix
+        n_docs = counts.shape[0]
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        # Smoothed idf, as in TfidfVectorizer; terms no longer in any chunk get zero weight
+        self.idf = np.where(df > 0, np.log((1 + n_docs) / (1 + df)) + 1.0, 0.0)
+        weighted = counts.data * self.idf[counts.indices]
+        row_ids = np.repeat(np.arange(n_docs), np.diff(counts.indptr))
+        norms = np.sqrt(np.bincount(row_ids, weights=weighted ** 2, minlength=n_docs))
+        norms[norms == 0] = 1.0
+        self.tfidf_matrix = csr_matrix(
+            (weighted / norms[row_ids], counts.indices, counts.indptr), shape=counts.shape
+        )
+
+    def _compute_bm25(self):
+        """Precompute per-chunk BM25 (Okapi) term weights so scoring is one sparse product"""
+        counts = self.counts_matrix
+        n_docs = counts.shape[0]
+        if n_docs == 0:
+            self.bm25_matrix = counts
+            return
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        present = df > 0
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        # Same floor as rank_bm25.BM25Okapi for terms in more than half the chunks
+        average_idf = idf[present].mean() if present.any() else 0.0
+        idf = np.where(idf < 0, self.bm25_epsilon * average_idf, idf)
+        idf[~present] = 0.0
+
+        doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+        avg_length = doc_lengths.mean() or 1.0
+        row_ids = np.repeat(np.arange(n_docs), np.diff(counts.indptr))
+        tf = counts.data
+        length_norm = self.bm25_k1 * (1 - self.bm25_b + self.bm25_b * doc_lengths[row_ids] / avg_length)
+        weights = idf[counts.indices] * tf * (self.bm25_k1 + 1) / (tf + length_norm)
+        self.bm25_matrix = csr_matrix((weights, counts.indices, counts.indptr), shape=counts.shape)
+
+    def _file_state(self, filepath: str, previous: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Return the manifest entry for a file and whether its content changed"""
+        stat = os.stat(filepath)
+        if previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+            return previous, False
+        with open(filepath, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': digest}
+        return entry, not previous or previous['sha1'] != digest
+
     def load_documents(self):
-        """Load and chunk documents"""
-        self.chunks = []
-        chunk_id = 0
-        
-        for filename in os.listdir(self.docs_dir):
-            if filename.endswith('.md'):
-                filepath = os.path.join(self.docs_dir, filename)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Simple paragraph-based chunking
-                paragraphs = re.split(r'\n\s*\n', content)
-                for i, para in enumerate(paragraphs):
-                    if para.strip():
-                        self.chunks.append({
-                            'id': f"{filename.replace('.md', '')}::chunk{i}",
-                            'content': para.strip(),
-                            'source': filename,
-                            'chunk_index': i
-                        })
-                        chunk_id += 1
-        
-        # Create TF-IDF matrix
-        texts = [chunk['content'] for chunk in self.chunks]
-        self.tfidf_matrix = self.vectorizer.fit_transform(texts)
-    
+        """Load and chunk documents, reusing the persisted index for unchanged files"""
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self.vectorizer = TfidfVectorizer(stop_words='english')
+            self._analyzer = self.vectorizer.build_analyzer()
+        if not self._load_index():
+            self.chunks = []
+            self.vocabulary = {}
+            self.counts_matrix = None
+            self.manifest = {}
+
+        filenames = sorted(f for f in os.listdir(self.docs_dir) if f.endswith('.md'))
+        manifest = {}
+        changed = []
+        for filename in filenames:
+            entry, is_changed = self._file_state(
+                os.path.join(self.docs_dir, filename), self.manifest.get(filename)
+            )
+            manifest[filename] = entry
+            if is_changed:
+                changed.append(filename)
+        removed = set(self.manifest) - set(manifest)
+
+        if changed or removed or self.tfidf_matrix is None:
+            # Keep rows for unchanged files, re-chunk and re-count only the rest
+            stale = set(changed) | removed
+            keep = [i for i, chunk in enumerate(self.chunks) if chunk['source'] not in stale]
+            new_chunks = []
+            for filename in changed:
+                with open(os.path.join(self.docs_dir, filename), 'r', encoding='utf-8') as f:
+                    new_chunks.extend(self._chunk_file(filename, f.read()))
+
+            new_counts = self._count_terms([chunk['content'] for chunk in new_chunks])
+            n_terms = len(self.vocabulary)
+            parts = []
+            if self.counts_matrix is not None and keep:
+                kept = self.counts_matrix[keep]
+                parts.append(csr_matrix((kept.data, kept.indices, kept.indptr), shape=(len(keep), n_terms)))
+            parts.append(new_counts)
+            self.counts_matrix = vstack(parts, format='csr') if len(parts) > 1 else new_counts
+            self.counts_matrix.indices = self.counts_matrix.indices.astype(np.int32, copy=False)
+            self.counts_matrix.indptr = self.counts_matrix.indptr.astype(np.int32, copy=False)
+            self.chunks = [self.chunks[i] for i in keep] + new_chunks
+            self._compute_tfidf()
+            self.manifest = manifest
+            self._save_index()
+        elif manifest != self.manifest:
+            # Files were touched without content changes; just record the new mtimes
+            self.manifest = manifest
+            self._save_manifest()
+        if self.mode == 'hybrid':
+            self._compute_bm25()
+        self._loaded = True
+
+    def _index_path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _load_index(self) -> bool:
+        """Load the persisted index, memory-mapping its arrays; False if absent or stale"""
+        if not self.index_dir or not os.path.exists(self._index_path('manifest.json')):
+            return False
+        try:
+            with open(self._index_path('manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != INDEX_VERSION or manifest.get('docs_dir') != os.path.abspath(self.docs_dir):
+                return False
+            with open(self._index_path('chunks.json'), 'r', encoding='utf-8') as f:
+                chunks = json.load(f)
+            with open(self._index_path('vocabulary.json'), 'r', encoding='utf-8') as f:
+                terms = json.load(f)
+            arrays = {
+                name: np.load(self._index_path(f'{name}.npy'), mmap_mode='r')
+                for name in ('counts', 'tfidf', 'indices', 'indptr', 'idf')
+            }
+            # Files from different saves (e.g. an interrupted one) must not be combined
+            shape = (len(chunks), len(terms))
+            nnz = manifest.get('nnz')
+            if (manifest.get('chunks'), manifest.get('terms')) != shape or len(arrays['idf']) != shape[1] \
+                    or len(arrays['indptr']) != shape[0] + 1 or int(arrays['indptr'][-1]) != nnz \
+                    or not len(arrays['counts']) == len(arrays['tfidf']) == len(arrays['indices']) == nnz:
+                return False
+            # Counts and TF-IDF share the same sparsity structure
+            counts_matrix = csr_matrix((arrays['counts'], arrays['indices'], arrays['indptr']), shape=shape)
+            tfidf_matrix = csr_matrix((arrays['tfidf'], arrays['indices'], arrays['indptr']), shape=shape)
+        except (OSError, ValueError, KeyError, IndexError):
+            return False
+
+        self.chunks = chunks
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.manifest = manifest['files']
+        self.idf = arrays['idf']
+        self.counts_matrix = counts_matrix
+        self.tfidf_matrix = tfidf_matrix
+        return True
+
+    def _manifest_data(self) -> Dict[str, Any]:
+        return {
+            'version': INDEX_VERSION,
+            'docs_dir': os.path.abspath(self.docs_dir),
+            'files': self.manifest,
+            # Shapes of the saved arrays, checked on load
+            'chunks': len(self.chunks),
+            'terms': len(self.vocabulary),
+            'nnz': int(self.tfidf_matrix.nnz)
+        }
+
+    def _save_manifest(self):
+        if not self.index_dir:
+            return
+        write_json_atomic(self._index_path('manifest.json'), self._manifest_data())
+
+    def _save_index(self):
+        """Persist chunks, vocabulary and sparse matrices"""
+        if not self.index_dir:
+            return
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        arrays = {
+            'counts': self.counts_matrix.data,
+            'tfidf': self.tfidf_matrix.data,
+            'indices': self.tfidf_matrix.indices,
+            'indptr': self.tfidf_matrix.indptr,
+            'idf': self.idf
+        }
+        save_index_files(self.index_dir, {'chunks.json': self.chunks, 'vocabulary.json': terms}, arrays,
+                         self._manifest_data())
+
+    def warmup(self):
+        """Load the index now instead of on the first query"""
+        self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load_documents()
+
+    def _query_counts(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vocabulary indices and raw counts of the query's in-vocabulary terms"""
+        counts = {}
+        for token in self._analyzer(query):
+            j = self.vocabulary.get(token)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return indices, values
+
+    def _query_matrix(self, queries: List[str], tfidf: bool = True) -> csr_matrix:
+        """One row per query: l2-normalized TF-IDF weights, or raw counts for BM25"""
+        indices, data, indptr = [], [], [0]
+        for query in queries:
+            query_indices, query_counts = self._query_counts(query)
+            indices.append(query_indices)
+            data.append(query_counts)
+            indptr.append(indptr[-1] + len(query_indices))
+        indices = np.concatenate(indices)
+        data = np.concatenate(data)
+        if tfidf:
+            data = data * self.idf[indices]
+            row_ids = np.repeat(np.arange(len(queries)), np.diff(indptr))
+            norms = np.sqrt(np.bincount(row_ids, weights=data ** 2, minlength=len(queries)))
+            norms[norms == 0] = 1.0
+            data /= norms[row_ids]
+        return csr_matrix((data, indices, np.array(indptr)), shape=(len(queries), len(self.vocabulary)))
+
+    def _fuse(self, tfidf_scores: np.ndarray, bm25_scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Combine TF-IDF and BM25 scores (one row per query) into ranking scores"""
+        if self.fusion == 'weighted':
+            tfidf_max = tfidf_scores.max(axis=-1, keepdims=True)
+            bm25_max = bm25_scores.max(axis=-1, keepdims=True)
+            tfidf_max[tfidf_max == 0] = 1.0
+            bm25_max[bm25_max == 0] = 1.0
+            return self.fusion_weight * tfidf_scores / tfidf_max + (1 - self.fusion_weight) * bm25_scores / bm25_max
+
+        # Reciprocal rank fusion over each ranking's head; deeper ranks contribute ~nothing
+        depth = max(top_k * 10, 50)
+        fused = np.zeros_like(tfidf_scores)
+        for scores in (tfidf_scores, bm25_scores):
+            order = top_n(scores, depth)
+            reciprocal = 1.0 / (self.rrf_k + np.arange(1, order.shape[-1] + 1))
+            contribution = np.where(np.take_along_axis(scores, order, axis=-1) > 0, reciprocal, 0.0)
+            np.put_along_axis(fused, order, np.take_along_axis(fused, order, axis=-1) + contribution, axis=-1)
+        return fused
+
+    def retrieve_many(self, queries: List[str], top_k: int = 3) -> List[List[RetrievalHit]]:
+        """Retrieve top-k chunk references for many queries with one sparse product per block"""
+        self._ensure_loaded()
+        if not self.chunks or not queries:
+            return [[] for _ in queries]
+
+        hybrid = self.mode == 'hybrid'
+        tfidf_queries = self._query_matrix(queries)
+        bm25_queries = self._query_matrix(queries, tfidf=False) if hybrid else None
+        block = max(1, SCORE_BLOCK_CELLS // len(self.chunks))
+
+        results = []
+        for start in range(0, len(queries), block):
+            stop = start + block
+            similarities = (self.tfidf_matrix @ tfidf_queries[start:stop].T).toarray().T
+            ranking = similarities
+            if hybrid:
+                bm25_scores = (self.bm25_matrix @ bm25_queries[start:stop].T).toarray().T
+                ranking = self._fuse(similarities, bm25_scores, top_k)
+
+            top_indices = top_n(ranking, top_k)
+            for row, indices in enumerate(top_indices.tolist()):
+                if hybrid:
+                    results.append([
+                        RetrievalHit(idx, float(similarities[row, idx]),
+                                     float(bm25_scores[row, idx]), float(ranking[row, idx]))
+                        for idx in indices
+                    ])
+                else:
+                    results.append([RetrievalHit(idx, float(similarities[row, idx])) for idx in indices])
+        return results
+
+    def hits_to_docs(self, hits: List[RetrievalHit]) -> List[Dict[str, Any]]:
+        """Materialize chunk dicts (with scores) for retrieval hits"""
+        docs = []
+        for hit in hits:
+            chunk = self.chunks[hit.index].copy()
+            # 'score' stays the cosine similarity so downstream thresholds keep their meaning
+            chunk['score'] = hit.score
+            if hit.fused_score is not None:
+                chunk['bm25_score'] = hit.bm25_score
+                chunk['fused_score'] = hit.fused_score
+            docs.append(chunk)
+        return docs
+
     def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Retrieve top-k relevant chunks"""
-        if not self.chunks:
-            self.load_documents()
-        
-        query_vec = self.vectorizer.transform([query])
-        similarities = cosine_similarity(query_vec, self.tfidf_matrix).flatten()
-        
-        # Get top-k results
-        top_indices = similarities.argsort()[-top_k:][::-1]
-        
-        results = []
-        for idx in top_indices:
-            chunk = self.chunks[idx].copy()
-            chunk['score'] = float(similarities[idx])
-            results.append(chunk)
-        
-        return results
\ No newline at end of file
+        return self.hits_to_docs(self.retrieve_many([query], top_k)[0])
@@ -0,0 +1,230 @@
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional, Tuple
+from .batch import failed_result
+
+class QueueFull(Exception):
+    """Raised when a request does not fit in the pending-question queue"""
+
+class CopilotServer:
+    """Long-lived HTTP front end holding one warmed agent behind a bounded work queue"""
+
+    def __init__(self, agent, host: str = "127.0.0.1", port: int = 8765, workers: int = 4,
+                 queue_size: int = 64, timeout: Optional[float] = None, max_batch: int = 256):
+        self.agent = agent
+        self.workers = max(1, workers)
+        # Questions waiting for a worker; requests that would overflow it get a 429
+        self.queue_size = queue_size
+        # Seconds a request waits for its answers; unfinished questions come back as failed records
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._admit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        self.in_flight = 0
+        self.requests = 0
+        self.questions = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    def _start_workers(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"copilot-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def start(self):
+        """Start worker threads and serve HTTP in a background thread"""
+        self._start_workers()
+        thread = threading.Thread(target=self.httpd.serve_forever, name="copilot-http", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def serve_forever(self):
+        """Start workers and serve HTTP on the calling thread until interrupted"""
+        self._start_workers()
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop accepting requests and let workers exit"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for _ in range(self.workers):
+            self._queue.put(None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            question, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._stats_lock:
+                self.in_flight += 1
+            try:
+                future.set_result(self.agent.run(question['question'], question['format_hint'], question['id']))
+            except Exception as e:
+                future.set_result(failed_result(question['id'], f"Failed: {e}"))
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+
+    def submit(self, questions: List[Dict[str, Any]]) -> List[Future]:
+        """Queue a request's questions together, or raise QueueFull if they do not all fit"""
+        with self._admit_lock:
+            if self._queue.qsize() + len(questions) > self.queue_size:
+                with self._stats_lock:
+                    self.rejected += 1
+                raise QueueFull(f"{self._queue.qsize()} questions already queued")
+            futures = []
+            for question in questions:
+                future = Future()
+                self._queue.put((question, future))
+                futures.append(future)
+        with self._stats_lock:
+            self.requests += 1
+            self.questions += len(questions)
+        return futures
+
+    def answer(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Answer questions through the queue; unfinished ones past the timeout become failed records"""
+        futures = self.submit(questions)
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        results = []
+        for question, future in zip(questions, futures):
+            try:
+                remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+                results.append(future.result(remaining))
+            except FutureTimeout:
+                future.cancel()
+                with self._stats_lock:
+                    self.timeouts += 1
+                results.append(failed_result(question['id'], f"Timed out after {self.timeout}s"))
+        return results
+
+    def health(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            health = {
+                "status": "ok",
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight
+            }
+        # Per-endpoint load and health when the agent dispatches over several model servers
+        lm = getattr(self.agent, "lm", None)
+        if hasattr(lm, "stats"):
+            health["lm_endpoints"] = lm.stats()["endpoints"]
+        return health
+
+    def metrics(self) -> str:
+        """Prometheus text: server counters and gauges plus the agent's span metrics"""
+        with self._stats_lock:
+            values = [
+                ("copilot_requests_total", "counter", "Accepted requests", self.requests),
+                ("copilot_questions_total", "counter", "Accepted questions", self.questions),
+                ("copilot_rejected_total", "counter", "Requests rejected with 429", self.rejected),
+                ("copilot_timeouts_total", "counter", "Questions that timed out", self.timeouts),
+                ("copilot_queue_depth", "gauge", "Questions waiting for a worker", self._queue.qsize()),
+                ("copilot_in_flight", "gauge", "Questions being answered", self.in_flight),
+            ]
+        lines = []
+        for name, kind, description, value in values:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        text = "\n".join(lines) + "\n"
+        tracer = getattr(self.agent, "tracer", None)
+        if tracer is not None and tracer.enabled:
+            text += tracer.prometheus()
+        return text
+
+    @staticmethod
+    def _parse_questions(payload: Any) -> Tuple[List[Dict[str, Any]], bool]:
+        """Normalize a single question or {"questions": [...]} into question records"""
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        batch = "questions" in payload
+        items = payload["questions"] if batch else [payload]
+        if not isinstance(items, list) or not items:
+            raise ValueError("'questions' must be a non-empty list")
+        questions = []
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get("question"), str):
+                raise ValueError(f"Question {i} needs a 'question' string")
+            questions.append({
+                "id": str(item.get("id", i)),
+                "question": item["question"],
+                "format_hint": item.get("format_hint", "str")
+            })
+        return questions, batch
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: str, content_type: str = "application/json", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_json(self, status: int, payload: Any, headers=None):
+                self._send(status, json.dumps(payload, default=str), headers=headers)
+
+            def do_GET(self):
+                if self.path == "/healthz":
+                    self._send_json(200, server.health())
+                elif self.path == "/metrics":
+                    self._send(200, server.metrics(), "text/plain; version=0.0.4")
+                else:
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/ask":
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    questions, batch = server._parse_questions(json.loads(self.rfile.read(length) or b"null"))
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                if len(questions) > server.max_batch:
+                    self._send_json(413, {"error": f"At most {server.max_batch} questions per request"})
+                    return
+                try:
+                    results = server.answer(questions)
+                except QueueFull as e:
+                    self._send_json(429, {"error": f"Server busy: {e}"}, headers={"Retry-After": "1"})
+                    return
+                self._send_json(200, {"results": results} if batch else results[0])
+
+            def log_message(self, format, *args):
+                # Keep request logging off the hot path
+                pass
+
+        return Handler
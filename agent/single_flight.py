@@ -0,0 +1,73 @@
+import re
+import asyncio
+import threading
+from typing import Dict, Any, Callable, Awaitable, Tuple, Hashable
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def flight_key(question: str, format_hint: str) -> Tuple[str, str]:
+    """Key under which identical questions share one run: case- and whitespace-insensitive text plus format"""
+    text = _WHITESPACE_RE.sub(' ', question).strip().casefold().rstrip('?.! ')
+    return text, format_hint.strip()
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution whose outcome all callers share"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn unless a call with this key is already in flight; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async variant of do(); the shared task is shielded so one caller's cancellation spares the rest"""
+        key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self.leaders += 1
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many calls ran and how many attached to one already in flight"""
+        return {"leaders": self.leaders, "shared": self.shared}
@@ -0,0 +1,169 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+from urllib.request import pathname2url
+
+# Bump when the summary tables change shape so existing sidecars are rebuilt
+AGGREGATES_VERSION = 1
+
+# Name the sidecar is attached under; its tables are also reachable unqualified
+AGGREGATES_SCHEMA = "agg"
+
+# Revenue and gross margin of one order line, per the KPI docs; CostOfGoods is approximated as 70% of UnitPrice
+_REVENUE = 'od.UnitPrice * od.Quantity * (1 - od.Discount)'
+_MARGIN = '(od.UnitPrice - {cost_ratio} * od.UnitPrice) * od.Quantity * (1 - od.Discount)'
+
+_LINES = '''
+    FROM src."Order Details" od
+    JOIN src.Orders o ON o.OrderID = od.OrderID
+    JOIN src.Products p ON p.ProductID = od.ProductID
+'''
+
+_TABLES = [
+    ('daily_sales', '''
+    CREATE TABLE daily_sales (
+        -- Pre-aggregated order lines, one row per order day.
+        -- revenue = SUM(UnitPrice * Quantity * (1 - Discount)); margin = SUM((UnitPrice - {cost_ratio} * UnitPrice) * Quantity * (1 - Discount)).
+        -- AOV over a date range = SUM(revenue) / SUM(order_count). Filter with day BETWEEN 'YYYY-MM-DD' AND 'YYYY-MM-DD'.
+        day TEXT PRIMARY KEY,
+        revenue REAL, quantity INTEGER, order_count INTEGER, margin REAL
+    )''', '''
+    INSERT INTO daily_sales
+    SELECT date(o.OrderDate), SUM({revenue}), SUM(od.Quantity), COUNT(DISTINCT o.OrderID), SUM({margin})
+    {lines} GROUP BY date(o.OrderDate)''', []),
+    ('daily_category_sales', '''
+    CREATE TABLE daily_category_sales (
+        -- Pre-aggregated order lines, one row per order day and product category (same measures as daily_sales)
+        day TEXT, CategoryID INTEGER, CategoryName TEXT,
+        revenue REAL, quantity INTEGER, order_count INTEGER, margin REAL,
+        PRIMARY KEY (day, CategoryID)
+    )''', '''
+    INSERT INTO daily_category_sales
+    SELECT date(o.OrderDate), c.CategoryID, c.CategoryName,
+           SUM({revenue}), SUM(od.Quantity), COUNT(DISTINCT o.OrderID), SUM({margin})
+    {lines} JOIN src.Categories c ON c.CategoryID = p.CategoryID
+    GROUP BY date(o.OrderDate), c.CategoryID''', [('CategoryName', 'day')]),
+    ('daily_product_sales', '''
+    CREATE TABLE daily_product_sales (
+        -- Pre-aggregated order lines, one row per order day and product (same measures as daily_sales)
+        day TEXT, ProductID INTEGER, ProductName TEXT, CategoryID INTEGER,
+        revenue REAL, quantity INTEGER, order_count INTEGER, margin REAL,
+        PRIMARY KEY (day, ProductID)
+    )''', '''
+    INSERT INTO daily_product_sales
+    SELECT date(o.OrderDate), p.ProductID, p.ProductName, p.CategoryID,
+           SUM({revenue}), SUM(od.Quantity), COUNT(DISTINCT o.OrderID), SUM({margin})
+    {lines} GROUP BY date(o.OrderDate), p.ProductID''', [('ProductID', 'day'), ('CategoryID', 'day')]),
+    ('daily_customer_sales', '''
+    CREATE TABLE daily_customer_sales (
+        -- Pre-aggregated order lines, one row per order day and customer (same measures as daily_sales)
+        day TEXT, CustomerID TEXT, CompanyName TEXT,
+        revenue REAL, quantity INTEGER, order_count INTEGER, margin REAL,
+        PRIMARY KEY (day, CustomerID)
+    )''', '''
+    INSERT INTO daily_customer_sales
+    SELECT date(o.OrderDate), cu.CustomerID, cu.CompanyName,
+           SUM({revenue}), SUM(od.Quantity), COUNT(DISTINCT o.OrderID), SUM({margin})
+    {lines} JOIN src.Customers cu ON cu.CustomerID = o.CustomerID
+    GROUP BY date(o.OrderDate), cu.CustomerID''', [('CustomerID', 'day')]),
+]
+
+AGGREGATE_TABLES = [name for name, _, _, _ in _TABLES]
+
+def default_sidecar_path(db_path: str) -> str:
+    """Sidecar file next to the source database, e.g. data/northwind.aggregates.sqlite"""
+    root, _ = os.path.splitext(db_path)
+    return f"{root}.aggregates.sqlite"
+
+def source_identity(db_path: str) -> Dict[str, Any]:
+    """Size and mtime of the source database and its WAL; changes whenever the data does"""
+    identity = {}
+    for suffix in ("", "-wal"):
+        try:
+            stat = os.stat(db_path + suffix)
+            identity[f"db{suffix}"] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            identity[f"db{suffix}"] = None
+    return identity
+
+class AggregateStore:
+    """Materialized daily revenue/quantity/order/margin summaries kept in a sidecar SQLite file"""
+
+    def __init__(self, db_path: str, sidecar_path: Optional[str] = None, cost_ratio: float = 0.7):
+        self.db_path = db_path
+        self.path = sidecar_path or default_sidecar_path(db_path)
+        self.cost_ratio = cost_ratio
+        self._lock = threading.Lock()
+
+    def _expected_meta(self) -> Dict[str, Any]:
+        return {
+            "version": AGGREGATES_VERSION,
+            "cost_ratio": self.cost_ratio,
+            "source": source_identity(self.db_path)
+        }
+
+    def _stored_meta(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro", uri=True)
+            try:
+                row = conn.execute("SELECT value FROM aggregate_meta WHERE key = 'meta'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def is_fresh(self) -> bool:
+        """Whether the sidecar exists and was built from the current source database"""
+        return self._stored_meta() == self._expected_meta()
+
+    def ensure_fresh(self) -> bool:
+        """Rebuild the sidecar if the source changed; returns True when a rebuild happened"""
+        if self.is_fresh():
+            return False
+        with self._lock:
+            if self.is_fresh():
+                return False
+            self.build()
+            return True
+
+    def build(self):
+        """Build every summary table into a temporary file, then swap it into place"""
+        meta = self._expected_meta()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory or None, prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.execute("PRAGMA journal_mode = OFF")
+                conn.execute("PRAGMA synchronous = OFF")
+                source_uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+                conn.execute("ATTACH DATABASE ? AS src", (source_uri,))
+                params = {"revenue": _REVENUE, "margin": _MARGIN.format(cost_ratio=self.cost_ratio), "lines": _LINES}
+                for name, create, insert, indexes in _TABLES:
+                    conn.execute(create.format(cost_ratio=self.cost_ratio))
+                    conn.execute(insert.format(**params))
+                    for columns in indexes:
+                        conn.execute(f"CREATE INDEX {name}_{'_'.join(columns)} ON {name} ({', '.join(columns)})")
+                conn.execute("CREATE TABLE aggregate_meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.execute("INSERT INTO aggregate_meta VALUES ('meta', ?)", (json.dumps(meta),))
+                conn.commit()
+                conn.execute("DETACH DATABASE src")
+                conn.execute("ANALYZE")
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            # A failed build leaves no partial file behind
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
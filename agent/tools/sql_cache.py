@@ -0,0 +1,138 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+_TOKEN_RE = re.compile(
+    r"'(?:[^']|'')*'"          # string literal
+    r'|"(?:[^"]|"")*"'         # quoted identifier
+    r"|\[[^\]]*\]|`[^`]*`"     # bracket / backtick identifiers
+    r"|--[^\n]*|/\*.*?\*/"     # comments
+    r"|\w+|[^\s\w]",
+    re.DOTALL
+)
+
+# Words that can follow a table name but are never an alias
+_NOT_ALIAS = {
+    'where', 'join', 'inner', 'left', 'right', 'full', 'cross', 'natural', 'outer', 'on', 'using',
+    'group', 'order', 'limit', 'having', 'union', 'except', 'intersect', 'window', 'as', 'select',
+    'from', 'offset', 'indexed', 'not', 'asc', 'desc'
+}
+
+# Words that close a FROM clause's table list
+_END_OF_FROM = {'where', 'group', 'order', 'limit', 'having', 'union', 'except', 'intersect', 'on', 'using', 'window', ')'}
+
+_IDENTIFIER_RE = re.compile(r'^(\w+|"[^"]*")$')
+
+def _normalize_token(token: str) -> Optional[str]:
+    """Canonical spelling of one SQL token; None for comments"""
+    if token.startswith('--') or token.startswith('/*'):
+        return None
+    if token.startswith("'"):
+        return token
+    # Quoted tokens keep their case: SQLite reads a "quoted" name that matches no column as a string literal
+    if token[0] in '"[`':
+        return '"' + token[1:-1].replace('""', '"') + '"'
+    return token.lower()
+
+def tokenize_sql(sql: str) -> List[str]:
+    """Split SQL into normalized tokens: lowercase words, "quoted" identifiers and literals as written"""
+    tokens = [t for t in (_normalize_token(tok) for tok in _TOKEN_RE.findall(sql)) if t is not None]
+    while tokens and tokens[-1] == ';':
+        tokens.pop()
+    return tokens
+
+def canonicalize_sql(sql: str) -> str:
+    """Normalize whitespace, casing, comments, identifier quoting and table aliases"""
+    tokens = tokenize_sql(sql)
+
+    # Rename table aliases (FROM/JOIN <table> [AS] <alias>) to #1, #2, ... in order of appearance;
+    # '#' cannot start an identifier, so renamed aliases never collide with real names
+    aliases = {}
+    declared = set()
+    in_from = False
+    for i, token in enumerate(tokens):
+        if token in ('from', 'join') or (token == ',' and in_from):
+            in_from = True
+            j = i + 1
+            if j < len(tokens) and tokens[j] != '(':
+                j += 1
+                if j < len(tokens) and tokens[j] == 'as':
+                    j += 1
+                if j < len(tokens):
+                    candidate = tokens[j]
+                    if candidate not in _NOT_ALIAS and _IDENTIFIER_RE.match(candidate):
+                        aliases.setdefault(candidate, f"#{len(aliases) + 1}")
+                        declared.add(j)
+        elif token in _END_OF_FROM:
+            in_from = False
+    if aliases:
+        renamed = []
+        for k, token in enumerate(tokens):
+            # Only the declaration itself and "alias." qualifiers; a bare column that shares the name stays
+            if k in declared:
+                if renamed and renamed[-1] == 'as':
+                    # "FROM t AS x" and "FROM t x" are the same query
+                    renamed.pop()
+                token = aliases[token]
+            elif token in aliases and k + 1 < len(tokens) and tokens[k + 1] == '.':
+                token = aliases[token]
+            renamed.append(token)
+        tokens = renamed
+    return ' '.join(tokens)
+
+def _result_size(result: Dict[str, Any]) -> int:
+    """Rough byte size of a query result"""
+    return 64 + sum(len(str(c)) for c in result.get('columns', [])) + sum(
+        sum(len(str(value)) + 8 for value in row) for row in result.get('rows', [])
+    )
+
+class SQLResultCache:
+    """LRU cache of query results, bounded by the total size of cached results"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple, result: Dict[str, Any]):
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,209 @@
+import re
+import difflib
+from typing import List, Dict, Any, Optional
+from .sql_cache import tokenize_sql
+
+# Tokens that end a FROM clause's table list
+_END_OF_FROM = {'where', 'group', 'order', 'limit', 'having', 'union', 'except', 'intersect', 'on', 'using', 'window'}
+
+# Tokens that can follow a table reference but are not an alias
+_NOT_ALIAS = _END_OF_FROM | {'join', 'inner', 'left', 'right', 'full', 'cross', 'natural', 'outer', 'as', 'indexed', 'not'}
+
+_IDENTIFIER_RE = re.compile(r'^([a-z_]\w*|"[^"]*")$')
+
+def _unquote(token: str) -> str:
+    # Identifiers are case-insensitive; quoted tokens come out of tokenize_sql with their case kept
+    return token[1:-1].lower() if token.startswith('"') else token
+
+def _issue(code: str, message: str, **detail) -> Dict[str, Any]:
+    issue = {"code": code, "message": message}
+    issue.update(detail)
+    return issue
+
+class SQLValidator:
+    """Cheap static and EXPLAIN QUERY PLAN checks run before a generated query executes"""
+
+    def __init__(self, db_tool, flag_full_scans: bool = True):
+        self.db_tool = db_tool
+        self.flag_full_scans = flag_full_scans
+
+    def _references(self, tokens: List[str]) -> Dict[str, Any]:
+        """Collect table references, alias-resolved column references, CTE names and top-level join structure"""
+        tables = []
+        columns = []
+        ctes = set()
+        # One scope per open paren level; a subquery's aliases and FROM list end at its ')'
+        scopes = [{"aliases": {}, "refs": [], "in_from": False}]
+        in_where = False
+        where_starts = []
+        # [sources, join conditions] for each top-level arm of a compound SELECT
+        arms = [[0, 0]]
+
+        def close_scope(scope, parent):
+            # Resolve alias.column against this SELECT's aliases; the rest are correlated references to an outer one
+            for qualifier, column in scope["refs"]:
+                if qualifier in scope["aliases"]:
+                    columns.append((scope["aliases"][qualifier], column))
+                elif parent is not None:
+                    parent["refs"].append((qualifier, column))
+
+        for i, token in enumerate(tokens):
+            depth = len(scopes) - 1
+            if token == '(':
+                scopes.append({"aliases": {}, "refs": [], "in_from": False})
+                continue
+            if token == ')':
+                if depth > 0:
+                    close_scope(scopes.pop(), scopes[-1])
+                continue
+            scope = scopes[-1]
+            if token in ('union', 'except', 'intersect'):
+                # Each arm of a compound SELECT has its own aliases
+                close_scope(scope, scopes[-2] if depth > 0 else None)
+                scope.update({"aliases": {}, "refs": [], "in_from": False})
+                if depth == 0:
+                    arms.append([0, 0])
+            if depth == 0:
+                if token == 'where':
+                    in_where = True
+                elif token in _END_OF_FROM or token in ('from', 'join', 'select'):
+                    in_where = False
+                elif in_where:
+                    where_starts.append((len(arms) - 1, i))
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+            # WITH name AS ( ... )
+            if token == 'as' and nxt == '(' and i > 0 and _IDENTIFIER_RE.match(tokens[i - 1]):
+                ctes.add(_unquote(tokens[i - 1]))
+            if (nxt == '.' and i + 2 < len(tokens) and _IDENTIFIER_RE.match(token)
+                    and _IDENTIFIER_RE.match(tokens[i + 2])):
+                scope["refs"].append((_unquote(token), _unquote(tokens[i + 2])))
+            if token in ('from', 'join') or (token == ',' and scope["in_from"]):
+                scope["in_from"] = True
+                if depth == 0:
+                    arms[-1][0] += 1
+                if nxt is None or nxt == '(' or not _IDENTIFIER_RE.match(nxt):
+                    continue
+                j = i + 2
+                # Schema-qualified table (main.Orders, agg.daily_sales): the table is after the dot
+                if j + 1 < len(tokens) and tokens[j] == '.' and _IDENTIFIER_RE.match(tokens[j + 1]):
+                    nxt = tokens[j + 1]
+                    j += 2
+                table = _unquote(nxt)
+                tables.append(table)
+                scope["aliases"][table] = table
+                if j < len(tokens) and tokens[j] == 'as':
+                    j += 1
+                if j < len(tokens) and tokens[j] not in _NOT_ALIAS and _IDENTIFIER_RE.match(tokens[j]):
+                    scope["aliases"][_unquote(tokens[j])] = table
+            elif token in _END_OF_FROM and token not in ('on', 'using'):
+                # A comma after a join condition still adds a table to the FROM list
+                scope["in_from"] = False
+            if depth == 0 and token in ('on', 'using', 'natural'):
+                arms[-1][1] += 1
+        while scopes:
+            scope = scopes.pop()
+            close_scope(scope, scopes[-1] if scopes else None)
+
+        # Top-level WHERE equalities linking two different qualifiers (a.x = b.y); ON equalities are already counted
+        for arm, i in where_starts:
+            window = tokens[i:i + 7]
+            if len(window) < 7:
+                continue
+            if window[1] == '.' and window[3] == '=' and window[5] == '.' and window[0] != window[4]:
+                if _IDENTIFIER_RE.match(window[0]) and _IDENTIFIER_RE.match(window[4]):
+                    arms[arm][1] += 1
+        # Report the arm missing the most join conditions
+        sources, conditions = max(arms, key=lambda arm: arm[0] - 1 - arm[1])
+        return {
+            "tables": tables,
+            "columns": columns,
+            "ctes": ctes,
+            "sources": sources,
+            "conditions": conditions
+        }
+
+    def validate(self, sql: Optional[str]) -> Dict[str, Any]:
+        """Validate a query; errors block execution, warnings are informational"""
+        errors = []
+        warnings = []
+        tokens = tokenize_sql(sql or "")
+        if not tokens:
+            errors.append(_issue("empty_query", "No SQL query was generated."))
+            return {"valid": False, "errors": errors, "warnings": warnings, "plan": []}
+        if tokens[0] not in ('select', 'with', 'values'):
+            errors.append(_issue("not_select", f"Only SELECT queries are allowed, got '{tokens[0].upper()}'."))
+        if ';' in tokens:
+            errors.append(_issue("multiple_statements", "Return exactly one SQL statement."))
+
+        schema = self.db_tool.get_schema_info()
+        by_lower = {name.lower(): name for name in schema}
+        refs = self._references(tokens)
+        known = set(by_lower) | {c.lower() for c in refs["ctes"]}
+
+        reported_tables = set()
+        for table in refs["tables"]:
+            if table.lower() not in known and table.lower() not in reported_tables:
+                reported_tables.add(table.lower())
+                suggestions = difflib.get_close_matches(table, list(schema), n=3, cutoff=0.5)
+                errors.append(_issue(
+                    "unknown_table",
+                    f'Table "{table}" does not exist.' + (f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""),
+                    table=table,
+                    suggestions=suggestions
+                ))
+
+        # Qualified column references (alias.column) against the referenced table's columns
+        reported_columns = set()
+        for table, column in refs["columns"]:
+            name = by_lower.get(table.lower())
+            if name is None:
+                continue
+            columns = [col['name'] for col in schema[name]['columns']]
+            if column.lower() not in {c.lower() for c in columns} and (name, column) not in reported_columns:
+                reported_columns.add((name, column))
+                suggestions = difflib.get_close_matches(column, columns, n=3, cutoff=0.5)
+                errors.append(_issue(
+                    "unknown_column",
+                    f'Column "{column}" does not exist in table "{name}".'
+                    + (f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""),
+                    table=name,
+                    column=column,
+                    suggestions=suggestions
+                ))
+
+        plan = []
+        if not errors:
+            explained = self.db_tool.explain(sql)
+            plan = explained["plan"]
+            if not explained["success"]:
+                error = explained["error"]
+                match = re.match(r'no such (table|column): (.+)', error)
+                if match:
+                    errors.append(_issue(f"unknown_{match.group(1)}", f'{match.group(1).capitalize()} "{match.group(2)}" does not exist.'))
+                else:
+                    errors.append(_issue("invalid_sql", error))
+
+        scans = [step["detail"] for step in plan if step["detail"].startswith("SCAN ")]
+        full_scans = [detail for detail in scans if "USING" not in detail and "CONSTANT ROW" not in detail]
+        # Two or more scans (not index searches) with missing join conditions means a cross product
+        if refs["sources"] > 1 and refs["conditions"] < refs["sources"] - 1 and len(scans) > 1:
+            errors.append(_issue(
+                "cartesian_join",
+                f"{refs['sources']} tables are joined with only {refs['conditions']} join condition(s); "
+                "add ON clauses so every table is joined on its key.",
+                tables=refs["tables"]
+            ))
+        if self.flag_full_scans:
+            for detail in full_scans:
+                warnings.append(_issue("full_scan", f"Plan step '{detail}' reads every row.", detail=detail))
+
+        return {"valid": not errors, "errors": errors, "warnings": warnings, "plan": plan}
+
+    @staticmethod
+    def format_feedback(report: Dict[str, Any]) -> str:
+        """Render validation errors as feedback for SQL regeneration"""
+        if report["valid"]:
+            return ""
+        lines = ["The previous SQL query was rejected before execution:"]
+        lines.extend(f"- [{error['code']}] {error['message']}" for error in report["errors"])
+        return "\n".join(lines)
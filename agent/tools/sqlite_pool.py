@@ -0,0 +1,107 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict
+from urllib.request import pathname2url
+
+class SQLiteConnectionPool:
+    """Thread-safe pool of read-only SQLite connections with tuned pragmas"""
+
+    def __init__(self, db_path: str, size: int = 4, mmap_size: int = 256 * 1024 * 1024,
+                 cache_size: int = -64 * 1024, temp_store: str = "MEMORY",
+                 busy_timeout: float = 5.0, progress_interval: int = 10000,
+                 attach: Optional[Dict[str, str]] = None):
+        self.db_path = db_path
+        # Extra databases (schema name -> path) attached read-only to every connection
+        self.attach = dict(attach or {})
+        self.size = max(1, size)
+        # Bytes of the database file to memory-map
+        self.mmap_size = mmap_size
+        # Page cache size; negative values are KiB, as in PRAGMA cache_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.busy_timeout = busy_timeout
+        # VM instructions between progress-handler checks of the query deadline
+        self.progress_interval = progress_interval
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        # Set by retire(): connections are closed as they come back instead of being reused
+        self._retired = False
+
+    def _open(self) -> sqlite3.Connection:
+        """Open one read-only connection and apply pragmas"""
+        uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=self.busy_timeout)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        for schema, path in self.attach.items():
+            conn.execute("ATTACH DATABASE ? AS " + schema, (f"file:{pathname2url(os.path.abspath(path))}?mode=ro",))
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._retired or len(self._all) < self.size:
+                    conn = self._open()
+                    self._all.append(conn)
+                    return conn
+            conn = self._idle.get()
+        if conn is None:
+            # Woken by a connection closed on a retired pool; its slot is free
+            with self._lock:
+                conn = self._open()
+                self._all.append(conn)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if self._retired:
+                conn.close()
+                self._all.remove(conn)
+                self._idle.put(None)
+                return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Check out a connection; statements running past `timeout` seconds are interrupted"""
+        conn = self._acquire()
+        if timeout:
+            deadline = time.monotonic() + timeout
+            conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, self.progress_interval)
+        try:
+            yield conn
+        finally:
+            if timeout:
+                conn.set_progress_handler(None, 0)
+            self._release(conn)
+
+    def retire(self):
+        """Close idle connections now and checked-out ones when they are returned"""
+        with self._lock:
+            self._retired = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if conn is not None:
+                    conn.close()
+                    self._all.remove(conn)
+
+    def close(self):
+        """Close every connection opened by the pool"""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+            self._idle = queue.LifoQueue()
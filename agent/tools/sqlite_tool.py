@@ -1,62 +1,395 @@
+import os
+import re
 import sqlite3
-import pandas as pd
-from typing import List, Dict, Any, Optional
+import logging
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional, Set
 import json
+from .sqlite_pool import SQLiteConnectionPool
+from .sql_cache import SQLResultCache, canonicalize_sql
+from .aggregates import AggregateStore, AGGREGATES_SCHEMA, source_identity
+
+logger = logging.getLogger(__name__)
+
+# Question words that imply tables without naming them
+# (aggregate tables are only picked when the sidecar is attached)
+SCHEMA_SYNONYMS = {
+    'revenue': ['Order Details', 'Orders', 'daily_sales'],
+    'sales': ['Order Details', 'Orders', 'daily_sales'],
+    'sold': ['Order Details', 'Orders', 'daily_sales'],
+    'quantity': ['Order Details', 'daily_sales'],
+    'aov': ['Order Details', 'Orders', 'daily_sales'],
+    'margin': ['Order Details', 'Products', 'daily_sales'],
+    'discount': ['Order Details'],
+    'price': ['Products', 'Order Details'],
+    'category': ['Categories', 'Products', 'daily_category_sales'],
+    'categories': ['Categories', 'Products', 'daily_category_sales'],
+    'customer': ['Customers', 'Orders', 'daily_customer_sales'],
+    'customers': ['Customers', 'Orders', 'daily_customer_sales'],
+    'client': ['Customers', 'Orders', 'daily_customer_sales'],
+    'order': ['Orders'],
+    'orders': ['Orders'],
+    'date': ['Orders'],
+    'dates': ['Orders'],
+    'year': ['Orders'],
+    'month': ['Orders'],
+    'during': ['Orders', 'daily_sales'],
+    'product': ['Products', 'daily_product_sales'],
+    'products': ['Products', 'daily_product_sales'],
+    'supplier': ['Suppliers', 'Products'],
+    'suppliers': ['Suppliers', 'Products'],
+    'employee': ['Employees', 'Orders'],
+    'employees': ['Employees', 'Orders'],
+    'shipper': ['Shippers', 'Orders'],
+    'shippers': ['Shippers', 'Orders'],
+    'shipped': ['Shippers', 'Orders'],
+}
+
+def _name_tokens(name: str) -> Set[str]:
+    """Lowercase word tokens of an identifier, splitting camelCase, spaces and underscores"""
+    words = re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', name)
+    tokens = {w.lower() for w in words}
+    # Naive singular forms so "Orders" matches "order"
+    tokens |= {t[:-1] for t in tokens if t.endswith('s') and len(t) > 3}
+    return tokens
 
 class SQLiteTool:
-    def __init__(self, db_path: str = "data/northwind.sqlite"):
+    def __init__(self, db_path: str = "data/northwind.sqlite", pool_size: int = 4,
+                 query_timeout: Optional[float] = 30.0, mmap_size: int = 256 * 1024 * 1024,
+                 cache_size: int = -64 * 1024, temp_store: str = "MEMORY", max_rows: int = 1000,
+                 max_bytes: int = 256 * 1024, fetch_size: int = 256,
+                 result_cache_bytes: int = 32 * 1024 * 1024, aggregates_path: Optional[str] = None):
         self.db_path = db_path
-        self.conn = None
-        self._connect()
+        # Seconds a single query may run before it is interrupted
+        self.query_timeout = query_timeout
+        # Results are truncated past max_rows rows or roughly max_bytes of values
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.fetch_size = fetch_size
+        # Successful results keyed on canonical SQL + database file identity; 0 disables
+        self.result_cache = SQLResultCache(result_cache_bytes) if result_cache_bytes else None
+        self._pool_options = {
+            "size": pool_size,
+            "mmap_size": mmap_size,
+            "cache_size": cache_size,
+            "temp_store": temp_store
+        }
+        # Daily summary tables in a sidecar file, attached to every connection when enabled
+        self.aggregates = AggregateStore(db_path, aggregates_path) if aggregates_path else None
+        self._aggregates_identity = None
+        self._aggregates_lock = threading.Lock()
+        self.pool = self._make_pool()
+        self._schema = None
+        self._schema_version = None
+        self._schema_text = None
+        self._schema_lock = threading.Lock()
     
-    def _connect(self):
-        """Establish database connection"""
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-    
-    def get_schema(self, table_name: Optional[str] = None) -> str:
-        """Get database schema information"""
-        query = """
-        SELECT name, sql FROM sqlite_master 
-        WHERE type='table' OR type='view'
-        """
-        if table_name:
-            query += f" AND name = '{table_name}'"
-        
-        schema_info = []
-        cursor = self.conn.execute(query)
-        for row in cursor:
-            schema_info.append(f"Table/View: {row['name']}\nSQL: {row['sql']}\n")
-        
+    def _make_pool(self) -> SQLiteConnectionPool:
+        attach = {AGGREGATES_SCHEMA: self.aggregates.path} if self.aggregates else None
+        return SQLiteConnectionPool(self.db_path, attach=attach, **self._pool_options)
+
+    def _refresh_aggregates(self):
+        """Rebuild the aggregates sidecar when the source database changed"""
+        if self.aggregates is None:
+            return
+        identity = source_identity(self.db_path)
+        if identity == self._aggregates_identity:
+            return
+        with self._aggregates_lock:
+            if self.aggregates is None or identity == self._aggregates_identity:
+                return
+            try:
+                if self.aggregates.ensure_fresh():
+                    self._swap_pool()
+                # A sidecar that cannot be attached fails when a connection opens
+                with self.pool.connection():
+                    pass
+            except Exception as e:
+                # The summary tables are an optimization; questions still work against the base tables
+                logger.warning("Aggregate tables unavailable, using the base schema only: %s", e)
+                self.aggregates = None
+                self._swap_pool()
+                return
+            self._aggregates_identity = identity
+
+    def _swap_pool(self):
+        """Replace the connection pool, e.g. after the attached sidecar changed"""
+        # Queries already running keep the replaced file until they return their connection
+        old_pool, self.pool = self.pool, self._make_pool()
+        old_pool.retire()
+        self._schema = None
+
+    def _current_schema_version(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    def _introspect(self) -> Dict[str, Dict[str, Any]]:
+        """Read tables, views, columns and foreign keys from the database"""
+        with self.pool.connection() as conn:
+            return self._introspect_with(conn)
+
+    def _introspect_with(self, conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+        schema = {}
+        databases = ['main'] + list(self.pool.attach)
+        rows = []
+        for database in databases:
+            cursor = conn.execute(
+                f'SELECT name, type, sql FROM "{database}".sqlite_master '
+                "WHERE (type='table' OR type='view') AND name NOT LIKE 'sqlite_%' AND name != 'aggregate_meta'"
+            )
+            rows.extend((database, row) for row in cursor.fetchall())
+        for database, row in rows:
+            name = row['name']
+            quoted = name.replace('"', '""')
+            columns = [
+                {'name': col['name'], 'type': col['type'], 'pk': bool(col['pk'])}
+                for col in conn.execute(f'PRAGMA "{database}".table_info("{quoted}")')
+            ]
+            foreign_keys = [
+                {'column': fk['from'], 'ref_table': fk['table'], 'ref_column': fk['to']}
+                for fk in conn.execute(f'PRAGMA "{database}".foreign_key_list("{quoted}")')
+            ]
+            # Views of the form SELECT * FROM <table> are aliases (e.g. order_items)
+            alias_of = None
+            if row['type'] == 'view' and row['sql']:
+                match = re.search(r'\bAS\s+SELECT\s+\*\s+FROM\s+["\[`]?([^"\]`;]+?)["\]`]?\s*;?\s*$',
+                                  row['sql'], re.IGNORECASE)
+                if match:
+                    alias_of = match.group(1)
+            schema[name] = {
+                'name': name,
+                'database': database,
+                'type': row['type'],
+                'sql': row['sql'],
+                'columns': columns,
+                'foreign_keys': foreign_keys,
+                'alias_of': alias_of
+            }
+        return schema
+
+    def get_schema_info(self) -> Dict[str, Dict[str, Any]]:
+        """Return the cached schema, re-introspecting when PRAGMA schema_version changes"""
+        self._refresh_aggregates()
+        version = self._current_schema_version()
+        if self._schema is None or version != self._schema_version:
+            with self._schema_lock:
+                if self._schema is None or version != self._schema_version:
+                    self._schema = self._introspect()
+                    self._schema_text = None
+                    self._schema_version = version
+        return self._schema
+
+    def _render_schema(self, schema: Dict[str, Dict[str, Any]], names: List[str],
+                       joins: Optional[List[str]] = None) -> str:
+        """Render schema entries in the prompt format"""
+        schema_info = [f"Table/View: {name}\nSQL: {schema[name]['sql']}\n" for name in names]
+        if joins:
+            schema_info.append("Joins:\n" + "\n".join(joins) + "\n")
         return "\n".join(schema_info)
-    
+
+    def get_schema(self, table_name: Optional[str] = None, question: Optional[str] = None) -> str:
+        """Get database schema information, optionally pruned to what a question needs"""
+        # Checked for changes once here; the helpers below reuse this snapshot
+        schema = self.get_schema_info()
+        if table_name:
+            return self._render_schema(schema, [table_name] if table_name in schema else [])
+        if question:
+            tables, joins = self.prune_schema(question, schema)
+            if tables:
+                return self._render_schema(schema, tables, joins)
+        if self._schema_text is None:
+            self._schema_text = self._render_schema(schema, list(schema))
+        return self._schema_text
+
+    def _foreign_key_graph(self, schema: Dict[str, Dict[str, Any]]) -> Dict[str, List[tuple]]:
+        """Undirected adjacency of tables linked by foreign keys"""
+        lookup = {name.lower(): name for name in schema}
+        graph = {name: [] for name in schema if schema[name]['type'] == 'table'}
+        for name, info in schema.items():
+            for fk in info['foreign_keys']:
+                ref = lookup.get(fk['ref_table'].lower())
+                if ref is None or name not in graph or ref not in graph:
+                    continue
+                join = f'"{name}".{fk["column"]} = "{ref}".{fk["ref_column"]}'
+                graph[name].append((ref, join))
+                graph[ref].append((name, join))
+        return graph
+
+    def _join_path(self, graph: Dict[str, List[tuple]], start: str, goal: str) -> Optional[List[tuple]]:
+        """Shortest chain of (table, join) hops from start to goal"""
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            if table == goal:
+                path = []
+                while previous[table] is not None:
+                    parent, join = previous[table]
+                    path.append((table, join))
+                    table = parent
+                return path[::-1]
+            for neighbour, join in graph.get(table, []):
+                if neighbour not in previous:
+                    previous[neighbour] = (table, join)
+                    queue.append(neighbour)
+        return None
+
+    def prune_schema(self, question: str, schema: Optional[Dict[str, Dict[str, Any]]] = None) -> tuple:
+        """Pick the tables a question needs plus the foreign-key joins connecting them"""
+        schema = schema or self.get_schema_info()
+        lookup = {name.lower(): name for name in schema}
+        words = set(re.findall(r'[a-z0-9]+', question.lower()))
+
+        selected = []
+        def select(name):
+            name = lookup.get(name.lower())
+            if name and schema[name]['type'] == 'table' and name not in selected:
+                selected.append(name)
+
+        for name, info in schema.items():
+            # Summary tables from the aggregates sidecar are only picked through SCHEMA_SYNONYMS
+            if info['type'] != 'table' or info['database'] != 'main':
+                continue
+            if name.lower() in question.lower() or _name_tokens(name) & words:
+                select(name)
+            elif any(col['name'].lower() in words for col in info['columns']):
+                select(name)
+        for word in words:
+            for name in SCHEMA_SYNONYMS.get(word, []):
+                select(name)
+        if not selected:
+            return [], []
+
+        # Connect every selected table to the first one along foreign keys
+        graph = self._foreign_key_graph(schema)
+        tables = list(selected)
+        joins = []
+        linked = [name for name in selected if graph.get(name)]
+        for goal in linked[1:]:
+            path = self._join_path(graph, linked[0], goal)
+            for table, join in path or []:
+                if table not in tables:
+                    tables.append(table)
+                if join not in joins:
+                    joins.append(join)
+
+        # Keep alias views (e.g. order_items) of the selected tables
+        selected_lower = {t.lower() for t in tables}
+        views = [
+            name for name, info in schema.items()
+            if info['alias_of'] and info['alias_of'].lower() in selected_lower
+        ]
+        return tables + views, joins
+
     def get_table_names(self) -> List[str]:
         """Get list of all table names"""
-        cursor = self.conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' OR type='view'"
-        )
-        return [row['name'] for row in cursor]
-    
+        return list(self.get_schema_info())
+
+    def _db_identity(self) -> tuple:
+        """Changes whenever the database file (or its WAL) is modified"""
+        identity = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                identity.extend([stat.st_mtime_ns, stat.st_size])
+            except OSError:
+                identity.extend([None, None])
+        return tuple(identity)
+
     def execute_query(self, query: str) -> Dict[str, Any]:
-        """Execute SQL query and return results"""
+        """Execute SQL query, serving repeats of the same canonical query from the result cache"""
+        self._refresh_aggregates()
+        if self.result_cache is None:
+            return self._run_query(query)
+        
+        key = (canonicalize_sql(query), self._db_identity())
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        
+        results = self._run_query(query)
+        if results["success"]:
+            self.result_cache.put(key, results)
+        return results
+
+    def _run_query(self, query: str) -> Dict[str, Any]:
+        """Execute SQL query, streaming rows up to the row/byte caps"""
+        columns = []
+        rows = []
+        truncated = False
         try:
-            df = pd.read_sql_query(query, self.conn)
+            with self.pool.connection(timeout=self.query_timeout) as conn:
+                cursor = conn.cursor()
+                # Plain tuples are cheaper to build than sqlite3.Row
+                cursor.row_factory = None
+                cursor.execute(query)
+                columns = [d[0] for d in cursor.description] if cursor.description else []
+                size = 0
+                fetched = 0
+                try:
+                    while not truncated:
+                        batch = cursor.fetchmany(self.fetch_size)
+                        if not batch:
+                            break
+                        fetched += len(batch)
+                        for row in batch:
+                            size += sum(len(str(value)) for value in row)
+                            if len(rows) >= self.max_rows or size > self.max_bytes:
+                                truncated = True
+                                break
+                            rows.append(list(row))
+                finally:
+                    cursor.close()
+                row_count = fetched
+                row_count_exact = not truncated
+                if truncated:
+                    row_count, row_count_exact = self._count_rows(conn, query, fetched)
             return {
                 "success": True,
-                "columns": list(df.columns),
-                "rows": df.to_dict('records'),
-                "row_count": len(df)
+                "columns": columns,
+                "rows": rows,
+                "row_count": row_count,
+                "row_count_exact": row_count_exact,
+                "truncated": truncated
             }
         except Exception as e:
+            error = str(e)
+            if "interrupted" in error:
+                error = f"Query exceeded the {self.query_timeout}s time limit and was interrupted"
             return {
                 "success": False,
-                "error": str(e),
+                "error": error,
                 "columns": [],
                 "rows": [],
-                "row_count": 0
+                "row_count": 0,
+                "row_count_exact": True,
+                "truncated": False
             }
     
+    def _count_rows(self, conn: sqlite3.Connection, query: str, fetched: int):
+        """Count a truncated query's rows under the same deadline; a lower bound if the count fails"""
+        try:
+            count = conn.execute(f"SELECT COUNT(*) FROM ({query.strip().rstrip(';')})").fetchone()[0]
+            return count, True
+        except sqlite3.Error:
+            # Rows fetched so far are only a lower bound
+            return fetched, False
+
+    def explain(self, query: str) -> Dict[str, Any]:
+        """Run EXPLAIN QUERY PLAN without executing the query"""
+        self._refresh_aggregates()
+        try:
+            with self.pool.connection(timeout=self.query_timeout) as conn:
+                cursor = conn.execute(f"EXPLAIN QUERY PLAN {query}")
+                plan = [
+                    {"id": row[0], "parent": row[1], "detail": row[3]}
+                    for row in cursor.fetchall()
+                ]
+            return {"success": True, "plan": plan}
+        except Exception as e:
+            return {"success": False, "error": str(e), "plan": []}
+    
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        """Close database connections"""
+        self.pool.close()
\ No newline at end of file
@@ -0,0 +1,203 @@
+import json
+import time
+import atexit
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Callable
+import numpy as np
+
+# Question being processed by the current node, so nested LLM spans inherit it
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+class _Span:
+    """Mutable attribute bag yielded by Tracer.span"""
+
+    __slots__ = ("attrs",)
+
+    def __init__(self, attrs: Dict[str, Any]):
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+class _NoopSpan:
+    """Shared span and context manager used while tracing is disabled"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Records timed spans for graph nodes and LLM calls; does nothing when disabled"""
+
+    def __init__(self, enabled: bool = False, path: Optional[str] = None, window: int = 10000):
+        self.enabled = enabled
+        self.path = path
+        # Percentiles cover the latest `window` spans per name so long-running servers stay bounded
+        self.window = window
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if (enabled and path) else None
+        if self._file:
+            # Spans buffered in the file are written even if the run raises before close()
+            atexit.register(self.close)
+        self._durations: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+        self._errors: Dict[str, int] = {}
+        self._counters: Dict[str, float] = {}
+
+    @contextmanager
+    def _timed(self, name: str, kind: str, attrs: Dict[str, Any]):
+        span = _Span(attrs)
+        start_wall = time.time()
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield span
+        except BaseException as e:
+            outcome = "error"
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._record({
+                "trace_id": _current_trace.get(),
+                "name": name,
+                "kind": kind,
+                "start": start_wall,
+                "duration_ms": (time.perf_counter() - start) * 1000.0,
+                "outcome": outcome,
+                **span.attrs
+            })
+
+    def span(self, name: str, kind: str = "node", **attrs):
+        """Context manager timing a block; yields an object whose set() adds attributes"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._timed(name, kind, attrs)
+
+    def wrap_node(self, name: str, fn: Callable) -> Callable:
+        """Wrap a LangGraph node so each call becomes a span tagged with the question id"""
+        def traced_node(state):
+            if not self.enabled:
+                return fn(state)
+            token = _current_trace.set(state.get("question_id"))
+            try:
+                with self._timed(name, "node", {"repair_count": state.get("repair_count", 0)}) as span:
+                    update = fn(state)
+                    if name == "repair":
+                        span.set(repair_cause=state.get("repair_target"))
+                    return update
+            finally:
+                _current_trace.reset(token)
+        traced_node.__name__ = getattr(fn, "__name__", name)
+        return traced_node
+
+    def _record(self, span: Dict[str, Any]):
+        key = f"{span['kind']}:{span['name']}"
+        with self._lock:
+            if key not in self._durations:
+                self._durations[key] = deque(maxlen=self.window)
+            self._durations[key].append(span["duration_ms"])
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._totals[key] = self._totals.get(key, 0.0) + span["duration_ms"]
+            if span["outcome"] != "ok":
+                self._errors[key] = self._errors.get(key, 0) + 1
+            for counter in ("prompt_tokens", "completion_tokens", "prompt_tokens_saved"):
+                if span.get(counter):
+                    counter_key = f"{span['name']}:{counter}"
+                    self._counters[counter_key] = self._counters.get(counter_key, 0) + span[counter]
+            if span.get("cache_hit"):
+                counter_key = f"{span['name']}:cache_hits"
+                self._counters[counter_key] = self._counters.get(counter_key, 0) + 1
+            if self._file:
+                self._file.write(json.dumps(span, default=str) + "\n")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Latency percentiles per span name"""
+        with self._lock:
+            durations = {key: list(values) for key, values in self._durations.items()}
+            counts = dict(self._counts)
+            totals = dict(self._totals)
+            errors = dict(self._errors)
+        summary = {}
+        for key, values in sorted(durations.items()):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[key] = {
+                "count": counts[key],
+                "errors": errors.get(key, 0),
+                "mean_ms": totals[key] / counts[key],
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "total_ms": totals[key]
+            }
+        return summary
+
+    def format_summary(self) -> str:
+        """Human-readable percentile table"""
+        lines = [f"{'span':<28}{'count':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for key, stats in self.summary().items():
+            lines.append(
+                f"{key:<28}{stats['count']:>7}{stats['errors']:>5}"
+                f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of span latencies and LLM counters"""
+        lines = [
+            "# HELP copilot_span_duration_seconds Latency of graph nodes and LLM calls",
+            "# TYPE copilot_span_duration_seconds summary"
+        ]
+        for key, stats in self.summary().items():
+            kind, name = key.split(":", 1)
+            labels = f'kind="{kind}",name="{name}"'
+            for quantile in ("50", "95", "99"):
+                value = stats[f"p{quantile}_ms"] / 1000.0
+                lines.append(f'copilot_span_duration_seconds{{{labels},quantile="0.{quantile}"}} {value:.6f}')
+            lines.append(f"copilot_span_duration_seconds_sum{{{labels}}} {stats['total_ms'] / 1000.0:.6f}")
+            lines.append(f"copilot_span_duration_seconds_count{{{labels}}} {stats['count']}")
+        lines.append("# HELP copilot_span_errors_total Spans that raised")
+        lines.append("# TYPE copilot_span_errors_total counter")
+        for key, stats in self.summary().items():
+            kind, name = key.split(":", 1)
+            lines.append(f'copilot_span_errors_total{{kind="{kind}",name="{name}"}} {stats["errors"]}')
+        lines.append("# HELP copilot_llm_total LLM token and cache counters")
+        lines.append("# TYPE copilot_llm_total counter")
+        with self._lock:
+            counters = dict(self._counters)
+        for key, value in sorted(counters.items()):
+            module, counter = key.split(":", 1)
+            lines.append(f'copilot_llm_total{{module="{module}",counter="{counter}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """Flush and close the span file"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+                atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (~4 characters per token) for prompts without usage data"""
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return max(1, len(text) // 4)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Generate data/sql_demos.jsonl: templated question -> SQL pairs checked against a generated Northwind database
+
+Questions use explicit date ranges rather than the marketing-calendar campaign names, and any pair
+too similar to an evaluation question is dropped, so the demos never hand the SQL generator an
+evaluation question's answer.
+"""
+import os
+import sys
+import json
+import random
+import sqlite3
+import tempfile
+from typing import List, Dict, Tuple
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datasets import CATEGORIES, COUNTRIES, generate_northwind
+
+REVENUE = "SUM(od.UnitPrice * od.Quantity * (1 - od.Discount))"
+MARGIN = "SUM((od.UnitPrice - 0.7 * od.UnitPrice) * od.Quantity * (1 - od.Discount))"
+LINES = 'FROM "Order Details" od JOIN Orders o ON o.OrderID = od.OrderID'
+WITH_PRODUCTS = LINES + " JOIN Products p ON p.ProductID = od.ProductID"
+WITH_CATEGORIES = WITH_PRODUCTS + " JOIN Categories c ON c.CategoryID = p.CategoryID"
+WITH_CUSTOMERS = LINES + " JOIN Customers cu ON cu.CustomerID = o.CustomerID"
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+          'October', 'November', 'December']
+MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+def _periods() -> Dict[str, List[Tuple[str, str, str]]]:
+    """(label, first day, last day) for the years, quarters and 1997 months covered by the orders"""
+    years = [(f"in {year}", f"{year}-01-01", f"{year}-12-31") for year in (1996, 1997, 1998)]
+    quarters = []
+    for year, quarter in [(1996, 3), (1996, 4), (1997, 1), (1997, 2), (1997, 3), (1997, 4), (1998, 1), (1998, 2)]:
+        first, last = 3 * quarter - 2, 3 * quarter
+        quarters.append((f"in Q{quarter} {year}", f"{year}-{first:02d}-01", f"{year}-{last:02d}-{MONTH_DAYS[last - 1]}"))
+    months = [(f"in {MONTHS[m]} 1997", f"1997-{m + 1:02d}-01", f"1997-{m + 1:02d}-{MONTH_DAYS[m]}") for m in range(12)]
+    return {"years": years, "quarters": quarters, "months": months}
+
+def _between(first: str, last: str) -> str:
+    return f"date(o.OrderDate) BETWEEN '{first}' AND '{last}'"
+
+def build_demos(seed: int = 0) -> List[Dict[str, str]]:
+    """Every templated pair; each question picks one of its type's phrasings"""
+    rng = random.Random(seed)
+    periods = _periods()
+    timed = periods["years"] + periods["quarters"] + periods["months"]
+    demos = []
+    counts = {}
+
+    def add(kind: str, phrasings: List[str], sql: str, **values):
+        question = rng.choice(phrasings).format(**values)
+        counts[kind] = counts.get(kind, 0) + 1
+        demos.append({"id": f"{kind}_{counts[kind]}", "question": question[0].upper() + question[1:],
+                      "sql_query": sql})
+
+    for category, _ in CATEGORIES:
+        for label, first, last in periods["years"] + periods["quarters"][2:6]:
+            add("category_revenue", ["How much revenue did {category} products bring in {period}?",
+                                     "Revenue of the {category} category {period}, after discounts."],
+                f"SELECT ROUND({REVENUE}, 2) AS revenue {WITH_CATEGORIES} "
+                f"WHERE c.CategoryName = '{category}' AND {_between(first, last)}",
+                category=category, period=label)
+    for label, first, last in timed:
+        where = _between(first, last)
+        add("top_category_quantity", ["Which category sold the most units {period}?",
+                                      "Best-selling category by units {period}, with its unit count."],
+            f"SELECT c.CategoryName AS category, SUM(od.Quantity) AS quantity {WITH_CATEGORIES} "
+            f"WHERE {where} GROUP BY c.CategoryName ORDER BY quantity DESC LIMIT 1", period=label)
+        add("aov", ["Average order value {period}.", "What was revenue per order {period}?"],
+            f"SELECT ROUND({REVENUE} / COUNT(DISTINCT o.OrderID), 2) AS aov {LINES} WHERE {where}", period=label)
+        add("order_count", ["How many orders were placed {period}?", "Number of orders {period}."],
+            f"SELECT COUNT(*) AS orders FROM Orders o WHERE {where}", period=label)
+        add("total_revenue", ["What was total net sales {period}?", "Overall revenue {period}, after discounts."],
+            f"SELECT ROUND({REVENUE}, 2) AS revenue {LINES} WHERE {where}", period=label)
+        add("top_product_revenue", ["Which product earned the most {period}?",
+                                    "Highest-revenue product {period}."],
+            f"SELECT p.ProductName AS product, ROUND({REVENUE}, 2) AS revenue {WITH_PRODUCTS} "
+            f"WHERE {where} GROUP BY p.ProductID ORDER BY revenue DESC LIMIT 1", period=label)
+    for label, first, last in periods["years"] + periods["quarters"]:
+        where = _between(first, last)
+        add("top_customer_margin", ["Which customer generated the largest margin {period}? Cost is 70% of unit price.",
+                                    "Most profitable customer {period}, costing goods at 70% of UnitPrice."],
+            f"SELECT cu.CompanyName AS customer, ROUND({MARGIN}, 2) AS margin {WITH_CUSTOMERS} "
+            f"WHERE {where} GROUP BY cu.CustomerID ORDER BY margin DESC LIMIT 1", period=label)
+        add("category_breakdown", ["Revenue per category {period}.", "Break down sales by category {period}."],
+            f"SELECT c.CategoryName AS category, ROUND({REVENUE}, 2) AS revenue {WITH_CATEGORIES} "
+            f"WHERE {where} GROUP BY c.CategoryName ORDER BY revenue DESC", period=label)
+    for label, first, last in periods["years"]:
+        where = _between(first, last)
+        for n in (5, 10):
+            add("top_products", ["The {n} best-selling products by revenue {period}.",
+                                 "List {n} products with the highest sales {period}."],
+                f"SELECT p.ProductName AS product, ROUND({REVENUE}, 2) AS revenue {WITH_PRODUCTS} "
+                f"WHERE {where} GROUP BY p.ProductID ORDER BY revenue DESC LIMIT {n}", n=n, period=label)
+            add("top_customers", ["The {n} biggest customers by revenue {period}.",
+                                  "List {n} customers who spent the most {period}."],
+                f"SELECT cu.CompanyName AS customer, ROUND({REVENUE}, 2) AS revenue {WITH_CUSTOMERS} "
+                f"WHERE {where} GROUP BY cu.CustomerID ORDER BY revenue DESC LIMIT {n}", n=n, period=label)
+        add("top_employee", ["Which employee handled the most orders {period}?",
+                             "Employee with the most orders {period}."],
+            "SELECT e.FirstName || ' ' || e.LastName AS employee, COUNT(*) AS orders FROM Orders o "
+            f"JOIN Employees e ON e.EmployeeID = o.EmployeeID WHERE {where} "
+            "GROUP BY e.EmployeeID ORDER BY orders DESC LIMIT 1", period=label)
+        add("top_customer_orders", ["Which customer placed the most orders {period}?",
+                                    "Customer with the largest number of orders {period}."],
+            "SELECT cu.CompanyName AS customer, COUNT(*) AS orders FROM Orders o "
+            f"JOIN Customers cu ON cu.CustomerID = o.CustomerID WHERE {where} "
+            "GROUP BY cu.CustomerID ORDER BY orders DESC LIMIT 1", period=label)
+        add("top_shipper", ["Which shipper carried the most orders {period}?",
+                            "Busiest shipping company {period}."],
+            "SELECT s.CompanyName AS shipper, COUNT(*) AS orders FROM Orders o "
+            f"JOIN Shippers s ON s.ShipperID = o.ShipVia WHERE {where} "
+            "GROUP BY s.ShipperID ORDER BY orders DESC LIMIT 1", period=label)
+    for category, _ in CATEGORIES:
+        add("category_products", ["How many products are in the {category} category?",
+                                  "Number of {category} products in the catalog."],
+            f"SELECT COUNT(*) AS products FROM Products p JOIN Categories c ON c.CategoryID = p.CategoryID "
+            f"WHERE c.CategoryName = '{category}'", category=category)
+        add("discontinued", ["How many {category} products are discontinued?",
+                             "Count discontinued items in {category}."],
+            "SELECT COUNT(*) AS products FROM Products p JOIN Categories c ON c.CategoryID = p.CategoryID "
+            f"WHERE c.CategoryName = '{category}' AND p.Discontinued = 1", category=category)
+        add("average_discount", ["Average discount on {category} order lines.",
+                                 "What discount do {category} lines get on average?"],
+            f"SELECT ROUND(AVG(od.Discount), 4) AS avg_discount {WITH_CATEGORIES} "
+            f"WHERE c.CategoryName = '{category}'", category=category)
+        for label, first, last in periods["years"]:
+            add("category_margin", ["Gross margin of {category} {period}, with cost at 70% of UnitPrice.",
+                                    "How much margin did {category} make {period}? Cost is 70% of unit price."],
+                f"SELECT ROUND({MARGIN}, 2) AS margin {WITH_CATEGORIES} "
+                f"WHERE c.CategoryName = '{category}' AND {_between(first, last)}", category=category, period=label)
+    for country in COUNTRIES:
+        add("customers_by_country", ["How many customers are located in {country}?",
+                                     "Number of customers based in {country}."],
+            f"SELECT COUNT(*) AS customers FROM Customers WHERE Country = '{country}'", country=country)
+        add("orders_by_country", ["How many orders were shipped to {country}?",
+                                  "Count of orders with {country} as the ship country."],
+            f"SELECT COUNT(*) AS orders FROM Orders WHERE ShipCountry = '{country}'", country=country)
+        add("revenue_by_country", ["What was the total revenue from customers in {country}?",
+                                   "Sales to {country} customers, after discounts."],
+            f"SELECT ROUND({REVENUE}, 2) AS revenue {WITH_CUSTOMERS} WHERE cu.Country = '{country}'", country=country)
+    for n in (3, 5, 10):
+        add("expensive_products", ["List the {n} most expensive products by UnitPrice.",
+                                   "The {n} priciest products in the catalog."],
+            f"SELECT ProductName AS product, UnitPrice FROM Products ORDER BY UnitPrice DESC LIMIT {n}", n=n)
+    add("top_supplier", ["Which supplier provides the most products?"],
+        "SELECT s.CompanyName AS supplier, COUNT(*) AS products FROM Products p "
+        "JOIN Suppliers s ON s.SupplierID = p.SupplierID GROUP BY s.SupplierID ORDER BY products DESC LIMIT 1")
+    return demos
+
+def eval_similarity(demos: List[Dict[str, str]], questions: List[str]) -> List[float]:
+    """Each demo's highest TF-IDF cosine similarity to an evaluation question (DemoStore's vectorizer settings)"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)
+    matrix = vectorizer.fit_transform([d["question"] for d in demos] + questions)
+    similarity = (matrix[:len(demos)] @ matrix[len(demos):].T).toarray()
+    return similarity.max(axis=1).tolist()
+
+def check_queries(demos: List[Dict[str, str]]):
+    """Run every query against a generated Northwind database; raise on the first that fails or returns nothing"""
+    db_path = os.path.join(tempfile.mkdtemp(), "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    conn = sqlite3.connect(db_path)
+    try:
+        for demo in demos:
+            if not conn.execute(demo["sql_query"]).fetchall():
+                raise click.ClickException(f"{demo['id']} returned no rows")
+    finally:
+        conn.close()
+
+@click.command()
+@click.option('--out', default='data/sql_demos.jsonl', show_default=True, help='Demo file to write')
+@click.option('--eval', 'eval_path', default='sample_questions_hybrid_eval.jsonl', show_default=True,
+              help='Evaluation questions the demos must not resemble')
+@click.option('--max-similarity', default=0.5, show_default=True, type=float,
+              help='Drop demos at least this similar (TF-IDF cosine) to any evaluation question')
+@click.option('--seed', default=0, show_default=True, type=int, help='Seed for picking question phrasings')
+def main(out: str, eval_path: str, max_similarity: float, seed: int):
+    """Write the few-shot SQL demo file"""
+    demos = build_demos(seed)
+    with open(eval_path, 'r', encoding='utf-8') as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    similarity = eval_similarity(demos, questions)
+    kept = [demo for demo, score in zip(demos, similarity) if score < max_similarity]
+    closest = max(score for score in similarity if score < max_similarity)
+    check_queries(kept)
+    with open(out, 'w', encoding='utf-8') as f:
+        for demo in kept:
+            f.write(json.dumps(demo) + "\n")
+    print(f"Wrote {len(kept)} demos to {out}; dropped {len(demos) - len(kept)} too similar to {eval_path}")
+    print(f"Highest remaining similarity to an evaluation question: {closest:.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+from typing import List, Dict, Any
+
+CATEGORIES = [
+    ('Beverages', 'Soft drinks, coffees, teas, beers, and ales'),
+    ('Condiments', 'Sweet and savory sauces, relishes, spreads, and seasonings'),
+    ('Confections', 'Desserts, candies, and sweet breads'),
+    ('Dairy Products', 'Cheeses'),
+    ('Grains/Cereals', 'Breads, crackers, pasta, and cereal'),
+    ('Meat/Poultry', 'Prepared meats'),
+    ('Produce', 'Dried fruit and bean curd'),
+    ('Seafood', 'Seaweed and fish'),
+]
+
+COUNTRIES = ['Germany', 'France', 'USA', 'UK', 'Brazil', 'Spain', 'Italy', 'Mexico', 'Canada', 'Sweden']
+
+TOPICS = [
+    ('policy', ['return window', 'unopened', 'perishable', 'refund', 'exchange', 'damaged goods']),
+    ('kpi', ['average order value', 'gross margin', 'revenue', 'discount', 'quantity', 'repeat customers']),
+    ('calendar', ['summer campaign', 'winter classics', 'holiday promotion', 'seasonal bundle', 'launch week']),
+    ('catalog', ['beverages', 'condiments', 'seafood', 'dairy', 'confections', 'produce']),
+]
+
+FILLER = (
+    "the team reviews figures weekly and reports changes to regional managers "
+    "while stores follow the same guidance for every order placed online or in person"
+).split()
+
+QUESTION_TEMPLATES = [
+    ("According to the product policy, what is the return window (days) for unopened {category}? Return an integer.", "int"),
+    ("During '{campaign}' as defined in the marketing calendar, which product category had the highest total quantity sold?", "{category:str, quantity:int}"),
+    ("Using the AOV definition from the KPI docs, what was the Average Order Value during '{campaign}'?", "float"),
+    ("Which customer had the highest revenue in {year}?", "{customer:str, revenue:float}"),
+    ("Top 3 products by revenue in {year}.", "list[{product:str, revenue:float}]"),
+    ("How many orders were shipped to {country}?", "int"),
+]
+
+def generate_docs(directory: str, n_docs: int = 200, paragraphs: int = 12, seed: int = 0) -> int:
+    """Write a synthetic markdown corpus; returns the number of paragraphs (chunks) written"""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    chunks = 0
+    for i in range(n_docs):
+        topic, phrases = TOPICS[i % len(TOPICS)]
+        lines = [f"# {topic.title()} notes {i}", ""]
+        for p in range(paragraphs):
+            words = []
+            for _ in range(rng.randint(30, 70)):
+                words.append(rng.choice(phrases) if rng.random() < 0.15 else rng.choice(FILLER))
+            lines.append(f"Section {p}: " + " ".join(words) + ".")
+            lines.append("")
+            chunks += 1
+        with open(os.path.join(directory, f"{topic}_{i:05d}.md"), 'w') as f:
+            f.write("\n".join(lines))
+    return chunks
+
+def generate_northwind(path: str, scale: int = 10, seed: int = 0) -> Dict[str, int]:
+    """Build a Northwind-shaped database with `scale` times the original order volume"""
+    rng = random.Random(seed)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+    CREATE TABLE Categories (CategoryID INTEGER PRIMARY KEY, CategoryName TEXT, Description TEXT);
+    CREATE TABLE Suppliers (SupplierID INTEGER PRIMARY KEY, CompanyName TEXT, Country TEXT);
+    CREATE TABLE Customers (CustomerID TEXT PRIMARY KEY, CompanyName TEXT, City TEXT, Country TEXT);
+    CREATE TABLE Employees (EmployeeID INTEGER PRIMARY KEY, LastName TEXT, FirstName TEXT);
+    CREATE TABLE Shippers (ShipperID INTEGER PRIMARY KEY, CompanyName TEXT);
+    CREATE TABLE Products (
+        ProductID INTEGER PRIMARY KEY, ProductName TEXT,
+        SupplierID INTEGER REFERENCES Suppliers(SupplierID),
+        CategoryID INTEGER REFERENCES Categories(CategoryID),
+        UnitPrice NUMERIC, UnitsInStock INTEGER, Discontinued INTEGER
+    );
+    CREATE TABLE Orders (
+        OrderID INTEGER PRIMARY KEY,
+        CustomerID TEXT REFERENCES Customers(CustomerID),
+        EmployeeID INTEGER REFERENCES Employees(EmployeeID),
+        OrderDate DATETIME, ShippedDate DATETIME,
+        ShipVia INTEGER REFERENCES Shippers(ShipperID),
+        Freight NUMERIC, ShipCountry TEXT
+    );
+    CREATE TABLE "Order Details" (
+        OrderID INTEGER REFERENCES Orders(OrderID),
+        ProductID INTEGER REFERENCES Products(ProductID),
+        UnitPrice NUMERIC, Quantity INTEGER, Discount REAL,
+        PRIMARY KEY (OrderID, ProductID)
+    );
+    CREATE VIEW order_items AS SELECT * FROM "Order Details";
+    ''')
+    conn.executemany('INSERT INTO Categories VALUES (?, ?, ?)',
+                     [(i, name, desc) for i, (name, desc) in enumerate(CATEGORIES, 1)])
+    conn.executemany('INSERT INTO Suppliers VALUES (?, ?, ?)',
+                     [(i, f"Supplier {i}", rng.choice(COUNTRIES)) for i in range(1, 30)])
+    customers = [f"C{i:05d}" for i in range(91 * scale)]
+    conn.executemany('INSERT INTO Customers VALUES (?, ?, ?, ?)',
+                     [(c, f"Company {c}", f"City {rng.randint(1, 200)}", rng.choice(COUNTRIES)) for c in customers])
+    conn.executemany('INSERT INTO Employees VALUES (?, ?, ?)',
+                     [(i, f"Last{i}", f"First{i}") for i in range(1, 10)])
+    conn.executemany('INSERT INTO Shippers VALUES (?, ?)',
+                     [(i, f"Shipper {i}") for i in range(1, 4)])
+    products = [
+        (i, f"Product {i}", rng.randint(1, 29), rng.randint(1, len(CATEGORIES)),
+         round(rng.uniform(2, 120), 2), rng.randint(0, 120), int(rng.random() < 0.1))
+        for i in range(1, 78)
+    ]
+    conn.executemany('INSERT INTO Products VALUES (?, ?, ?, ?, ?, ?, ?)', products)
+
+    orders = []
+    details = []
+    start = date(1996, 7, 4)
+    for order_id in range(10248, 10248 + 830 * scale):
+        ordered = start + timedelta(days=rng.randint(0, 670))
+        orders.append((
+            order_id, rng.choice(customers), rng.randint(1, 9),
+            f"{ordered.isoformat()} 00:00:00",
+            f"{(ordered + timedelta(days=rng.randint(1, 30))).isoformat()} 00:00:00",
+            rng.randint(1, 3), round(rng.uniform(1, 500), 2), rng.choice(COUNTRIES)
+        ))
+        for product in rng.sample(products, rng.randint(1, 5)):
+            details.append((order_id, product[0], product[4], rng.randint(1, 60), rng.choice([0, 0, 0.05, 0.1, 0.15])))
+    conn.executemany('INSERT INTO Orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)', orders)
+    conn.executemany('INSERT INTO "Order Details" VALUES (?, ?, ?, ?, ?)', details)
+    conn.commit()
+    conn.close()
+    return {"orders": len(orders), "order_details": len(details), "customers": len(customers)}
+
+def generate_questions(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Questions in the evaluation file's shape, cycling through every route and format"""
+    rng = random.Random(seed)
+    campaigns = ['Summer Beverages 1997', 'Winter Classics 1997']
+    questions = []
+    for i in range(n):
+        template, format_hint = QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)]
+        question = template.format(
+            category=rng.choice(CATEGORIES)[0],
+            campaign=rng.choice(campaigns),
+            year=rng.choice([1996, 1997, 1998]),
+            country=rng.choice(COUNTRIES)
+        )
+        questions.append({"id": f"bench_{i:05d}", "question": question, "format_hint": format_hint})
+    return questions
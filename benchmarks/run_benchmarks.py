@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Offline performance benchmarks for the retriever, the SQL tool and full agent batches"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import resource
+import tracemalloc
+from typing import List, Dict, Any, Callable, Optional, Tuple
+import click
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datasets import generate_docs, generate_northwind, generate_questions
+from benchmarks.stub_lm import StubLM, CANNED_SQL, DEFAULT_SQL
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    """p50/p95 in milliseconds of per-call durations given in seconds"""
+    p50, p95 = np.percentile(np.asarray(samples) * 1000.0, [50, 95])
+    return {"p50_ms": float(p50), "p95_ms": float(p95)}
+
+def _peak_memory(fn: Callable[[], Any]) -> float:
+    """Peak Python heap allocation (MiB) while running fn"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def prepare_workspace(workdir: str, n_docs: int, scale: int, regenerate: bool = False) -> Dict[str, str]:
+    """Generate (or reuse) the benchmark corpus and database"""
+    paths = {
+        "docs_dir": os.path.join(workdir, f"docs_{n_docs}"),
+        "db_path": os.path.join(workdir, f"northwind_x{scale}.sqlite"),
+        "index_dir": os.path.join(workdir, f"index_{n_docs}"),
+    }
+    if regenerate or not os.path.isdir(paths["docs_dir"]):
+        shutil.rmtree(paths["docs_dir"], ignore_errors=True)
+        chunks = generate_docs(paths["docs_dir"], n_docs=n_docs)
+        print(f"Generated {n_docs} documents ({chunks} chunks) in {paths['docs_dir']}")
+    if regenerate or not os.path.exists(paths["db_path"]):
+        counts = generate_northwind(paths["db_path"], scale=scale)
+        print(f"Generated Northwind x{scale}: {counts}")
+    return paths
+
+def bench_retriever(paths: Dict[str, str], queries: List[str], mode: str) -> Dict[str, Any]:
+    from agent.rag.retrieval import SimpleRetriever
+
+    def cold_build():
+        shutil.rmtree(paths["index_dir"], ignore_errors=True)
+        retriever = SimpleRetriever(paths["docs_dir"], paths["index_dir"], mode=mode)
+        retriever.retrieve_many(queries[:1])
+        return retriever
+
+    start = time.perf_counter()
+    cold_build()
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    retriever = SimpleRetriever(paths["docs_dir"], paths["index_dir"], mode=mode)
+    retriever.retrieve_many(queries[:1])
+    load_s = time.perf_counter() - start
+
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.retrieve(query)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    retriever.retrieve_many(queries)
+    batch_s = time.perf_counter() - start
+
+    peak_mib = _peak_memory(lambda: cold_build().retrieve_many(queries))
+    return {
+        "chunks": len(retriever.chunks),
+        "index_build_s": build_s,
+        "index_load_s": load_s,
+        "single_qps": len(queries) / sum(samples),
+        **_latency_stats(samples),
+        "batch_qps": len(queries) / batch_s,
+        "peak_mib": peak_mib
+    }
+
+def bench_sql(paths: Dict[str, str], questions: List[str], repeat: int) -> Dict[str, Any]:
+    from agent.tools.sqlite_tool import SQLiteTool
+
+    queries = [sql for _, sql in CANNED_SQL] + [DEFAULT_SQL]
+
+    def run_queries(tool):
+        samples = []
+        for _ in range(repeat):
+            for sql in queries:
+                start = time.perf_counter()
+                result = tool.execute_query(sql)
+                samples.append(time.perf_counter() - start)
+                if not result["success"]:
+                    raise RuntimeError(f"Benchmark query failed: {result['error']}")
+        return samples
+
+    uncached = SQLiteTool(paths["db_path"], result_cache_bytes=0)
+    uncached_samples = run_queries(uncached)
+    schema_samples = []
+    for question in questions:
+        start = time.perf_counter()
+        uncached.get_schema(question=question)
+        schema_samples.append(time.perf_counter() - start)
+    peak_mib = _peak_memory(lambda: run_queries(uncached))
+    uncached.close()
+
+    cached = SQLiteTool(paths["db_path"])
+    cached_samples = run_queries(cached)[len(queries):]
+    cached.close()
+    return {
+        "queries": len(uncached_samples),
+        "uncached_qps": len(uncached_samples) / sum(uncached_samples),
+        **{f"uncached_{k}": v for k, v in _latency_stats(uncached_samples).items()},
+        "cached_qps": len(cached_samples) / sum(cached_samples),
+        **{f"schema_{k}": v for k, v in _latency_stats(schema_samples).items()},
+        "peak_mib": peak_mib
+    }
+
+def bench_agent(paths: Dict[str, str], questions: List[Dict[str, Any]], latency: float, jitter: float,
+                workers: int, use_async: bool, retrieval_mode: str) -> Dict[str, Any]:
+    import dspy
+    from agent.graph_hybrid import HybridAgent
+    from agent.tracing import Tracer
+    from agent.batch import run_batch
+
+    lm = StubLM(latency=latency, jitter=jitter)
+    dspy.settings.configure(lm=lm, track_usage=True)
+
+    def run(tracer: Tracer) -> Tuple[List[Dict[str, Any]], float]:
+        agent = HybridAgent(
+            max_llm_calls=workers,
+            llm_cache=None,
+            retrieval_mode=retrieval_mode,
+            db_pool_size=max(4, workers),
+            tracer=tracer,
+            db_path=paths["db_path"],
+            docs_dir=paths["docs_dir"],
+            index_dir=paths["index_dir"]
+        )
+        # Startup cost is excluded; run_batch prefetches documents as it reads questions
+        agent.warmup()
+        start = time.perf_counter()
+        results = asyncio.run(run_batch(agent, questions, workers, use_async))
+        elapsed = time.perf_counter() - start
+        agent.db_tool.close()
+        return results, elapsed
+
+    tracer = Tracer(enabled=True)
+    results, elapsed = run(tracer)
+    llm_calls = lm.calls
+    failed = sum(1 for r in results if r["final_answer"] is None)
+
+    nodes = {
+        key.split(":", 1)[1]: {"count": stats["count"], "p50_ms": stats["p50_ms"], "p95_ms": stats["p95_ms"]}
+        for key, stats in tracer.summary().items()
+    }
+    peak_mib = _peak_memory(lambda: run(Tracer(enabled=False)))
+    return {
+        "questions": len(questions),
+        "elapsed_s": elapsed,
+        "throughput_qps": len(questions) / elapsed,
+        "failed": failed,
+        "llm_calls": llm_calls,
+        "spans": nodes,
+        "peak_mib": peak_mib
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Throughput metrics that dropped by more than `tolerance` relative to a baseline run"""
+    regressions = []
+    for section, metrics in results.items():
+        for name, value in metrics.items():
+            if not name.endswith("qps"):
+                continue
+            before = baseline.get(section, {}).get(name)
+            if before and value < before * (1 - tolerance):
+                regressions.append(f"{section}.{name}: {before:.1f} -> {value:.1f}")
+    return regressions
+
+def _print_section(name: str, metrics: Dict[str, Any]):
+    print(f"\n== {name} ==")
+    for key, value in metrics.items():
+        if key == "spans":
+            print(f"  {'span':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}")
+            for span, stats in value.items():
+                print(f"  {span:<28}{stats['count']:>7}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}")
+        elif isinstance(value, float):
+            print(f"  {key:<28}{value:>12.2f}")
+        else:
+            print(f"  {key:<28}{value:>12}")
+
+@click.command()
+@click.option('--workdir', default='.cache/benchmarks', show_default=True, help='Where generated data is kept')
+@click.option('--docs', 'n_docs', default=200, show_default=True, type=int, help='Generated documents')
+@click.option('--scale', default=10, show_default=True, type=int, help='Northwind order volume multiplier')
+@click.option('--questions', 'n_questions', default=120, show_default=True, type=int,
+              help='Questions per agent batch')
+@click.option('--latency', default=0.02, show_default=True, type=float, help='Simulated seconds per LLM call')
+@click.option('--jitter', default=0.0, show_default=True, type=float, help='Extra random seconds per LLM call')
+@click.option('--workers', default=8, show_default=True, type=int, help='Concurrent questions in the agent batch')
+@click.option('--async-mode', is_flag=True, help='Drive the agent through its async invoke path')
+@click.option('--retrieval-mode', default='tfidf', show_default=True, type=click.Choice(['tfidf', 'hybrid']))
+@click.option('--only', type=click.Choice(['retriever', 'sql', 'agent']), multiple=True,
+              help='Run only these benchmarks (repeatable)')
+@click.option('--regenerate', is_flag=True, help='Rebuild the generated corpus and database')
+@click.option('--json', 'json_path', default=None, help='Write results as JSON')
+@click.option('--baseline', default=None, help='Earlier --json output to compare throughput against')
+@click.option('--tolerance', default=0.2, show_default=True, type=float,
+              help='Allowed fractional throughput drop before a regression is reported')
+def main(workdir: str, n_docs: int, scale: int, n_questions: int, latency: float, jitter: float,
+         workers: int, async_mode: bool, retrieval_mode: str, only: List[str], regenerate: bool,
+         json_path: Optional[str], baseline: Optional[str], tolerance: float):
+    """Run the benchmark suite against generated data and a deterministic stub LM"""
+    paths = prepare_workspace(workdir, n_docs, scale, regenerate)
+    questions = generate_questions(n_questions)
+    texts = [q["question"] for q in questions]
+    selected = set(only) or {'retriever', 'sql', 'agent'}
+
+    results = {}
+    if 'retriever' in selected:
+        results["retriever"] = bench_retriever(paths, texts, retrieval_mode)
+        _print_section("retriever", results["retriever"])
+    if 'sql' in selected:
+        results["sql"] = bench_sql(paths, texts, repeat=5)
+        _print_section("sql", results["sql"])
+    if 'agent' in selected:
+        results["agent"] = bench_agent(paths, questions, latency, jitter, workers, async_mode, retrieval_mode)
+        _print_section("agent", results["agent"])
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nProcess peak RSS: {peak_rss:.0f} MiB")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        if regressions:
+            print("Throughput regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No throughput regressions against baseline")
+
+if __name__ == '__main__':
+    main()
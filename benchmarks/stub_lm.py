@@ -0,0 +1,129 @@
+import re
+import time
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import dspy
+
+# Canned SQL keyed by the first keyword found in the question; all valid against Northwind
+CANNED_SQL = [
+    ('categor', 'SELECT c.CategoryName, SUM(od.Quantity) AS quantity FROM "Order Details" od '
+                'JOIN Products p ON od.ProductID = p.ProductID '
+                'JOIN Categories c ON p.CategoryID = c.CategoryID '
+                'GROUP BY c.CategoryName ORDER BY quantity DESC LIMIT 1'),
+    ('customer', 'SELECT cu.CompanyName, SUM(od.UnitPrice * od.Quantity * (1 - od.Discount)) AS revenue '
+                 'FROM Orders o JOIN "Order Details" od ON o.OrderID = od.OrderID '
+                 'JOIN Customers cu ON o.CustomerID = cu.CustomerID '
+                 'GROUP BY cu.CompanyName ORDER BY revenue DESC LIMIT 1'),
+    ('aov', 'SELECT SUM(od.UnitPrice * od.Quantity * (1 - od.Discount)) / COUNT(DISTINCT o.OrderID) AS aov '
+            'FROM Orders o JOIN "Order Details" od ON o.OrderID = od.OrderID'),
+    ('product', 'SELECT p.ProductName, SUM(od.UnitPrice * od.Quantity * (1 - od.Discount)) AS revenue '
+                'FROM "Order Details" od JOIN Products p ON od.ProductID = p.ProductID '
+                'GROUP BY p.ProductName ORDER BY revenue DESC LIMIT 3'),
+]
+DEFAULT_SQL = 'SELECT COUNT(*) AS orders FROM Orders'
+
+# Canned answers per format hint
+CANNED_ANSWERS = {
+    'int': '14',
+    'float': '1234.56',
+}
+
+_FIELD_RE = re.compile(r'\[\[ ## (\w+) ## \]\]')
+
+class StubLM(dspy.BaseLM):
+    """Deterministic stand-in LM returning canned router, SQL and answer outputs
+
+    Replies are formatted for DSPy's ChatAdapter, so real signatures and
+    predictors run unchanged. `latency` (seconds, plus up to `jitter`) is slept
+    per call to simulate a model server.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        super().__init__(model="stub-lm", cache=False)
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    def _delay(self) -> float:
+        if not self.latency and not self.jitter:
+            return 0.0
+        return self.latency + self._random.random() * self.jitter
+
+    @staticmethod
+    def _inputs(text: str) -> Dict[str, str]:
+        """Parse '[[ ## field ## ]]' sections of the final user message"""
+        parts = _FIELD_RE.split(text)
+        return {parts[i]: parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+
+    @staticmethod
+    def route(question: str) -> str:
+        q = question.lower()
+        if any(word in q for word in ('during', 'kpi', 'definition', 'calendar', 'campaign')):
+            return 'hybrid'
+        if any(word in q for word in ('policy', 'return window', 'according to')):
+            return 'rag'
+        return 'sql'
+
+    @staticmethod
+    def sql(question: str) -> str:
+        q = question.lower()
+        for keyword, query in CANNED_SQL:
+            if keyword in q:
+                return query
+        return DEFAULT_SQL
+
+    @staticmethod
+    def answer(format_hint: str) -> str:
+        if format_hint.startswith('list['):
+            return '[{"name": "Chai", "value": 1}]'
+        if format_hint.startswith('{'):
+            return '{"name": "Beverages", "value": 1}'
+        return CANNED_ANSWERS.get(format_hint, 'See the sources cited.')
+
+    def reply(self, messages: List[Dict[str, str]]) -> str:
+        """Build a ChatAdapter-formatted completion for the requested output fields"""
+        user = messages[-1]['content']
+        inputs = self._inputs(user)
+        requested = re.search(r'Respond with the corresponding output fields(.*)', user, re.S)
+        fields = _FIELD_RE.findall(requested.group(1)) if requested else []
+        question = inputs.get('question', '')
+        values = {'reasoning': 'Deterministic benchmark reply.'}
+        if 'classification' in fields:
+            values['classification'] = self.route(question)
+        if 'sql_query' in fields:
+            values['sql_query'] = self.sql(question)
+        if 'final_answer' in fields:
+            values['final_answer'] = self.answer(inputs.get('format_hint', ''))
+            values['explanation'] = 'Answer produced by the benchmark stub LM.'
+        sections = [f"[[ ## {name} ## ]]\n{values.get(name, '')}" for name in fields if name != 'completed']
+        return "\n\n".join(sections + ["[[ ## completed ## ]]"])
+
+    def _response(self, messages: List[Dict[str, str]]):
+        self.calls += 1
+        content = self.reply(messages)
+        prompt_chars = sum(len(m.get('content') or '') for m in messages)
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4
+        }
+        message = SimpleNamespace(content=content, tool_calls=None)
+        choice = SimpleNamespace(message=message, finish_reason="stop", logprobs=None)
+        return SimpleNamespace(choices=[choice], usage=usage, model=self.model)
+
+    def forward(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._response(messages)
+
+    async def aforward(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(messages)
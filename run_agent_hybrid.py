@@ -1,39 +1,97 @@
 #!/usr/bin/env python3
-import json
+import os
+import time
+import asyncio
 import click
-from typing import List, Dict, Any
-from agent.graph_hybrid import HybridAgent
+from typing import Any, Optional
 import jsonlines
+from agent.batch import stream_batch, load_checkpoint, read_questions
+from agent.cli import agent_options, build_agent
 
 @click.command()
 @click.option('--batch', required=True, help='Input JSONL file with questions')
 @click.option('--out', required=True, help='Output JSONL file for results')
-def main(batch: str, out: str):
+@click.option('--workers', default=1, show_default=True, type=int,
+              help='Number of questions processed concurrently')
+@click.option('--async-mode', is_flag=True, help='Drive the graph through its async invoke path')
+@click.option('--timeout', default=None, type=float, help='Per-question timeout in seconds')
+@agent_options
+@click.option('--trace', 'trace_path', default=None,
+              help='Append a JSONL span per graph node and LLM call to this file')
+@click.option('--metrics', 'metrics_path', default=None,
+              help='Write Prometheus-style latency and token metrics to this file')
+@click.option('--trace-summary', is_flag=True,
+              help='Trace in memory and print per-node latency percentiles')
+@click.option('--warmup', is_flag=True,
+              help='Load the LM, graph, retrieval index and schema before the first question')
+@click.option('--restart', is_flag=True, help='Discard existing results in --out instead of resuming')
+@click.option('--no-dedupe', is_flag=True,
+              help='Answer identical questions separately instead of sharing in-flight work')
+def main(batch: str, out: str, workers: int, async_mode: bool, timeout: Optional[float],
+         trace_path: Optional[str], metrics_path: Optional[str], trace_summary: bool,
+         warmup: bool, restart: bool, no_dedupe: bool, **options: Any):
     """Main CLI entrypoint"""
-    agent = HybridAgent()
+    from agent.tracing import Tracer
     
-    # Read input questions
-    questions = []
-    with jsonlines.open(batch) as reader:
-        for obj in reader:
-            questions.append(obj)
-    
-    # Process each question
-    results = []
-    for q in questions:
-        result = agent.run(
-            question=q['question'],
-            format_hint=q['format_hint'],
-            question_id=q['id']
-        )
-        results.append(result)
-    
-    # Write results
-    with jsonlines.open(out, mode='w') as writer:
-        for result in results:
-            writer.write(result)
-    
-    print(f"Processed {len(results)} questions. Results written to {out}")
+    tracer = Tracer(enabled=bool(trace_path or metrics_path or trace_summary), path=trace_path)
+    agent = build_agent(options, workers, tracer, single_flight=not no_dedupe)
+    llm_cache, lm = agent.llm_cache, agent.lm
+    if warmup:
+        started = time.perf_counter()
+        agent.warmup()
+        print(f"Warmed up in {time.perf_counter() - started:.2f}s")
+
+    # The output file doubles as the checkpoint: questions already answered in it are skipped
+    if restart and os.path.exists(out):
+        os.remove(out)
+    answered = load_checkpoint(out)
+    if answered:
+        print(f"Resuming: {len(answered)} questions already answered in {out}")
+
+    # Stream questions through the agent, appending each result as soon as it is in order
+    batch_stats = {}
+    async def process() -> int:
+        written = 0
+        with jsonlines.open(out, mode='a', flush=True) as writer:
+            async for result in stream_batch(agent, read_questions(batch, answered), workers, async_mode,
+                                             timeout, dedupe=not no_dedupe, stats=batch_stats):
+                writer.write(result)
+                written += 1
+        return written
+
+    # Closing the tracer flushes the trace file, even if the batch raises
+    with tracer:
+        processed = asyncio.run(process())
+
+    print(f"Processed {processed} questions. Results written to {out}")
+    if llm_cache:
+        stats = llm_cache.stats()
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses")
+    if agent.db_tool.result_cache:
+        stats = agent.db_tool.result_cache.stats()
+        print(f"SQL result cache: {stats['hits']} hits, {stats['misses']} misses")
+    if agent.fast_router:
+        stats = agent.fast_router.stats()
+        print(f"Fast router: {stats['fast_path']} of {stats['fast_path'] + stats['fallback']} "
+              f"routing decisions ({stats['fast_path_rate']:.0%}) skipped the LLM")
+    stats = agent.prompts.stats()
+    if stats["calls"]:
+        print(f"Prompt assembly: ~{stats['saved_tokens']} of {stats['raw_tokens']} context tokens trimmed "
+              f"over {stats['calls']} LLM calls")
+    if agent.demo_store:
+        stats = agent.demo_store.stats()
+        print(f"SQL demos: {stats['avg_selected']:.1f} of {stats['demos']} demos per SQL generation on average")
+    if lm is not None:
+        for endpoint in lm.stats()["endpoints"]:
+            print(f"LM endpoint {endpoint['url']}: {endpoint['calls']} calls, {endpoint['failures']} failures")
+    if agent.flights:
+        shared = batch_stats.get("deduplicated", 0) + agent.flights.stats()["shared"]
+        print(f"Deduplication: {shared} duplicate questions reused in-flight answers")
+    if tracer.enabled:
+        print(tracer.format_summary())
+        if metrics_path:
+            with open(metrics_path, 'w') as f:
+                f.write(tracer.prometheus())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
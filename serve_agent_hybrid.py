@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import time
+import click
+from typing import Any, Optional
+from agent.cli import agent_options, build_agent
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on')
+@click.option('--port', default=8765, show_default=True, type=int, help='Port to listen on')
+@click.option('--workers', default=4, show_default=True, type=int,
+              help='Questions answered concurrently')
+@click.option('--queue-size', default=64, show_default=True, type=int,
+              help='Questions that may wait for a worker before requests get a 429')
+@click.option('--timeout', default=None, type=float, help='Seconds a request waits for its answers')
+@agent_options
+@click.option('--trace', 'trace_path', default=None,
+              help='Append a JSONL span per graph node and LLM call to this file')
+def main(host: str, port: int, workers: int, queue_size: int, timeout: Optional[float],
+         trace_path: Optional[str], **options: Any):
+    """Serve the copilot over HTTP: POST /ask, GET /healthz, GET /metrics"""
+    from agent.tracing import Tracer
+    from agent.server import CopilotServer
+
+    # Tracing is always on so /metrics can report per-node latency
+    agent = build_agent(options, workers, Tracer(enabled=True, path=trace_path))
+    started = time.perf_counter()
+    agent.warmup()
+    print(f"Warmed up in {time.perf_counter() - started:.2f}s")
+
+    server = CopilotServer(agent, host, port, workers=workers, queue_size=queue_size, timeout=timeout)
+    host, port = server.address
+    print(f"Serving on http://{host}:{port} ({workers} workers, queue of {queue_size})")
+    with agent.tracer:
+        server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+sys.path.append('.')
+from agent.tools.sqlite_tool import SQLiteTool
+from benchmarks.datasets import generate_northwind
+
+def test_aggregates():
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    tool = SQLiteTool(db_path, aggregates_path=os.path.join(workdir, "northwind.aggregates.sqlite"))
+
+    schema = tool.get_schema(question="Which product category sold the most during Summer Beverages 1997?")
+    assert "daily_category_sales" in schema
+
+    detailed = '''SELECT c.CategoryName, SUM(od.Quantity) FROM "Order Details" od
+    JOIN Orders o ON o.OrderID = od.OrderID JOIN Products p ON p.ProductID = od.ProductID
+    JOIN Categories c ON c.CategoryID = p.CategoryID
+    WHERE date(o.OrderDate) BETWEEN '1997-06-01' AND '1997-06-30' GROUP BY c.CategoryName ORDER BY 1'''
+    summary = '''SELECT CategoryName, SUM(quantity) FROM daily_category_sales
+    WHERE day BETWEEN '1997-06-01' AND '1997-06-30' GROUP BY CategoryName ORDER BY 1'''
+    assert tool.execute_query(detailed)["rows"] == tool.execute_query(summary)["rows"]
+    plan = " ".join(step["detail"] for step in tool.explain(summary)["plan"])
+    assert "USING INDEX" in plan, plan
+
+    # Changing the source database rebuilds the summaries on the next query
+    time.sleep(0.01)
+    conn = sqlite3.connect(db_path)
+    conn.execute('UPDATE "Order Details" SET Quantity = Quantity + 1000 WHERE rowid = 1')
+    conn.commit()
+    conn.close()
+    old_pool = tool.pool
+    totals = tool.execute_query('SELECT (SELECT SUM(quantity) FROM daily_sales), (SELECT SUM(Quantity) FROM "Order Details")')
+    assert totals["rows"][0][0] == totals["rows"][0][1], totals
+    # The pool attached to the replaced sidecar is closed once the swap is done
+    assert tool.pool is not old_pool and not old_pool._all
+
+    # A sidecar that cannot be built leaves no temporary file and falls back to the base tables
+    blocked = os.path.join(workdir, "blocked.aggregates.sqlite")
+    os.makedirs(os.path.join(blocked, "occupied"))
+    fallback = SQLiteTool(db_path, aggregates_path=blocked)
+    result = fallback.execute_query("SELECT COUNT(*) FROM Orders")
+    assert result["success"] and result["rows"] == [[830]], result
+    assert fallback.aggregates is None and "daily_sales" not in fallback.get_schema_info()
+    assert "daily_category_sales" not in fallback.get_schema(question="Which category sold the most?")
+    assert not [name for name in os.listdir(workdir) if name.endswith(".tmp")], os.listdir(workdir)
+
+    print(f"Summary plan: {plan}")
+    print("Aggregates test: SUCCESS")
+
+if __name__ == "__main__":
+    test_aggregates()
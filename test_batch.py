@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import sys
+import time
+import asyncio
+import threading
+sys.path.append('.')
+from agent.batch import run_batch, stream_batch
+
+class StubAgent:
+    """Answers after the delay given in the question text, recording how many run at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def prefetch_docs(self, questions):
+        pass
+
+    def _enter(self):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def _exit(self):
+        with self.lock:
+            self.running -= 1
+
+    def _result(self, question, question_id):
+        return {"id": question_id, "final_answer": question, "sql": "", "confidence": 1.0,
+                "explanation": "", "citations": []}
+
+    def run(self, question, format_hint, question_id):
+        self._enter()
+        try:
+            time.sleep(float(question))
+            return self._result(question, question_id)
+        finally:
+            self._exit()
+
+    async def arun(self, question, format_hint, question_id):
+        self._enter()
+        try:
+            await asyncio.sleep(float(question))
+            return self._result(question, question_id)
+        finally:
+            self._exit()
+
+def test_batch():
+    # Later questions finish first; one runs past the timeout
+    delays = ["0.25", "0.2", "0.15", "0.1", "0.05", "0.0", "2.0", "0.0"]
+    questions = [{"id": f"q{i}", "question": delay, "format_hint": "str"} for i, delay in enumerate(delays)]
+    for use_async in (False, True):
+        agent = StubAgent()
+        results = asyncio.run(run_batch(agent, questions, workers=4, use_async=use_async, timeout=0.5))
+        assert [r["id"] for r in results] == [q["id"] for q in questions]
+        assert [r["final_answer"] for r in results] == delays[:6] + [None, "0.0"], results
+        assert "Timed out" in results[6]["explanation"] and results[6]["confidence"] == 0.0
+        # --workers questions run at once, no more
+        assert agent.peak == 4, agent.peak
+
+    # No more than `window` questions are read ahead of the results handed back
+    read = []
+    def source():
+        for i in range(20):
+            read.append(i)
+            yield {"id": f"w{i}", "question": "0.0", "format_hint": "str"}
+    async def consume():
+        held = []
+        async for result in stream_batch(StubAgent(), source(), workers=2, window=4):
+            held.append(len(read) - int(result["id"][1:]))
+        return held
+    held = asyncio.run(consume())
+    assert len(held) == 20 and max(held) <= 4, held
+    print("Batch test: SUCCESS")
+
+if __name__ == "__main__":
+    test_batch()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import tempfile
+sys.path.append('.')
+from agent.batch import failed_result, load_checkpoint
+
+def test_checkpoint():
+    path = os.path.join(tempfile.mkdtemp(), "outputs.jsonl")
+    records = [
+        {"id": "a", "final_answer": 14, "sql": "SELECT 14", "confidence": 0.7, "explanation": "", "citations": []},
+        failed_result("b", "Timed out after 5.0s"),
+        failed_result("c", "Failed: boom"),
+        # An answered question with no answer and no confidence is still answered
+        {"id": "e", "final_answer": None, "sql": "", "confidence": 0.0, "explanation": "no rows", "citations": []},
+        {"id": "c", "final_answer": 3, "sql": "", "confidence": 0.9, "explanation": "", "citations": []},
+    ]
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write('{"id": "d", "final_ans')
+
+    # Failed questions rerun; a later successful record for the same ID counts as answered
+    assert load_checkpoint(path) == {"a", "c", "e"}
+    with open(path) as f:
+        assert len(f.read().splitlines()) == 5
+    print("Checkpoint test: SUCCESS")
+
+if __name__ == "__main__":
+    test_checkpoint()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import tempfile
+sys.path.append('.')
+from agent.demo_store import DemoStore
+from agent.graph_hybrid import HybridAgent
+from benchmarks.build_sql_demos import eval_similarity
+
+def test_demo_store():
+    index_dir = tempfile.mkdtemp()
+    store = DemoStore("data/sql_demos.jsonl", index_dir=index_dir, k=3)
+    question = "Best-selling category by units in June 1997?"
+    demos = store.select(question)
+    print(f"Demos: {[demo['id'] for demo in demos]}")
+    assert len(demos) == 3
+    assert demos[0]["id"].startswith("top_category_quantity") and "1997-06-01" in demos[0]["sql_query"]
+    assert store.select("What is the return window for unopened Beverages?", k=0) == []
+    
+    # A second store reuses the persisted index
+    reloaded = DemoStore("data/sql_demos.jsonl", index_dir=index_dir, k=3)
+    assert [demo["id"] for demo in reloaded.select(question)] == [demo["id"] for demo in demos]
+
+    # demos.json from another save next to the old manifest and matrices is rebuilt, not loaded
+    demos_path = os.path.join(index_dir, "demos.json")
+    with open(demos_path, encoding="utf-8") as f:
+        saved = json.load(f)
+    with open(demos_path, "w", encoding="utf-8") as f:
+        json.dump(saved[:-1], f)
+    rebuilt = DemoStore("data/sql_demos.jsonl", index_dir=index_dir, k=3)
+    assert [demo["id"] for demo in rebuilt.select(question)] == [demo["id"] for demo in demos]
+    assert len(rebuilt.demos) == len(saved)
+    
+    # The shipped demos stay clear of the evaluation questions
+    with open("sample_questions_hybrid_eval.jsonl", encoding="utf-8") as f:
+        eval_questions = [json.loads(line)["question"] for line in f if line.strip()]
+    assert max(eval_similarity(store.demos, eval_questions)) < 0.5
+    assert len(store.demos) >= 200
+
+    # The agent persists the demo index where it is told to
+    agent = HybridAgent(sql_demo_index_dir=index_dir, index_dir=None)
+    assert agent.demo_store.index_dir == index_dir
+
+    print(f"Demo store stats: {store.stats()}")
+    print("Demo store test: SUCCESS")
+
+if __name__ == "__main__":
+    test_demo_store()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+import sys
+sys.path.append('.')
+from agent.fast_router import FastRouter
+
+def test_fast_router():
+    router = FastRouter(threshold=0.75)
+    questions = [
+        "According to the product policy, what is the return window (days) for unopened Beverages?",
+        "How many orders were shipped to France?",
+        "Using the AOV definition from the KPI docs, what was the AOV during 'Summer Beverages 1997'?",
+    ]
+    for question, (label, probability) in zip(questions, router.predict(questions)):
+        print(f"  {label} ({probability:.2f}): {question}")
+        assert router.score(question)[0] == label
+    
+    assert router.route("What is the return window for opened Seafood according to the policy?") == "rag"
+    # Off-topic questions are not confidently routed; they fall back to the LLM router
+    for question in ("Hello", "What is the capital of France?", "Tell me a joke"):
+        assert router.route(question) is None, router.score(question)
+    assert router.stats()["fallback"] == 3
+    print(f"Fast router stats: {router.stats()}")
+    print("Fast router test: SUCCESS")
+
+if __name__ == "__main__":
+    test_fast_router()
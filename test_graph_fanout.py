@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import tempfile
+import threading
+sys.path.append('.')
+from agent.graph_hybrid import HybridAgent
+from benchmarks.datasets import generate_docs, generate_northwind
+from benchmarks.stub_lm import StubLM
+
+def test_graph_fanout():
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    generate_docs(os.path.join(workdir, "docs"), n_docs=5)
+    agent = HybridAgent(db_path=db_path, docs_dir=os.path.join(workdir, "docs"), index_dir=None,
+                        sql_demos_path=None, fast_router_threshold=None, lm=StubLM())
+
+    # Routing, retrieval and schema preparation run at the same time and meet in join_context
+    spans = {}
+    lock = threading.Lock()
+    def timed(name, node):
+        def run(state):
+            started = time.perf_counter()
+            time.sleep(0.2)
+            update = node(state)
+            with lock:
+                spans[name] = (started, time.perf_counter())
+            return update
+        return run
+    agent.route_question = timed("router", agent.route_question)
+    agent.retrieve_docs = timed("retriever", agent.retrieve_docs)
+    agent.prepare_schema = timed("prepare_schema", agent.prepare_schema)
+    joined = []
+    agent.join_context = lambda state: joined.append(dict(state)) or {}
+
+    result = agent.run("How many orders were placed?", "int", "q1")
+    assert result["final_answer"] == 14, result
+    assert set(spans) == {"router", "retriever", "prepare_schema"}
+    assert max(start for start, _ in spans.values()) < min(end for _, end in spans.values()), spans
+    assert len(joined) == 1
+    state = joined[0]
+    assert state["classification"] == "sql" and state["relevant_docs"] and "Orders" in state["schema_info"]
+
+    # A schema failure does not fail a rag-only question
+    def broken(*args, **kwargs):
+        raise RuntimeError("sidecar unavailable")
+    agent.db_tool.get_schema = broken
+    result = agent.run("According to the product policy, what is the return window (days) for unopened Beverages?",
+                       "int", "q2")
+    assert result["final_answer"] is not None and joined[-1]["schema_info"] is None, result
+    print("Graph fan-out test: SUCCESS")
+
+if __name__ == "__main__":
+    test_graph_fanout()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+sys.path.append('.')
+import numpy as np
+from rank_bm25 import BM25Okapi
+from agent.rag.retrieval import SimpleRetriever
+
+DOCS = {
+    "policy.md": "Beverages unopened: 14 days return window.\n\nOpened beverages cannot be returned at all.\n\n"
+                 "Perishables such as dairy and seafood: 3 to 7 days.",
+    "kpi.md": "Average order value is revenue divided by the number of distinct orders.\n\n"
+              "Gross margin is revenue minus cost of goods, with cost approximated at 70 percent of unit price.",
+    "calendar.md": "Summer Beverages 1997 runs through June 1997 and promotes beverages and condiments.\n\n"
+                   "Winter Classics 1997 runs through December 1997 and promotes dairy and confections.",
+}
+
+def _retriever(docs_dir, fusion):
+    retriever = SimpleRetriever(docs_dir, None, mode="hybrid", fusion=fusion)
+    retriever.warmup()
+    return retriever
+
+def test_hybrid_retrieval():
+    docs_dir = tempfile.mkdtemp()
+    for name, text in DOCS.items():
+        with open(os.path.join(docs_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    queries = ["beverages return window days", "dairy 1997 promotion", "revenue of orders"]
+
+    # BM25 scores match rank_bm25's Okapi implementation on the same tokens
+    retriever = _retriever(docs_dir, "rrf")
+    n = len(retriever.chunks)
+    okapi = BM25Okapi([retriever._analyzer(chunk["content"]) for chunk in retriever.chunks],
+                      k1=retriever.bm25_k1, b=retriever.bm25_b, epsilon=retriever.bm25_epsilon)
+    for query in queries:
+        expected = okapi.get_scores(retriever._analyzer(query))
+        got = np.zeros(n)
+        for hit in retriever.retrieve_many([query], top_k=n)[0]:
+            got[hit.index] = hit.bm25_score
+        assert np.allclose(got, expected), (query, got, expected)
+
+    for fusion in ("rrf", "weighted"):
+        retriever = _retriever(docs_dir, fusion)
+        for query in queries:
+            hits = retriever.retrieve_many([query], top_k=n)[0]
+            tfidf = np.zeros(n)
+            bm25 = np.zeros(n)
+            for hit in hits:
+                tfidf[hit.index], bm25[hit.index] = hit.score, hit.bm25_score
+            if fusion == "weighted":
+                expected = 0.5 * tfidf / (tfidf.max() or 1.0) + 0.5 * bm25 / (bm25.max() or 1.0)
+            else:
+                expected = np.zeros(n)
+                for scores in (tfidf, bm25):
+                    for rank, i in enumerate(np.argsort(-scores, kind="stable"), start=1):
+                        if scores[i] > 0:
+                            expected[i] += 1.0 / (retriever.rrf_k + rank)
+            fused = [hit.fused_score for hit in hits]
+            assert np.allclose([expected[hit.index] for hit in hits], fused), (fusion, query)
+            assert fused == sorted(fused, reverse=True), (fusion, query, fused)
+        top = retriever.retrieve("beverages return window days", top_k=1)[0]
+        assert top["id"] == "policy::chunk0", (fusion, top)
+    print("Hybrid retrieval test: SUCCESS")
+
+if __name__ == "__main__":
+    test_hybrid_retrieval()
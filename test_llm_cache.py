@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+sys.path.append('.')
+import dspy
+from agent.llm_cache import LLMCache
+from agent.dspy_signatures import Router
+from benchmarks.stub_lm import StubLM
+
+def test_llm_cache():
+    path = os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite")
+    cache = LLMCache(path, max_entries=2)
+    key = cache.make_key("RouteClassification", {"question": "AOV in 1997?"}, "phi3.5")
+    assert cache.get(key) is None
+    cache.put(key, {"classification": "hybrid"})
+    assert cache.get(key) == {"classification": "hybrid"}
+    
+    # Entries survive a new process-level cache object
+    reopened = LLMCache(path)
+    assert reopened.get(key) == {"classification": "hybrid"}
+    
+    # Least recently used entries are evicted past max_entries
+    for i in range(3):
+        cache.put(cache.make_key("RouteClassification", {"question": str(i)}, "phi3.5"), {"i": i})
+    assert cache.get(key) is None
+    
+    bypassed = LLMCache(path, bypass=True)
+    assert bypassed.get(cache.make_key("RouteClassification", {"question": "2"}, "phi3.5")) is None
+    
+    # Compiled demos and temperature are part of the key
+    lm = StubLM()
+    router = Router(cache=LLMCache(os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite")))
+    question = "How many orders shipped to France?"
+    with dspy.context(lm=lm):
+        router(question=question)
+        router(question=question)
+        assert lm.calls == 1
+        router.classifier.predict.demos = [dspy.Example(question="Total revenue?", classification="sql")]
+        router(question=question)
+        assert lm.calls == 2
+        router.classifier.predict.config["temperature"] = 0.7
+        router(question=question)
+        assert lm.calls == 3
+        router(question=question)
+        assert lm.calls == 3
+
+    print(f"LLM cache stats: {cache.stats()}")
+    print("LLM cache test: SUCCESS")
+
+if __name__ == "__main__":
+    test_llm_cache()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.append('.')
+import dspy
+from agent.lm_dispatcher import LMDispatcher, Endpoint, build_lms
+
+def _stub_server(name, status=200, delay=0.0, missing=(), drop=False):
+    """Chat completions stub answering in DSPy's ChatAdapter format with '<model>@<name>'
+
+    Models in `missing` get a 404; with `drop` the connection is closed without a response.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            if drop:
+                self.close_connection = True
+                return
+            code = 404 if payload["model"] in missing else status
+            content = f"[[ ## answer ## ]]\n{payload['model']}@{name}\n\n[[ ## completed ## ]]"
+            body = json.dumps({
+                "model": payload["model"],
+                "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+            }).encode() if code == 200 else b'{"error": "overloaded"}'
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_address[1]
+
+def test_lm_dispatcher():
+    servers = [_stub_server(name, delay=0.05) for name in ("a", "b")]
+    lm = LMDispatcher([url for _, url in servers], "big")
+    predict = dspy.Predict("question -> answer")
+    def ask(question):
+        # dspy.context is per thread, so each worker sets it itself
+        with dspy.context(lm=lm):
+            return predict(question=question).answer
+    assert ask("ping") in ("big@a", "big@b")
+    with ThreadPoolExecutor(4) as pool:
+        answers = list(pool.map(ask, [f"q{i}" for i in range(8)]))
+    calls = [endpoint["calls"] for endpoint in lm.stats()["endpoints"]]
+    assert set(answers) == {"big@a", "big@b"} and min(calls) >= 3, calls
+
+    # Per-module model over the same endpoints, restricted to the server hosting it
+    tiny = LMDispatcher([Endpoint(servers[0][1], models=["big"]), Endpoint(servers[1][1], models=["tiny"])],
+                        "big").with_model("tiny")
+    with dspy.context(lm=tiny):
+        assert predict(question="route me").answer == "tiny@b"
+
+    # Unreachable, overloaded, too-slow and connection-dropping servers are failed over and put in cooldown
+    _, busy_url = _stub_server("busy", status=503)
+    _, slow_url = _stub_server("slow", delay=1.0)
+    _, drop_url = _stub_server("drop", drop=True)
+    down = _stub_server("down")
+    down[0].shutdown()
+    down[0].server_close()
+    flaky = LMDispatcher([down[1], busy_url, slow_url, drop_url, servers[0][1]], "big", timeout=0.3, cooldown=60)
+    with dspy.context(lm=flaky):
+        assert predict(question="anyone?").answer == "big@a"
+        before = [e["calls"] for e in flaky.stats()["endpoints"]]
+        assert predict(question="again").answer == "big@a"
+    stats = flaky.stats()
+    # The second call went straight to the healthy server
+    assert [e["calls"] for e in stats["endpoints"]] == before[:4] + [before[4] + 1], (before, stats)
+    assert [e["healthy"] for e in stats["endpoints"]] == [False, False, False, False, True], stats
+    assert all(e["in_flight"] == 0 for e in stats["endpoints"]), stats
+
+    # A 404 for one model leaves the server in use for the others
+    _, partial_url = _stub_server("partial", missing=("tiny",))
+    shared = LMDispatcher([partial_url, servers[0][1]], "big", cooldown=60)
+    with dspy.context(lm=shared.with_model("tiny")):
+        assert predict(question="small").answer == "tiny@a"
+    with dspy.context(lm=shared):
+        assert predict(question="large").answer == "big@partial"
+    assert shared.stats()["endpoints"][0]["healthy"]
+
+    # Errors outside the failover set still release the endpoint
+    broken = LMDispatcher([servers[0][1]], "big")
+    def malformed(body):
+        raise KeyError("choices")
+    broken._to_response = malformed
+    raised = False
+    try:
+        broken.forward(prompt="hi")
+    except KeyError:
+        raised = True
+    assert raised and broken.stats()["endpoints"][0]["in_flight"] == 0
+
+    # --module-model names must be a module the agent runs
+    _, module_lms = build_lms([servers[0][1]], "big", ["Router=tiny"])
+    assert list(module_lms) == ["Router"]
+    rejected = False
+    try:
+        build_lms([servers[0][1]], "big", ["Routr=tiny"])
+    except ValueError:
+        rejected = True
+    assert rejected
+
+    print(f"Dispatcher stats: {stats}")
+    print("LM dispatcher test: SUCCESS")
+
+if __name__ == "__main__":
+    test_lm_dispatcher()
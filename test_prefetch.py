@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import tempfile
+sys.path.append('.')
+from agent.graph_hybrid import HybridAgent
+from benchmarks.datasets import generate_docs, generate_northwind
+from benchmarks.stub_lm import StubLM
+from agent.batch import run_batch
+
+def test_prefetch():
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    generate_docs(os.path.join(workdir, "docs"), n_docs=5)
+    agent = HybridAgent(db_path=db_path, docs_dir=os.path.join(workdir, "docs"), index_dir=None,
+                        sql_demos_path=None, lm=StubLM())
+
+    # Duplicates answered from their leader leave no prefetched hits behind
+    questions = [
+        {"id": "a", "question": "How many orders were placed?", "format_hint": "int"},
+        {"id": "b", "question": "how many orders were placed", "format_hint": "int"},
+        {"id": "c", "question": "Top customer by revenue?", "format_hint": "{name:str}"},
+    ]
+    results = asyncio.run(run_batch(agent, questions, workers=2))
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert results[1]["final_answer"] == 14, results[1]
+    assert not agent._prefetched_hits, list(agent._prefetched_hits)
+
+    # A run that fails before retrieval still drops its entry
+    def failing_run(*args):
+        raise RuntimeError("boom")
+    agent._run = failing_run
+    agent.prefetch_docs(["never retrieved"])
+    raised = False
+    try:
+        agent.run("never retrieved", "int", "e")
+    except RuntimeError:
+        raised = True
+    assert raised and not agent._prefetched_hits
+    print("Prefetch test: SUCCESS")
+
+if __name__ == "__main__":
+    test_prefetch()
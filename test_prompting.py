@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import sys
+sys.path.append('.')
+from agent.prompting import PromptAssembler
+
+def test_prompting():
+    prompts = PromptAssembler({"AnswerSynthesizer": {"relevant_docs": 40, "sql_results": 60}})
+    docs = [
+        {"id": "kpi::chunk0", "source": "kpi.md", "chunk_index": 0, "score": 0.9,
+         "content": "AOV = SUM(UnitPrice * Quantity * (1 - Discount)) / COUNT(DISTINCT OrderID)"},
+        {"id": "kpi_copy::chunk0", "source": "kpi_copy.md", "chunk_index": 0, "score": 0.8,
+         "content": "AOV = SUM(UnitPrice * Quantity * (1 - Discount)) / COUNT(DISTINCT OrderID)."},
+        {"id": "calendar::chunk1", "source": "calendar.md", "chunk_index": 1, "score": 0.5,
+         "content": "Summer Beverages 1997: 1997-06-01 to 1997-06-30"},
+        {"id": "policy::chunk2", "source": "policy.md", "chunk_index": 2, "score": 0.1,
+         "content": "Beverages unopened: 14 days return window. " * 5}
+    ]
+    results = {"success": True, "columns": ["ProductName", "revenue"], "row_count": 50,
+               "rows": [[f"Product {i}", 1000.0 - i] for i in range(50)]}
+    inputs, saved = prompts.assemble("AnswerSynthesizer", relevant_docs=docs, sql_results=results)
+    
+    doc_lines = inputs["relevant_docs"].splitlines()
+    assert doc_lines[0].startswith("[kpi::chunk0]") and doc_lines[1].startswith("[calendar::chunk1]")
+    assert not any("kpi_copy" in line or "policy" in line for line in doc_lines)
+    table = inputs["sql_results"]
+    assert table.startswith("ProductName | revenue\nProduct 0 | 1000.0") and "more rows" in table
+    assert "sum=48775.0" in table and "50 rows; totals below cover all of them" in table, table
+    capped = dict(results, truncated=True, row_count=1000, row_count_exact=False)
+    assert "at least 1000 rows; totals below cover only the first 50" in prompts.render_results(capped, 60)
+    assert saved > 0 and prompts.stats()["saved_tokens"] == saved
+    assert prompts.render_results({"success": False, "error": "no such table: x"}) == "Query failed: no such table: x"
+    
+    print(f"Assembled results:\n{table}")
+    print(f"Prompt stats: {prompts.stats()}")
+    print("Prompting test: SUCCESS")
+
+if __name__ == "__main__":
+    test_prompting()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import tempfile
+sys.path.append('.')
+from agent.rag.retrieval import SimpleRetriever
+
+def test_retrieval_index():
+    docs_dir = tempfile.mkdtemp()
+    index_dir = os.path.join(docs_dir, ".index")
+    docs = {
+        "product_policy.md": "# Returns\n\nBeverages unopened: 14 days; opened: no returns.\n\nPerishables: 3-7 days.",
+        "kpi_definitions.md": "# KPIs\n\nAOV = SUM(UnitPrice * Quantity * (1 - Discount)) / COUNT(DISTINCT OrderID)"
+    }
+    for name, text in docs.items():
+        with open(os.path.join(docs_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    expected = SimpleRetriever(docs_dir, index_dir).retrieve("beverages return window", top_k=1)
+    assert expected[0]["id"] == "product_policy::chunk1"
+
+    # chunks.json from another save next to the old manifest and matrices is rebuilt, not loaded
+    chunks_path = os.path.join(index_dir, "chunks.json")
+    with open(chunks_path, encoding="utf-8") as f:
+        chunks = json.load(f)
+    with open(chunks_path, "w", encoding="utf-8") as f:
+        json.dump(chunks + chunks[:2], f)
+    reloaded = SimpleRetriever(docs_dir, index_dir).retrieve("beverages return window", top_k=1)
+    assert [hit["id"] for hit in reloaded] == [hit["id"] for hit in expected]
+    with open(chunks_path, encoding="utf-8") as f:
+        assert len(json.load(f)) == len(chunks)
+
+    # Modify one doc, delete one and add one: only the changed and added files are re-chunked,
+    # and retrieval matches an index built from scratch
+    with open(os.path.join(docs_dir, "unchanged.md"), "w", encoding="utf-8") as f:
+        f.write("# Shipping\n\nOrders ship within 3 business days.\n\nFreight is billed per order.")
+    SimpleRetriever(docs_dir, index_dir).warmup()
+    with open(os.path.join(docs_dir, "product_policy.md"), "a", encoding="utf-8") as f:
+        f.write("\n\nDairy unopened: 10 days.")
+    os.remove(os.path.join(docs_dir, "kpi_definitions.md"))
+    with open(os.path.join(docs_dir, "catalog.md"), "w", encoding="utf-8") as f:
+        f.write("# Catalog\n\nBeverages include Chai and Chang.")
+    incremental = SimpleRetriever(docs_dir, index_dir)
+    chunked = []
+    original_chunk_file = incremental._chunk_file
+    incremental._chunk_file = lambda filename, content: chunked.append(filename) or original_chunk_file(filename, content)
+    incremental.warmup()
+    assert sorted(chunked) == ["catalog.md", "product_policy.md"], chunked
+    full = SimpleRetriever(docs_dir, None)
+    full.warmup()
+    assert sorted(c["id"] for c in incremental.chunks) == sorted(c["id"] for c in full.chunks)
+    for query in ("beverages return window", "dairy unopened days", "freight per order", "AOV discount"):
+        # Every chunk's score, since chunks tied at zero may come back in either order
+        got = {hit["id"]: round(hit["score"], 6) for hit in incremental.retrieve(query, top_k=len(full.chunks))}
+        want = {hit["id"]: round(hit["score"], 6) for hit in full.retrieve(query, top_k=len(full.chunks))}
+        assert got == want, (query, got, want)
+    print("Retrieval index test: SUCCESS")
+
+if __name__ == "__main__":
+    test_retrieval_index()
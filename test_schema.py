@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import os
+import sys
+import sqlite3
+import tempfile
+sys.path.append('.')
+from agent.tools.sqlite_tool import SQLiteTool
+from benchmarks.datasets import generate_northwind
+
+def test_schema():
+    db_path = os.path.join(tempfile.mkdtemp(), "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    tool = SQLiteTool(db_path)
+
+    # Categories and Customers are linked through Products, Order Details and Orders
+    tables, joins = tool.prune_schema("Which customer bought the most from each category?")
+    assert {"Categories", "Customers", "Products", "Order Details", "Orders"} <= set(tables), tables
+    assert "Shippers" not in tables and "Employees" not in tables
+    assert '"Products".CategoryID = "Categories".CategoryID' in joins, joins
+    assert '"Orders".CustomerID = "Customers".CustomerID' in joins, joins
+    assert "order_items" in tables
+
+    # One version check per get_schema call, however many helpers use the schema
+    checks = []
+    current = tool._current_schema_version
+    tool._current_schema_version = lambda: checks.append(1) or current()
+    schema = tool.get_schema(question="Which customer bought the most from each category?")
+    assert len(checks) == 1 and "Joins:" in schema
+
+    # A schema change is picked up on the next call
+    assert "Regions" not in tool.get_schema_info()
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE Regions (RegionID INTEGER PRIMARY KEY, RegionDescription TEXT)")
+    conn.commit()
+    conn.close()
+    assert "Regions" in tool.get_schema_info()
+    assert "Table/View: Regions" in tool.get_schema()
+    print("Schema test: SUCCESS")
+
+if __name__ == "__main__":
+    test_schema()
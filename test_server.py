@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import sys
+import json
+import time
+import threading
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+sys.path.append('.')
+from agent.server import CopilotServer
+from agent.cli import agent_options
+from agent.tracing import Tracer
+
+class EchoAgent:
+    """Stands in for HybridAgent so the test needs no LLM"""
+    
+    def __init__(self):
+        self.tracer = Tracer(enabled=True)
+        self.release = threading.Event()
+        self.release.set()
+    
+    def run(self, question, format_hint, question_id):
+        self.release.wait()
+        return {"id": question_id, "final_answer": len(question), "sql": "", "confidence": 1.0,
+                "explanation": format_hint, "citations": []}
+
+def _post(url, payload):
+    request = Request(url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+    try:
+        with urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_server():
+    agent = EchoAgent()
+    server = CopilotServer(agent, port=0, workers=1, queue_size=2)
+    server.start()
+    base = "http://%s:%d" % server.address
+    
+    status, result = _post(base + "/ask", {"id": "q1", "question": "How many orders?", "format_hint": "int"})
+    assert status == 200 and result["id"] == "q1" and result["final_answer"] == 16
+    
+    status, body = _post(base + "/ask", {"questions": [{"id": "a", "question": "x"}, {"id": "b", "question": "yy"}]})
+    assert status == 200 and [r["id"] for r in body["results"]] == ["a", "b"]
+    
+    # Hold the worker on one question and fill the queue so the next request is refused
+    agent.release.clear()
+    blocked = [
+        threading.Thread(target=_post, args=(base + "/ask", {"question": "held"})),
+        threading.Thread(target=_post, args=(base + "/ask", {"questions": [{"question": "1"}, {"question": "2"}]}))
+    ]
+    for thread in blocked:
+        thread.start()
+        time.sleep(0.2)
+    status, body = _post(base + "/ask", {"question": "one too many"})
+    agent.release.set()
+    for thread in blocked:
+        thread.join()
+    assert status == 429, status
+    
+    with urlopen(base + "/healthz") as response:
+        health = json.loads(response.read())
+    with urlopen(base + "/metrics") as response:
+        metrics = response.read().decode()
+    assert health["status"] == "ok"
+    assert "copilot_rejected_total 1" in metrics
+    print(f"Server health: {health}")
+    server.stop()
+
+    # The batch CLI and the server take the same agent options
+    import run_agent_hybrid
+    import serve_agent_hybrid
+    batch_options = {param.name for param in run_agent_hybrid.main.params}
+    serve_options = {param.name for param in serve_agent_hybrid.main.params}
+    shared = {param.name for param in agent_options(lambda: None).__click_params__}
+    assert "lm_endpoints" in shared and shared <= batch_options and shared <= serve_options
+    print("Server test: SUCCESS")
+
+if __name__ == "__main__":
+    test_server()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import sys
+import time
+import asyncio
+import threading
+sys.path.append('.')
+from agent.single_flight import SingleFlight, flight_key
+
+def test_single_flight():
+    assert flight_key("How many  orders?", "int") == flight_key("how many orders", "int")
+    assert flight_key("How many orders?", "int") != flight_key("How many orders?", "float")
+    
+    flights = SingleFlight()
+    runs = []
+    results = []
+    
+    def slow():
+        runs.append(1)
+        time.sleep(0.2)
+        return {"answer": 42}
+    
+    threads = [threading.Thread(target=lambda: results.append(flights.do("k", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(runs) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    
+    async def aslow():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return 7
+    
+    async def burst():
+        return await asyncio.gather(*(flights.ado("a", aslow) for _ in range(5)))
+    
+    assert [value for value, _ in asyncio.run(burst())] == [7] * 5
+    assert len(runs) == 2
+    print(f"Single-flight stats: {flights.stats()}")
+    print("Single-flight test: SUCCESS")
+
+if __name__ == "__main__":
+    test_single_flight()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import sys
+sys.path.append('.')
+from agent.tools.sql_cache import SQLResultCache, canonicalize_sql
+
+def test_sql_cache():
+    a = '''SELECT p.ProductName, SUM(od.Quantity) AS qty
+    FROM "Order Details" od JOIN Products p ON od.ProductID = p.ProductID -- by product
+    GROUP BY p.ProductName;'''
+    b = '''select x.productname, sum(y.quantity) as qty from [Order Details] AS y
+    join products x on y.productid = x.productid group by x.productname'''
+    assert canonicalize_sql(a) == canonicalize_sql(b)
+    assert canonicalize_sql("SELECT 'A'") != canonicalize_sql("SELECT 'a'")
+    # SQLite reads a double-quoted token that names no column as a string, so its case matters
+    assert (canonicalize_sql('SELECT COUNT(*) FROM Categories WHERE CategoryName = "Beverages"')
+            != canonicalize_sql('SELECT COUNT(*) FROM Categories WHERE CategoryName = "BEVERAGES"'))
+    # Only FROM/JOIN aliases and their qualifiers are renamed, never a column that shares the name
+    assert canonicalize_sql("SELECT a FROM t a") != canonicalize_sql("SELECT b FROM t b")
+    assert canonicalize_sql("SELECT a FROM t a") == "select a from t #1"
+    assert canonicalize_sql("SELECT a.x FROM t a WHERE a.y = 1") == canonicalize_sql("SELECT b.x FROM t AS b WHERE b.y = 1")
+    assert (canonicalize_sql("SELECT COUNT(*) FROM Orders o WHERE ShipCountry = 'x'")
+            != canonicalize_sql("SELECT COUNT(*) FROM Orders o WHERE ShipCity = 'x'"))
+    print(f"Canonical SQL: {canonicalize_sql(a)}")
+    
+    cache = SQLResultCache(max_bytes=200)
+    result = {"success": True, "columns": ["n"], "rows": [[1]], "row_count": 1}
+    cache.put(("q1", 1), result)
+    assert cache.get(("q1", 1)) is result
+    assert cache.get(("q1", 2)) is None
+    for i in range(10):
+        cache.put((f"q{i + 2}", 1), result)
+    assert cache.stats()["bytes"] <= 200
+    
+    print(f"SQL cache stats: {cache.stats()}")
+    print("SQL cache test: SUCCESS")
+
+if __name__ == "__main__":
+    test_sql_cache()
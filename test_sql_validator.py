@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+sys.path.append('.')
+from agent.tools.sqlite_tool import SQLiteTool
+from agent.tools.sql_validator import SQLValidator
+from benchmarks.datasets import generate_northwind
+
+def _codes(validator, sql):
+    return [error["code"] for error in validator.validate(sql)["errors"]]
+
+def test_sql_validator():
+    db_path = os.path.join(tempfile.mkdtemp(), "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    validator = SQLValidator(SQLiteTool(db_path))
+
+    assert validator.validate("SELECT COUNT(*) FROM Orders")["valid"]
+    assert _codes(validator, "SELECT o.OrderDat FROM Orders o") == ["unknown_column"]
+    assert _codes(validator, "SELECT COUNT(*) FROM Ordrs") == ["unknown_table"]
+    assert _codes(validator, "SELECT COUNT(*) FROM Orders o, Customers c") == ["cartesian_join"]
+    assert "not_select" in _codes(validator, "DELETE FROM Orders")
+
+    # A subquery's FROM list ends at its closing paren
+    report = validator.validate("SELECT (SELECT COUNT(*) FROM Orders) AS n, ProductName FROM Products")
+    assert report["valid"], report
+
+    # ON equalities do not count as joins for a table added with a comma
+    sql = "SELECT COUNT(*) FROM Orders o JOIN Customers c ON o.CustomerID = c.CustomerID, Employees e"
+    assert _codes(validator, sql) == ["cartesian_join"]
+    # ... while an equality in the top-level WHERE does
+    assert validator.validate(sql + " WHERE o.EmployeeID = e.EmployeeID")["valid"]
+
+    # Aliases are scoped per SELECT: "o" means Customers inside the subquery and Orders outside it
+    sql = ("SELECT o.OrderID FROM Orders o WHERE o.CustomerID IN "
+           "(SELECT o.CustomerID FROM Customers o WHERE o.CompanyName LIKE 'A%')")
+    assert validator.validate(sql)["valid"], validator.validate(sql)
+    assert _codes(validator, "SELECT o.OrderID FROM Orders o WHERE EXISTS (SELECT 1 FROM Customers o WHERE o.OrderDate IS NULL)") \
+        == ["unknown_column"]
+    # ... while a correlated reference resolves against the outer SELECT
+    sql = "SELECT o.OrderID FROM Orders o WHERE EXISTS (SELECT 1 FROM Customers c WHERE c.CustomerID = o.CustomerID)"
+    assert validator.validate(sql)["valid"], validator.validate(sql)
+    sql = "SELECT p.ProductName FROM Products p UNION SELECT p.CompanyName FROM Customers p"
+    assert validator.validate(sql)["valid"], validator.validate(sql)
+
+    # Schema-qualified tables resolve to the table after the dot
+    assert validator.validate("SELECT o.OrderID FROM main.Orders o")["valid"]
+    assert validator.validate('SELECT COUNT(*) FROM main."Order Details"')["valid"]
+    assert _codes(validator, "SELECT o.OrderDat FROM main.Orders AS o") == ["unknown_column"]
+    assert _codes(validator, "SELECT COUNT(*) FROM main.Ordrs") == ["unknown_table"]
+    aggregated = SQLValidator(SQLiteTool(db_path, aggregates_path=os.path.join(os.path.dirname(db_path), "agg.sqlite")))
+    table = next(name for name, info in aggregated.db_tool.get_schema_info().items() if info["database"] == "agg")
+    assert aggregated.validate(f"SELECT COUNT(*) FROM agg.{table}")["valid"]
+
+    feedback = SQLValidator.format_feedback(validator.validate("SELECT o.OrderDat FROM Orders o"))
+    assert "[unknown_column]" in feedback and "OrderDate" in feedback, feedback
+    print(feedback)
+    print("SQL validator test: SUCCESS")
+
+if __name__ == "__main__":
+    test_sql_validator()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import os
+import sys
+import sqlite3
+import tempfile
+sys.path.append('.')
+from agent.tools.sqlite_pool import SQLiteConnectionPool
+from agent.tools.sqlite_tool import SQLiteTool
+from benchmarks.datasets import generate_northwind
+
+RUNAWAY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT MAX(i) FROM n"
+
+def test_sqlite_pool():
+    db_path = os.path.join(tempfile.mkdtemp(), "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    pool = SQLiteConnectionPool(db_path, size=2)
+
+    # Pooled connections cannot write
+    for statement in ("INSERT INTO Shippers VALUES (99, 'Nobody')", "DELETE FROM Orders", "CREATE TABLE t (x)"):
+        rejected = False
+        with pool.connection() as conn:
+            try:
+                conn.execute(statement)
+            except sqlite3.OperationalError as e:
+                rejected = "readonly" in str(e) or "read-only" in str(e)
+        assert rejected, statement
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Shippers").fetchone()[0] == 3
+
+    # A statement past its timeout is interrupted, and the connection stays usable
+    interrupted = False
+    with pool.connection(timeout=0.2) as conn:
+        try:
+            conn.execute(RUNAWAY).fetchone()
+        except sqlite3.OperationalError as e:
+            interrupted = "interrupted" in str(e)
+    assert interrupted
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+    tool = SQLiteTool(db_path, query_timeout=0.2, result_cache_bytes=0)
+    result = tool.execute_query(RUNAWAY)
+    assert not result["success"]
+    assert result["error"] == "Query exceeded the 0.2s time limit and was interrupted", result
+    result = tool.execute_query("UPDATE Products SET UnitPrice = 0")
+    assert not result["success"] and "readonly" in result["error"], result
+    print("SQLite pool test: SUCCESS")
+
+if __name__ == "__main__":
+    test_sqlite_pool()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import tempfile
+sys.path.append('.')
+from agent.tools.sqlite_tool import SQLiteTool
+from benchmarks.datasets import generate_northwind
+
+def test_sqlite_tool():
+    db_path = os.path.join(tempfile.mkdtemp(), "northwind.sqlite")
+    generate_northwind(db_path, scale=1)
+    tool = SQLiteTool(db_path, max_rows=1000, result_cache_bytes=0)
+
+    result = tool.execute_query("SELECT COUNT(*) FROM Orders")
+    assert result["success"] and result["row_count"] == 1 and result["row_count_exact"]
+
+    # A truncated result still reports the true row count
+    result = tool.execute_query('SELECT o.OrderID, s.ShipperID FROM Orders o, Shippers s;')
+    assert result["success"] and result["truncated"] and len(result["rows"]) == 1000
+    assert result["row_count_exact"] and result["row_count"] == 830 * 3, result["row_count"]
+
+    # When counting the rest would run past the deadline, fall back to a lower bound
+    slow = SQLiteTool(db_path, max_rows=1000, result_cache_bytes=0, query_timeout=0.2)
+    started = time.perf_counter()
+    result = slow.execute_query('SELECT a.OrderID, b.OrderID, c.OrderID FROM "Order Details" a, "Order Details" b, "Order Details" c')
+    elapsed = time.perf_counter() - started
+    assert result["success"] and result["truncated"] and len(result["rows"]) == 1000
+    assert not result["row_count_exact"] and result["row_count"] >= 1000
+    assert elapsed < 2.0, elapsed
+    print("SQLite tool test: SUCCESS")
+
+if __name__ == "__main__":
+    test_sqlite_tool()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import sys
+import time
+import subprocess
+sys.path.append('.')
+
+# Import-time budgets in seconds; generous enough for slow CI machines
+HELP_BUDGET = 1.5
+AGENT_BUDGET = 2.5
+
+CONSTRUCT_AGENT = """
+import sys
+from agent.graph_hybrid import HybridAgent
+HybridAgent()
+heavy = [name for name in ('dspy', 'langgraph', 'sklearn', 'pandas') if name in sys.modules]
+print(','.join(heavy))
+"""
+
+def _timed(args):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable] + args, capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - started, output
+
+def test_startup():
+    help_seconds, _ = _timed(['run_agent_hybrid.py', '--help'])
+    print(f"  run_agent_hybrid.py --help: {help_seconds:.2f}s (budget {HELP_BUDGET}s)")
+    assert help_seconds < HELP_BUDGET
+    
+    agent_seconds, heavy = _timed(['-c', CONSTRUCT_AGENT])
+    print(f"  import + HybridAgent(): {agent_seconds:.2f}s (budget {AGENT_BUDGET}s)")
+    assert agent_seconds < AGENT_BUDGET
+    assert not heavy.strip(), f"heavy modules imported eagerly: {heavy.strip()}"
+    print("Startup test: SUCCESS")
+
+if __name__ == "__main__":
+    test_startup()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import tempfile
+sys.path.append('.')
+from agent.tracing import Tracer
+
+def test_tracing():
+    tracer = Tracer(enabled=True)
+    node = tracer.wrap_node("router", lambda state: {"classification": "sql_only"})
+    for i in range(5):
+        node({"question_id": f"q{i}", "repair_count": 0})
+    with tracer.span("Router", kind="llm") as span:
+        span.set(prompt_tokens=120, completion_tokens=8, cache_hit=False)
+    
+    summary = tracer.summary()
+    assert summary["node:router"]["count"] == 5
+    assert 'module="Router",counter="prompt_tokens"} 120' in tracer.prometheus()
+    print(tracer.format_summary())
+    
+    # Spans reach the trace file even when the traced run raises
+    path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+    raised = False
+    try:
+        with Tracer(enabled=True, path=path) as traced:
+            with traced.span("router"):
+                raise RuntimeError("boom")
+    except RuntimeError:
+        raised = True
+    with open(path) as f:
+        spans = [json.loads(line) for line in f]
+    assert raised and traced._file is None
+    assert [(span["name"], span["outcome"]) for span in spans] == [("router", "error")], spans
+
+    # Disabled tracers run nodes untouched and record nothing
+    disabled = Tracer()
+    assert disabled.wrap_node("router", lambda state: {"ok": True})({}) == {"ok": True}
+    assert disabled.summary() == {}
+    print("Tracing test: SUCCESS")
+
+if __name__ == "__main__":
+    test_tracing()